@@ -2,6 +2,7 @@ import logging
 from datetime import timedelta
 from homeassistant.util.dt import (now, as_utc)
 import asyncio
+import time
 
 from .const import (
   DOMAIN,
@@ -14,26 +15,49 @@ from .const import (
   DATA_CLIENT,
   DATA_ELECTRICITY_RATES_COORDINATOR,
   DATA_RATES,
-  DATA_ACCOUNT_ID
+  DATA_RATES_VERSIONS,
+  DATA_RATES_REFRESH_STATS,
+  DATA_ACCOUNT,
+  DATA_STORE,
+  DATA_SCHEDULERS,
+  DATA_TARGET_PLANNER
 )
 
 from .api_client import OctopusEnergyApiClient
+from .account_cache import OctopusEnergyAccountCache
+from .storage import OctopusEnergyDataStore
+from .scheduler import OctopusEnergyScheduler
+from .target_planner import OctopusEnergyTargetRatePlanner
 
 from homeassistant.helpers.update_coordinator import (
   DataUpdateCoordinator
 )
 
+from .rate_timeline import RateTimeline
 from .utils import (
-  get_active_tariff_code
+  get_active_tariff_code,
+  get_contiguous_rates
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+# Agile rates for the next day are published around 4pm, so we check again shortly after the half hour refresh
+RATES_AVAILABILITY_TIMES = ["16:10"]
+
+# The maximum number of tariffs to retrieve rates for at once
+RATES_REFRESH_CONCURRENCY = 4
+
 async def async_setup_entry(hass, entry):
   """This is called from the config flow."""
   hass.data.setdefault(DOMAIN, {})
 
   if CONFIG_MAIN_API_KEY in entry.data:
+    # Load our stored data first, so we only need to request what we're missing
+    if DATA_STORE not in hass.data[DOMAIN]:
+      store = OctopusEnergyDataStore(hass)
+      await store.async_load()
+      hass.data[DOMAIN][DATA_STORE] = store
+
     setup_dependencies(hass, entry.data)
 
     # Forward our entry to setup our default sensors
@@ -50,14 +74,14 @@ async def async_setup_entry(hass, entry):
 
   return True
 
-async def async_get_current_electricity_agreement_tariff_codes(client, config):
-  account_info = await client.async_get_account(config[CONFIG_MAIN_ACCOUNT_ID])
+async def async_get_current_electricity_agreement_tariff_codes(account_cache: OctopusEnergyAccountCache):
+  account_info = await account_cache.async_get_account()
 
   tariff_codes = {}
   current = now()
   if len(account_info["electricity_meter_points"]) > 0:
     for point in account_info["electricity_meter_points"]:
-      active_tariff_code = get_active_tariff_code(current, point["agreements"])
+      active_tariff_code = get_active_tariff_code(current, account_cache.get_agreement_index(point))
       # The type of meter (ie smart vs dumb) can change the tariff behaviour, so we
       # have to enumerate the different meters being used for each tariff as well.
       for meter in point["meters"]:
@@ -69,49 +93,144 @@ async def async_get_current_electricity_agreement_tariff_codes(client, config):
   
   return tariff_codes
 
+async def async_refresh_electricity_rates(client: OctopusEnergyApiClient, store: OctopusEnergyDataStore, tariff_codes, period_from, period_to, cached_rates, concurrency: int = RATES_REFRESH_CONCURRENCY):
+  """
+  Retrieve the rates for each of our meters, retrieving the rates for each tariff once. If the rates for a tariff can't be
+  retrieved, then the meter's cached rates are used
+  """
+  expected_rates = int((period_to - period_from) / timedelta(minutes=30))
+
+  # Our tariffs are independent of each other, so retrieve their rates at the same time while limiting how many
+  # requests we make at once
+  semaphore = asyncio.Semaphore(concurrency)
+
+  # Several meters can be on the same tariff, so we only retrieve the rates for each tariff once and share them
+  fetch_plan = {}
+  for ((meter_point, is_smart_meter), tariff_code) in tariff_codes.items():
+    fetch_plan.setdefault((tariff_code, is_smart_meter), []).append(meter_point)
+
+  async def async_get_tariff_rates(tariff_code, is_smart_meter, meter_points):
+    async with semaphore:
+      tariff_started = time.monotonic()
+      try:
+        # Rates don't change once they're published, so we only retrieve the rates after the ones we already have
+        # for any of our meters
+        stored_rates = list(map(lambda meter_point: get_contiguous_rates(store.get_rates(meter_point, tariff_code, is_smart_meter, period_from, period_to), period_from), meter_points))
+        new_rates = max(stored_rates, key=len)
+        if len(new_rates) < expected_rates:
+          request_from = new_rates[-1]["valid_to"] if len(new_rates) > 0 else period_from
+          missing_rates = await client.async_get_electricity_rates(tariff_code, is_smart_meter, request_from, period_to)
+          new_rates = RateTimeline.from_rates(list(new_rates) + list(missing_rates), run_length_encoded=True) if missing_rates != None else None
+
+        if new_rates != None:
+          for (meter_point, meter_stored_rates) in zip(meter_points, stored_rates):
+            if len(meter_stored_rates) < len(new_rates):
+              store.set_rates(meter_point, tariff_code, is_smart_meter, new_rates)
+      except Exception as e:
+        _LOGGER.error(f"Failed to retrieve rates for {tariff_code}: {e}")
+        new_rates = None
+
+      _LOGGER.debug(f"Rates for {tariff_code} retrieved in {time.monotonic() - tariff_started:.3f}s")
+      return new_rates
+
+  tariff_rates = await asyncio.gather(
+    *[async_get_tariff_rates(tariff_code, is_smart_meter, meter_points) for ((tariff_code, is_smart_meter), meter_points) in fetch_plan.items()]
+  )
+
+  rates_by_tariff = dict(zip(fetch_plan.keys(), tariff_rates))
+
+  rates = {}
+  for ((meter_point, is_smart_meter), tariff_code) in tariff_codes.items():
+    new_rates = rates_by_tariff[(tariff_code, is_smart_meter)]
+    if new_rates != None:
+      rates[meter_point] = new_rates
+    elif meter_point in cached_rates:
+      _LOGGER.debug(f"Failed to retrieve new rates for {tariff_code}, so using cached rates")
+      rates[meter_point] = cached_rates[meter_point]
+
+  return {
+    "rates": rates,
+    "tariffs": len(fetch_plan)
+  }
+
+async def async_update_electricity_rates(data: dict, client: OctopusEnergyApiClient, store: OctopusEnergyDataStore, tariff_codes, current, period_from, period_to):
+  """Refresh the rates for each of our meters, recording how long the refresh took and which meters have new rates"""
+  started = time.monotonic()
+
+  cached_rates = data[DATA_RATES] if DATA_RATES in data else {}
+  result = await async_refresh_electricity_rates(client, store, tariff_codes, period_from, period_to, cached_rates)
+  rates = result["rates"]
+
+  duration = time.monotonic() - started
+  data[DATA_RATES_REFRESH_STATS] = {
+    "last_refresh": current,
+    "last_refresh_duration_seconds": duration,
+    "meters": len(tariff_codes),
+    "tariffs": result["tariffs"]
+  }
+  _LOGGER.debug(f"Rates for {result['tariffs']} tariff(s) across {len(tariff_codes)} meter(s) refreshed in {duration:.3f}s")
+
+  # Keep track of when the rates for each meter actually change, so calculations based on them can be reused until they do
+  rates_versions = data.setdefault(DATA_RATES_VERSIONS, {})
+  for (key, meter_rates) in rates.items():
+    if key not in cached_rates or cached_rates[key] != meter_rates:
+      rates_versions[key] = rates_versions.get(key, 0) + 1
+
+  data[DATA_RATES] = rates
+
+  return rates
+
 def setup_dependencies(hass, config):
   """Setup the coordinator and api client which will be shared by various entities"""
 
   if DATA_CLIENT not in hass.data[DOMAIN]:
     client = OctopusEnergyApiClient(config[CONFIG_MAIN_API_KEY])
     hass.data[DOMAIN][DATA_CLIENT] = client
-    hass.data[DOMAIN][DATA_ACCOUNT_ID] = config[CONFIG_MAIN_ACCOUNT_ID]
+
+    account_cache = OctopusEnergyAccountCache(client, config[CONFIG_MAIN_ACCOUNT_ID])
+    hass.data[DOMAIN][DATA_ACCOUNT] = account_cache
 
     async def async_update_electricity_rates_data():
       """Fetch data from API endpoint."""
-      # Only get data every half hour or if we don't have any data
+      # We are only refreshed by our scheduler at the start of each slot, or when new rates are expected, so
+      # we always retrieve our data
       current = now()
-      if (DATA_RATES not in hass.data[DOMAIN] or (current.minute % 30) == 0 or len(hass.data[DOMAIN][DATA_RATES]) == 0):
-
-        tariff_codes = await async_get_current_electricity_agreement_tariff_codes(client, config)
-        _LOGGER.debug(f'tariff_codes: {tariff_codes}')
-
-        period_from = as_utc(current.replace(hour=0, minute=0, second=0, microsecond=0))
-        period_to = as_utc((current + timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0))
-
-        rates = {}
-        for ((meter_point, is_smart_meter), tariff_code) in tariff_codes.items():
-          key = meter_point
-          new_rates = await client.async_get_electricity_rates(tariff_code, is_smart_meter, period_from, period_to)
-          if new_rates != None:
-            rates[key] = new_rates
-          elif (DATA_RATES in hass.data[DOMAIN] and key in hass.data[DOMAIN][DATA_RATES]):
-            _LOGGER.debug(f"Failed to retrieve new rates for {tariff_code}, so using cached rates")
-            rates[key] = hass.data[DOMAIN][DATA_RATES][key]
-        
-        hass.data[DOMAIN][DATA_RATES] = rates
-      
-      return hass.data[DOMAIN][DATA_RATES]
-
-    hass.data[DOMAIN][DATA_ELECTRICITY_RATES_COORDINATOR] = DataUpdateCoordinator(
+
+      tariff_codes = await async_get_current_electricity_agreement_tariff_codes(account_cache)
+      _LOGGER.debug(f'tariff_codes: {tariff_codes}')
+
+      period_from = as_utc(current.replace(hour=0, minute=0, second=0, microsecond=0))
+      period_to = as_utc((current + timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0))
+
+      return await async_update_electricity_rates(hass.data[DOMAIN], client, hass.data[DOMAIN][DATA_STORE], tariff_codes, current, period_from, period_to)
+
+    coordinator = DataUpdateCoordinator(
       hass,
       _LOGGER,
       name="rates",
       update_method=async_update_electricity_rates_data,
-      # Because of how we're using the data, we'll update every minute, but we will only actually retrieve
-      # data every 30 minutes
-      update_interval=timedelta(minutes=1),
+      # Our rates only change every 30 minutes, so our scheduler refreshes our data rather than polling
+      update_interval=None,
     )
+    hass.data[DOMAIN][DATA_ELECTRICITY_RATES_COORDINATOR] = coordinator
+
+    # Calculate all of our target rate sensors together each time our rates are refreshed, before they're told to update
+    planner = OctopusEnergyTargetRatePlanner()
+    hass.data[DOMAIN][DATA_TARGET_PLANNER] = planner
+
+    def plan_targets():
+      planner.plan(now(), coordinator.data, hass.data[DOMAIN].get(DATA_RATES_VERSIONS, {}))
+
+    coordinator.async_add_listener(plan_targets)
+
+  # Our coordinator is shared with our target rate sensors, which aren't reloaded with our entry, so we keep using the
+  # same scheduler and restart it if it was stopped when our entry was unloaded
+  schedulers = hass.data[DOMAIN].setdefault(DATA_SCHEDULERS, {})
+  if "rates" not in schedulers:
+    coordinator = hass.data[DOMAIN][DATA_ELECTRICITY_RATES_COORDINATOR]
+    schedulers["rates"] = OctopusEnergyScheduler(hass, "rates", coordinator.async_refresh, availability_times=RATES_AVAILABILITY_TIMES)
+
+  schedulers["rates"].start()
 
 async def options_update_listener(hass, entry):
   """Handle options update."""
@@ -130,4 +249,17 @@ async def async_unload_entry(hass, entry):
         )
     )
 
-    return unload_ok
\ No newline at end of file
+    # Our client, coordinator and planner are shared with our target rate sensors, so they're kept for when our entry is
+    # next setup. We only stop our schedulers and close our shared session, which is reopened on our next request
+    if unload_ok and CONFIG_MAIN_API_KEY in entry.data and DATA_CLIENT in hass.data[DOMAIN]:
+      schedulers = hass.data[DOMAIN].get(DATA_SCHEDULERS, {})
+      for name in list(schedulers.keys()):
+        schedulers[name].stop()
+
+        # Our consumption schedulers are recreated along with our sensors
+        if name != "rates":
+          del schedulers[name]
+
+      await hass.data[DOMAIN][DATA_CLIENT].async_close()
+
+    return unload_ok
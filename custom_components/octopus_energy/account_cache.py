@@ -0,0 +1,82 @@
+import logging
+from datetime import timedelta
+from homeassistant.util.dt import (utcnow)
+
+from .agreement_index import OctopusEnergyAgreementIndex
+
+_LOGGER = logging.getLogger(__name__)
+
+# Agreements are known about well before they start and hold when they're valid, so our account information
+# doesn't need to be refreshed often for tariff changes to be picked up
+ACCOUNT_CACHE_TTL = timedelta(hours=6)
+
+class OctopusEnergyAccountCache:
+  """Caches the account information, so it's shared by everything that needs it rather than being requested each time"""
+
+  def __init__(self, client, account_id: str, ttl: timedelta = ACCOUNT_CACHE_TTL):
+    self._client = client
+    self._account_id = account_id
+    self._ttl = ttl
+    self._account = None
+    self._expires_at = None
+    self._agreement_indexes = {}
+    self._stats = {
+      "hits": 0,
+      "refreshes": 0,
+      "failed_refreshes": 0,
+    }
+
+  def get_agreement_index(self, point):
+    """Get the parsed agreements for a meter point"""
+    agreement_index = self._agreement_indexes.get(self.__get_point_key(point))
+    if agreement_index == None:
+      # The meter point isn't part of our cached account information, so its agreements haven't been parsed
+      agreement_index = OctopusEnergyAgreementIndex(point["agreements"])
+
+    return agreement_index
+
+  def get_stats(self):
+    return {
+      **self._stats,
+      "expires_at": self._expires_at,
+    }
+
+  async def async_get_account(self, force_refresh: bool = False):
+    """Get the account information, only requesting it if our cached information has expired or a refresh is forced. The account information is shared, so must not be modified"""
+    current = utcnow()
+    if force_refresh == False and self._account != None and current < self._expires_at:
+      self._stats["hits"] += 1
+      return self._account
+
+    self._stats["refreshes"] += 1
+    account = await self._client.async_get_account(self._account_id)
+    if account == None:
+      self._stats["failed_refreshes"] += 1
+      if self._account != None:
+        _LOGGER.warning('Failed to refresh account information, so using cached account information')
+
+      return self._account
+
+    if account != self._account:
+      if self._account != None:
+        _LOGGER.info('Account information has changed')
+
+      self._agreement_indexes = self.__create_agreement_indexes(account)
+
+    self._account = account
+    self._expires_at = current + self._ttl
+    return self._account
+
+  def __create_agreement_indexes(self, account):
+    # Agreements only change with our account information, so we only need to parse them when it changes
+    agreement_indexes = {}
+    for point in account["electricity_meter_points"] + account["gas_meter_points"]:
+      agreement_indexes[self.__get_point_key(point)] = OctopusEnergyAgreementIndex(point["agreements"])
+
+    return agreement_indexes
+
+  def __get_point_key(self, point):
+    if "mpan" in point:
+      return ("electricity", point["mpan"])
+
+    return ("gas", point["mprn"])
@@ -0,0 +1,48 @@
+import math
+from bisect import bisect_right
+from datetime import datetime
+from homeassistant.util.dt import (as_utc, parse_datetime)
+
+class OctopusEnergyAgreementIndex:
+  """
+  Agreements for a single meter point, parsed once and sorted by when they start, so the tariff that applied at
+  any given time can be found with a binary search.
+  """
+
+  def __init__(self, agreements):
+    parsed_agreements = []
+    for (position, agreement) in enumerate(agreements):
+      if agreement["tariff_code"] == None:
+        continue
+
+      valid_to = math.inf
+      if "valid_to" in agreement and agreement["valid_to"] != None:
+        valid_to = as_utc(parse_datetime(agreement["valid_to"])).timestamp()
+
+      # Where agreements start at the same time, the earliest listed agreement takes priority, so it's
+      # sorted to be found first when searching backwards
+      parsed_agreements.append((as_utc(parse_datetime(agreement["valid_from"])).timestamp(), -position, valid_to, agreement["tariff_code"]))
+
+    parsed_agreements.sort()
+
+    self._starts = list(map(lambda agreement: agreement[0], parsed_agreements))
+    self._ends = list(map(lambda agreement: agreement[2], parsed_agreements))
+    self._tariff_codes = list(map(lambda agreement: agreement[3], parsed_agreements))
+
+  def __len__(self):
+    return len(self._starts)
+
+  def get_tariff_code(self, at: datetime):
+    """Get the tariff code of the latest agreement that had started and not ended at the specified time"""
+    timestamp = at.timestamp()
+
+    # Agreements shouldn't overlap, so the latest agreement to have started at our time will usually be the one that
+    # applies. If it has ended, then we carry on searching in case an earlier agreement is still running
+    index = bisect_right(self._starts, timestamp) - 1
+    while index >= 0:
+      if self._ends[index] >= timestamp:
+        return self._tariff_codes[index]
+
+      index -= 1
+
+    return None
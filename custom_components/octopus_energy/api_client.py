@@ -1,9 +1,15 @@
 import logging
 import json
+import time
+import heapq
+import asyncio
 import aiohttp
 from datetime import (timedelta)
-from homeassistant.util.dt import (as_utc, now, as_local, parse_datetime)
+from homeassistant.util.dt import (as_utc, now, utcnow, as_local, parse_datetime)
 
+from .token_manager import OctopusEnergyTokenManager
+from .response_cache import OctopusEnergyResponseCache
+from .rate_timeline import RateTimeline
 from .utils import (
   get_tariff_parts,
   get_valid_from,
@@ -12,6 +18,22 @@ from .utils import (
 
 _LOGGER = logging.getLogger(__name__)
 
+# Settings for our shared connection pool. All of our requests go to the same host, so we keep a handful of
+# connections alive and cache the DNS lookup rather than performing a new handshake for every request
+CONNECTION_LIMIT = 10
+CONNECTION_LIMIT_PER_HOST = 5
+CONNECTION_KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+
+# Settings for our response cache. Current rates only expire after a short time, so that rates requested together
+# are shared but any newly published rates are picked up on the next refresh
+RESPONSE_CACHE_MAX_SIZE = 128
+RATES_CACHE_TTL = timedelta(minutes=5)
+STANDING_CHARGE_CACHE_TTL = timedelta(hours=1)
+
+# The number of consumption intervals to request per page. A day of half hourly data is 48 intervals
+DEFAULT_CONSUMPTION_PAGE_SIZE = 1000
+
 api_token_query = '''mutation {{
 	obtainKrakenToken(input: {{ APIKey: "{api_key}" }}) {{
 		token
@@ -141,139 +163,157 @@ static_rates_account_query = '''query {{
 
 class OctopusEnergyApiClient:
 
-  def __init__(self, api_key, static_rates):
+  def __init__(self, api_key, static_rates = False):
     if (api_key == None):
       raise Exception('API KEY is not set')
 
     if static_rates:
-        account_query = static_rates_account_query
+      self._account_query = static_rates_account_query
+    else:
+      self._account_query = account_query
 
     self._api_key = api_key
     self._base_url = 'https://api.octopus.energy'
 
+    self._session = None
+    self._stats = {
+      "connections_created": 0,
+      "connections_reused": 0,
+      "token_requests": 0,
+      "day_night_requests": 0,
+      "day_night_latency_saved_seconds": 0,
+      "single_flight_hits": 0,
+      "cache_hits": 0,
+      "cache_misses": 0,
+    }
+
+    self._cache = OctopusEnergyResponseCache(RESPONSE_CACHE_MAX_SIZE)
+
+    self._in_flight_requests = {}
+
+    self._token_manager = OctopusEnergyTokenManager(self.__async_request_token)
+
+  def get_stats(self):
+    """Get the statistics of the client"""
+    stats = self._stats.copy()
+    stats["cache_size"] = len(self._cache)
+    return stats
+
+  async def async_close(self):
+    """Close the shared session, along with any open connections"""
+    if self._session is not None and self._session.closed == False:
+      await self._session.close()
+    self._session = None
+
   async def async_get_account(self, account_id):
     """Get the user's account"""
-    async with aiohttp.ClientSession() as client:
-      url = f'{self._base_url}/v1/graphql/'
-      payload = { "query": api_token_query.format(api_key=self._api_key) }
-      async with client.post(url, json=payload) as token_response:
-        token_response_body = await self.__async_read_response(token_response, url)
-        if (token_response_body != None and "data" in token_response_body):
-          token = token_response_body["data"]["obtainKrakenToken"]["token"]
-
-          # Get account response
-          payload = { "query": account_query.format(account_id=account_id) }
-          headers = { "Authorization": f"JWT {token}" }
-          async with client.post(url, json=payload, headers=headers) as account_response:
-            account_response_body = await self.__async_read_response(account_response, url)
-
-            _LOGGER.debug(account_response_body)
-
-            if (account_response_body != None and "data" in account_response_body):
-              return {
-                "electricity_meter_points": list(map(lambda mp: {
-                  "mpan": mp["meterPoint"]["mpan"],
-                  "meters": list(map(lambda m: {
-                    "serial_number": m["serialNumber"],
-                    "is_export": m["smartExportElectricityMeter"] != None,
-                    "is_smart_meter": m["smartImportElectricityMeter"] != None or m["smartExportElectricityMeter"] != None,
-                  }, mp["meterPoint"]["meters"])),
-                  "agreements": list(map(lambda a: {
-                    "valid_from": a["validFrom"],
-                    "valid_to": a["validTo"],
-                    "tariff_code": a["tariff"]["tariffCode"] if "tariffCode" in a["tariff"] else None,
-                    "standing_charge": a["tariff"]["standingCharge"] if "standingCharge" in a["tariff"] else None,
-                    "unit_rate": a["tariff"]["unitRate"] if "unitRate" in a["tariff"] else None,
-                    "day_rate": a["tariff"]["dayRate"] if "dayRate" in a["tariff"] else None,
-                    "night_rate": a["tariff"]["nightRate"] if "nightRate" in a["tariff"] else None,
-                    "off_peak_rate": a["tariff"]["offPeakRate"] if "offPeakRate" in a["tariff"] else None,
-                  }, mp["meterPoint"]["agreements"]))
-                }, account_response_body["data"]["account"]["electricityAgreements"])),
-                "gas_meter_points": list(map(lambda mp: {
-                  "mprn": mp["meterPoint"]["mprn"],
-                  "meters": list(map(lambda m: {
-                    "serial_number": m["serialNumber"],
-                  }, mp["meterPoint"]["meters"])),
-                  "agreements": list(map(lambda a: {
-                    "valid_from": a["validFrom"],
-                    "valid_to": a["validTo"],
-                    "tariff_code": a["tariff"]["tariffCode"] if "tariffCode" in a["tariff"] else None,
-                    "standing_charge": a["tariff"]["standingCharge"] if "standingCharge" in a["tariff"] else None,
-                    "unit_rate": a["tariff"]["unitRate"] if "unitRate" in a["tariff"] else None,
-                  }, mp["meterPoint"]["agreements"]))
-                }, account_response_body["data"]["account"]["gasAgreements"])),
-              }
-            else:
-              _LOGGER.error("Failed to retrieve account")
-        
-        else:
-          _LOGGER.error("Failed to retrieve auth token")
+    return await self.__async_single_flight(
+      ("account", account_id),
+      lambda: self.__async_get_account(account_id)
+    )
+
+  async def __async_get_account(self, account_id):
+    account_response_body = await self.__async_graphql_query(self._account_query.format(account_id=account_id))
+
+    _LOGGER.debug(account_response_body)
+
+    if (account_response_body != None and "data" in account_response_body):
+      return {
+        "electricity_meter_points": list(map(lambda mp: {
+          "mpan": mp["meterPoint"]["mpan"],
+          "meters": list(map(lambda m: {
+            "serial_number": m["serialNumber"],
+            "is_export": m["smartExportElectricityMeter"] != None,
+            "is_smart_meter": m["smartImportElectricityMeter"] != None or m["smartExportElectricityMeter"] != None,
+          }, mp["meterPoint"]["meters"])),
+          "agreements": list(map(lambda a: {
+            "valid_from": a["validFrom"],
+            "valid_to": a["validTo"],
+            "tariff_code": a["tariff"]["tariffCode"] if "tariffCode" in a["tariff"] else None,
+            "standing_charge": a["tariff"]["standingCharge"] if "standingCharge" in a["tariff"] else None,
+            "unit_rate": a["tariff"]["unitRate"] if "unitRate" in a["tariff"] else None,
+            "day_rate": a["tariff"]["dayRate"] if "dayRate" in a["tariff"] else None,
+            "night_rate": a["tariff"]["nightRate"] if "nightRate" in a["tariff"] else None,
+            "off_peak_rate": a["tariff"]["offPeakRate"] if "offPeakRate" in a["tariff"] else None,
+          }, mp["meterPoint"]["agreements"]))
+        }, account_response_body["data"]["account"]["electricityAgreements"])),
+        "gas_meter_points": list(map(lambda mp: {
+          "mprn": mp["meterPoint"]["mprn"],
+          "meters": list(map(lambda m: {
+            "serial_number": m["serialNumber"],
+          }, mp["meterPoint"]["meters"])),
+          "agreements": list(map(lambda a: {
+            "valid_from": a["validFrom"],
+            "valid_to": a["validTo"],
+            "tariff_code": a["tariff"]["tariffCode"] if "tariffCode" in a["tariff"] else None,
+            "standing_charge": a["tariff"]["standingCharge"] if "standingCharge" in a["tariff"] else None,
+            "unit_rate": a["tariff"]["unitRate"] if "unitRate" in a["tariff"] else None,
+          }, mp["meterPoint"]["agreements"]))
+        }, account_response_body["data"]["account"]["gasAgreements"])),
+      }
+    else:
+      _LOGGER.error("Failed to retrieve account")
     
     return None
 
   async def async_get_electricity_standard_rates(self, product_code, tariff_code, period_from, period_to): 
     """Get the current standard rates"""
     results = []
-    async with aiohttp.ClientSession() as client:
-      auth = aiohttp.BasicAuth(self._api_key, '')
-      url = f'{self._base_url}/v1/products/{product_code}/electricity-tariffs/{tariff_code}/standard-unit-rates?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-      async with client.get(url, auth=auth) as response:
-        try:
-          data = await self.__async_read_response(response, url)
-          if data == None:
-            return None
-          results = rates_to_thirty_minute_increments(data, period_from, period_to, tariff_code)
-        except:
-          _LOGGER.error(f'Failed to extract standard rates: {url}')
-          raise
+    client = self.__get_session()
+    auth = aiohttp.BasicAuth(self._api_key, '')
+    url = f'{self._base_url}/v1/products/{product_code}/electricity-tariffs/{tariff_code}/standard-unit-rates?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
+    async with client.get(url, auth=auth) as response:
+      try:
+        data = await self.__async_read_response(response, url)
+        if data == None:
+          return None
+        results = rates_to_thirty_minute_increments(data, period_from, period_to, tariff_code, run_length_encoded=True)
+      except:
+        _LOGGER.error(f'Failed to extract standard rates: {url}')
+        raise
 
     return results
 
   async def async_get_electricity_day_night_rates(self, product_code, tariff_code, is_smart_meter, period_from, period_to):
     """Get the current day and night rates"""
-    results = []
-    async with aiohttp.ClientSession() as client:
-      auth = aiohttp.BasicAuth(self._api_key, '')
-      url = f'{self._base_url}/v1/products/{product_code}/electricity-tariffs/{tariff_code}/day-unit-rates?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-      async with client.get(url, auth=auth) as response:
-        try:
-          data = await self.__async_read_response(response, url)
-          if data == None:
-            return None
-
-          # Normalise the rates to be in 30 minute increments and remove any rates that fall outside of our day period 
-          day_rates = rates_to_thirty_minute_increments(data, period_from, period_to, tariff_code)
-          for rate in day_rates:
-            if (self.__is_night_rate(rate, is_smart_meter)) == False:
-              results.append(rate)
-        except:
-          _LOGGER.error(f'Failed to extract day rates: {url}')
-          raise
-
-      url = f'{self._base_url}/v1/products/{product_code}/electricity-tariffs/{tariff_code}/night-unit-rates?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-      async with client.get(url, auth=auth) as response:
-        try:
-          data = await self.__async_read_response(response, url)
-          if data == None:
-            return None
-
-          # Normalise the rates to be in 30 minute increments and remove any rates that fall outside of our night period 
-          night_rates = rates_to_thirty_minute_increments(data, period_from, period_to, tariff_code)
-          for rate in night_rates:
-            if (self.__is_night_rate(rate, is_smart_meter)) == True:
-              results.append(rate)
-        except:
-          _LOGGER.error(f'Failed to extract night rates: {url}')
-          raise
-
-    # Because we retrieve our day and night periods separately over a 2 day period, we need to sort our rates 
-    results.sort(key=get_valid_from)
+    day_url = f'{self._base_url}/v1/products/{product_code}/electricity-tariffs/{tariff_code}/day-unit-rates?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
+    night_url = f'{self._base_url}/v1/products/{product_code}/electricity-tariffs/{tariff_code}/night-unit-rates?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
+
+    # Our day and night rates are independent, so retrieve them at the same time
+    started = time.monotonic()
+    ((day_rates, day_duration), (night_rates, night_duration)) = await asyncio.gather(
+      self.__async_get_timed_rates(day_url, period_from, period_to, tariff_code, "day"),
+      self.__async_get_timed_rates(night_url, period_from, period_to, tariff_code, "night")
+    )
+    duration = time.monotonic() - started
+
+    self._stats["day_night_requests"] += 1
+    self._stats["day_night_latency_saved_seconds"] += max(0, (day_duration + night_duration) - duration)
+
+    if day_rates == None or night_rates == None:
+      return None
+
+    # Remove any rates that fall outside of our day and night periods respectively
+    day_rates = [rate for rate in day_rates if self.__is_night_rate(rate, is_smart_meter) == False]
+    night_rates = [rate for rate in night_rates if self.__is_night_rate(rate, is_smart_meter) == True]
+
+    # Because we retrieve our day and night periods separately over a 2 day period, we need to merge our rates.
+    # Both sets are already in order, so we don't need to perform a full sort
+    results = RateTimeline.from_rates(heapq.merge(day_rates, night_rates, key=get_valid_from), run_length_encoded=True)
     _LOGGER.debug(results)
 
     return results
 
   async def async_get_electricity_rates(self, tariff_code, is_smart_meter, period_from, period_to):
     """Get the current rates"""
+    return await self.__async_get_cached(
+      ("electricity_rates", tariff_code, is_smart_meter, period_from, period_to),
+      period_to,
+      RATES_CACHE_TTL,
+      lambda: self.__async_get_electricity_rates(tariff_code, is_smart_meter, period_from, period_to)
+    )
+
+  async def __async_get_electricity_rates(self, tariff_code, is_smart_meter, period_from, period_to):
 
     tariff_parts = get_tariff_parts(tariff_code)
     product_code = tariff_parts["product_code"]
@@ -283,135 +323,207 @@ class OctopusEnergyApiClient:
     else:
       return await self.async_get_electricity_day_night_rates(product_code, tariff_code, is_smart_meter, period_from, period_to)
 
-  async def async_get_electricity_consumption(self, mpan, serial_number, period_from, period_to):
+  async def async_get_electricity_consumption(self, mpan, serial_number, period_from, period_to, page_size = DEFAULT_CONSUMPTION_PAGE_SIZE):
     """Get the current electricity consumption"""
-    async with aiohttp.ClientSession() as client:
-      auth = aiohttp.BasicAuth(self._api_key, '')
-      url = f'{self._base_url}/v1/electricity-meter-points/{mpan}/meters/{serial_number}/consumption?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-      async with client.get(url, auth=auth) as response:
-        
-        data = await self.__async_read_response(response, url)
-        if (data != None and "results" in data):
-          data = data["results"]
-          results = []
-          for item in data:
-            item = self.__process_consumption(item)
-
-            # For some reason, the end point returns slightly more data than we requested, so we need to filter out
-            # the results
-            if as_utc(item["interval_start"]) >= period_from and as_utc(item["interval_end"]) <= period_to:
-              results.append(item)
-          
-          results.sort(key=self.__get_interval_end)
-          return results
-        
-        return None
+    url = self.__get_electricity_consumption_url(mpan, serial_number, period_from, period_to, page_size)
+    return await self.__async_get_consumption(url, period_from, period_to)
+
+  async def async_iter_electricity_consumption(self, mpan, serial_number, period_from, period_to, page_size = DEFAULT_CONSUMPTION_PAGE_SIZE):
+    """Iterate through the electricity consumption, yielding each interval as its page is retrieved"""
+    url = self.__get_electricity_consumption_url(mpan, serial_number, period_from, period_to, page_size)
+    async for item in self.__async_iter_consumption(url, period_from, period_to):
+      yield item
 
   async def async_get_gas_rates(self, tariff_code, period_from, period_to):
     """Get the gas rates"""
+    return await self.__async_get_cached(
+      ("gas_rates", tariff_code, period_from, period_to),
+      period_to,
+      RATES_CACHE_TTL,
+      lambda: self.__async_get_gas_rates(tariff_code, period_from, period_to)
+    )
+
+  async def __async_get_gas_rates(self, tariff_code, period_from, period_to):
     tariff_parts = get_tariff_parts(tariff_code)
     product_code = tariff_parts["product_code"]
 
     results = []
-    async with aiohttp.ClientSession() as client:
-      auth = aiohttp.BasicAuth(self._api_key, '')
-      url = f'{self._base_url}/v1/products/{product_code}/gas-tariffs/{tariff_code}/standard-unit-rates?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-      async with client.get(url, auth=auth) as response:
-        try:
-          data = await self.__async_read_response(response, url)
-          if data == None:
-            return None
+    client = self.__get_session()
+    auth = aiohttp.BasicAuth(self._api_key, '')
+    url = f'{self._base_url}/v1/products/{product_code}/gas-tariffs/{tariff_code}/standard-unit-rates?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
+    async with client.get(url, auth=auth) as response:
+      try:
+        data = await self.__async_read_response(response, url)
+        if data == None:
+          return None
 
-          results = rates_to_thirty_minute_increments(data, period_from, period_to, tariff_code)
-        except:
-          _LOGGER.error(f'Failed to extract standard gas rates: {url}')
-          raise
+        results = rates_to_thirty_minute_increments(data, period_from, period_to, tariff_code, run_length_encoded=True)
+      except:
+        _LOGGER.error(f'Failed to extract standard gas rates: {url}')
+        raise
 
     return results
 
-  async def async_get_gas_consumption(self, mprn, serial_number, period_from, period_to):
-    """Get the current gas rates"""
-    async with aiohttp.ClientSession() as client:
-      auth = aiohttp.BasicAuth(self._api_key, '')
-      url = f'{self._base_url}/v1/gas-meter-points/{mprn}/meters/{serial_number}/consumption?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-      async with client.get(url, auth=auth) as response:
-        data = await self.__async_read_response(response, url)
-        if (data != None and "results" in data):
-          data = data["results"]
-          results = []
-          for item in data:
-            item = self.__process_consumption(item)
-
-            # For some reason, the end point returns slightly more data than we requested, so we need to filter out
-            # the results
-            if as_utc(item["interval_start"]) >= period_from and as_utc(item["interval_end"]) <= period_to:
-              results.append(item)
-          
-          results.sort(key=self.__get_interval_end)
-          return results
-        
-        return None
+  async def async_get_gas_consumption(self, mprn, serial_number, period_from, period_to, page_size = DEFAULT_CONSUMPTION_PAGE_SIZE):
+    """Get the current gas consumption"""
+    url = self.__get_gas_consumption_url(mprn, serial_number, period_from, period_to, page_size)
+    return await self.__async_get_consumption(url, period_from, period_to)
+
+  async def async_iter_gas_consumption(self, mprn, serial_number, period_from, period_to, page_size = DEFAULT_CONSUMPTION_PAGE_SIZE):
+    """Iterate through the gas consumption, yielding each interval as its page is retrieved"""
+    url = self.__get_gas_consumption_url(mprn, serial_number, period_from, period_to, page_size)
+    async for item in self.__async_iter_consumption(url, period_from, period_to):
+      yield item
 
   async def async_get_products(self, is_variable):
     """Get all products"""
-    async with aiohttp.ClientSession() as client:
-      auth = aiohttp.BasicAuth(self._api_key, '')
-      url = f'{self._base_url}/v1/products?is_variable={is_variable}'
-      async with client.get(url, auth=auth) as response:
-        data = await self.__async_read_response(response, url)
-        if (data != None and "results" in data):
-          return data["results"]
+    client = self.__get_session()
+    auth = aiohttp.BasicAuth(self._api_key, '')
+    url = f'{self._base_url}/v1/products?is_variable={is_variable}'
+    async with client.get(url, auth=auth) as response:
+      data = await self.__async_read_response(response, url)
+      if (data != None and "results" in data):
+        return data["results"]
 
     return []
 
   async def async_get_electricity_standing_charge(self, tariff_code, period_from, period_to):
     """Get the electricity standing charges"""
+    return await self.__async_get_cached(
+      ("electricity_standing_charge", tariff_code, period_from, period_to),
+      period_to,
+      STANDING_CHARGE_CACHE_TTL,
+      lambda: self.__async_get_electricity_standing_charge(tariff_code, period_from, period_to)
+    )
+
+  async def __async_get_electricity_standing_charge(self, tariff_code, period_from, period_to):
     tariff_parts = get_tariff_parts(tariff_code)
     product_code = tariff_parts["product_code"]
     
     result = None
-    async with aiohttp.ClientSession() as client:
-      auth = aiohttp.BasicAuth(self._api_key, '')
-      url = f'{self._base_url}/v1/products/{product_code}/electricity-tariffs/{tariff_code}/standing-charges?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-      async with client.get(url, auth=auth) as response:
-        try:
-          data = await self.__async_read_response(response, url)
-          if (data != None and "results" in data and len(data["results"]) > 0):
-            result = {
-              "value_exc_vat": float(data["results"][0]["value_exc_vat"]),
-              "value_inc_vat": float(data["results"][0]["value_inc_vat"])
-            }
-        except:
-          _LOGGER.error(f'Failed to extract electricity standing charges: {url}')
-          raise
+    client = self.__get_session()
+    auth = aiohttp.BasicAuth(self._api_key, '')
+    url = f'{self._base_url}/v1/products/{product_code}/electricity-tariffs/{tariff_code}/standing-charges?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
+    async with client.get(url, auth=auth) as response:
+      try:
+        data = await self.__async_read_response(response, url)
+        if (data != None and "results" in data and len(data["results"]) > 0):
+          result = {
+            "value_exc_vat": float(data["results"][0]["value_exc_vat"]),
+            "value_inc_vat": float(data["results"][0]["value_inc_vat"])
+          }
+      except:
+        _LOGGER.error(f'Failed to extract electricity standing charges: {url}')
+        raise
 
     return result
 
   async def async_get_gas_standing_charge(self, tariff_code, period_from, period_to):
     """Get the gas standing charges"""
+    return await self.__async_get_cached(
+      ("gas_standing_charge", tariff_code, period_from, period_to),
+      period_to,
+      STANDING_CHARGE_CACHE_TTL,
+      lambda: self.__async_get_gas_standing_charge(tariff_code, period_from, period_to)
+    )
+
+  async def __async_get_gas_standing_charge(self, tariff_code, period_from, period_to):
     tariff_parts = get_tariff_parts(tariff_code)
     product_code = tariff_parts["product_code"]
 
     result = None
-    async with aiohttp.ClientSession() as client:
-      auth = aiohttp.BasicAuth(self._api_key, '')
-      url = f'{self._base_url}/v1/products/{product_code}/gas-tariffs/{tariff_code}/standing-charges?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-      async with client.get(url, auth=auth) as response:
-        try:
-          data = await self.__async_read_response(response, url)
-          if (data != None and "results" in data and len(data["results"]) > 0):
-            result = {
-              "value_exc_vat": float(data["results"][0]["value_exc_vat"]),
-              "value_inc_vat": float(data["results"][0]["value_inc_vat"])
-            }
-        except:
-          _LOGGER.error(f'Failed to extract gas standing charges: {url}')
-          raise
+    client = self.__get_session()
+    auth = aiohttp.BasicAuth(self._api_key, '')
+    url = f'{self._base_url}/v1/products/{product_code}/gas-tariffs/{tariff_code}/standing-charges?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}'
+    async with client.get(url, auth=auth) as response:
+      try:
+        data = await self.__async_read_response(response, url)
+        if (data != None and "results" in data and len(data["results"]) > 0):
+          result = {
+            "value_exc_vat": float(data["results"][0]["value_exc_vat"]),
+            "value_inc_vat": float(data["results"][0]["value_inc_vat"])
+          }
+      except:
+        _LOGGER.error(f'Failed to extract gas standing charges: {url}')
+        raise
 
     return result
 
-  def __get_interval_end(self, item):
-    return item["interval_end"]
+  async def __async_get_timed_rates(self, url, period_from, period_to, tariff_code, description):
+    """Get the rates for the provided url, along with how long the request took"""
+    started = time.monotonic()
+    client = self.__get_session()
+    auth = aiohttp.BasicAuth(self._api_key, '')
+    async with client.get(url, auth=auth) as response:
+      try:
+        data = await self.__async_read_response(response, url)
+        if data == None:
+          return (None, time.monotonic() - started)
+
+        # Normalise the rates to be in 30 minute increments
+        rates = rates_to_thirty_minute_increments(data, period_from, period_to, tariff_code, run_length_encoded=True)
+      except:
+        _LOGGER.error(f'Failed to extract {description} rates: {url}')
+        raise
+
+    return (rates, time.monotonic() - started)
+
+  def __get_electricity_consumption_url(self, mpan, serial_number, period_from, period_to, page_size):
+    return f'{self._base_url}/v1/electricity-meter-points/{mpan}/meters/{serial_number}/consumption?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}&page_size={page_size}&order_by=period'
+
+  def __get_gas_consumption_url(self, mprn, serial_number, period_from, period_to, page_size):
+    return f'{self._base_url}/v1/gas-meter-points/{mprn}/meters/{serial_number}/consumption?period_from={period_from.strftime("%Y-%m-%dT%H:%M:%SZ")}&period_to={period_to.strftime("%Y-%m-%dT%H:%M:%SZ")}&page_size={page_size}&order_by=period'
+
+  async def __async_get_consumption(self, url, period_from, period_to):
+    # Our url contains all of our parameters, so is enough to identify identical requests
+    return await self.__async_single_flight(
+      ("consumption", url),
+      lambda: self.__async_get_consumption_pages(url, period_from, period_to)
+    )
+
+  async def __async_get_consumption_pages(self, url, period_from, period_to):
+    results = []
+    async for page in self.__async_iter_consumption_pages(url, period_from, period_to):
+      if page == None:
+        return None
+
+      # We request our consumption ordered by period, so our pages are already in order
+      results.extend(page)
+
+    return results
+
+  async def __async_iter_consumption(self, url, period_from, period_to):
+    async for page in self.__async_iter_consumption_pages(url, period_from, period_to):
+      if page == None:
+        raise Exception(f'Failed to retrieve consumption: {url}')
+
+      for item in page:
+        yield item
+
+  async def __async_iter_consumption_pages(self, url, period_from, period_to):
+    """Follow the paginated consumption results, yielding the normalised intervals of each page. None is yielded if a page fails"""
+    client = self.__get_session()
+    auth = aiohttp.BasicAuth(self._api_key, '')
+    while url != None:
+      async with client.get(url, auth=auth) as response:
+        data = await self.__async_read_response(response, url)
+
+      if (data == None or "results" not in data):
+        yield None
+        return
+
+      results = []
+      for item in data["results"]:
+        item = self.__process_consumption(item)
+
+        # For some reason, the end point returns slightly more data than we requested, so we need to filter out
+        # the results
+        if as_utc(item["interval_start"]) >= period_from and as_utc(item["interval_end"]) <= period_to:
+          results.append(item)
+
+      yield results
+
+      url = data["next"] if "next" in data else None
 
   def __is_night_rate(self, rate, is_smart_meter):
     # Normally the economy seven night rate is between 12am and 7am UK time
@@ -451,6 +563,115 @@ class OctopusEnergyApiClient:
       "interval_end": as_utc(parse_datetime(item["interval_end"]))
     }
 
+  async def __async_get_cached(self, key, period_to, ttl, async_request):
+    """Get the response from our cache if available, otherwise request and cache it"""
+    result = self._cache.get(key)
+    if result is not None:
+      self._stats["cache_hits"] += 1
+      return result
+
+    self._stats["cache_misses"] += 1
+    result = await self.__async_single_flight(key, async_request)
+    if result is not None:
+      # Rates and standing charges don't change once they've been published, so if our period has passed it can be
+      # cached until it's evicted. Otherwise, we cache for a short time as new rates may still be published
+      current = utcnow()
+      expires_at = None if period_to <= current else current + ttl
+      self._cache.set(key, result, expires_at)
+
+    return result
+
+  async def __async_single_flight(self, key, async_request):
+    """Share the result of an identical request that is already in flight, rather than making a duplicate request"""
+    if key in self._in_flight_requests:
+      self._stats["single_flight_hits"] += 1
+      _LOGGER.debug(f'Sharing in flight request: {key}')
+    else:
+      task = asyncio.get_running_loop().create_task(async_request())
+      task.add_done_callback(lambda _: self._in_flight_requests.pop(key, None))
+      self._in_flight_requests[key] = task
+
+    # Shield the request so a cancelled caller doesn't cancel the request for everyone else waiting on it
+    return await asyncio.shield(self._in_flight_requests[key])
+
+  async def __async_request_token(self):
+    """Request a new Kraken token for authenticating our GraphQL queries"""
+    self._stats["token_requests"] += 1
+
+    client = self.__get_session()
+    url = f'{self._base_url}/v1/graphql/'
+    payload = { "query": api_token_query.format(api_key=self._api_key) }
+    async with client.post(url, json=payload) as token_response:
+      token_response_body = await self.__async_read_response(token_response, url)
+      if (token_response_body != None and "data" in token_response_body):
+        return token_response_body["data"]["obtainKrakenToken"]["token"]
+
+    return None
+
+  async def __async_graphql_query(self, query):
+    """Perform a GraphQL query, authenticating with our cached Kraken token"""
+    client = self.__get_session()
+    url = f'{self._base_url}/v1/graphql/'
+    payload = { "query": query }
+
+    response_body = None
+    for attempt in range(2):
+      token = await self._token_manager.async_get_token()
+      if token == None:
+        _LOGGER.error("Failed to retrieve auth token")
+        return None
+
+      headers = { "Authorization": f"JWT {token}" }
+      async with client.post(url, json=payload, headers=headers) as response:
+        response_body = await self.__async_read_response(response, url)
+
+      # Our token could have been revoked before it was due to expire, so request a new one and try again
+      if self.__is_authorization_error(response_body) == False:
+        break
+
+      _LOGGER.debug('Kraken token rejected, requesting a new token')
+      self._token_manager.invalidate()
+
+    return response_body
+
+  def __is_authorization_error(self, response_body):
+    if response_body == None or "errors" not in response_body:
+      return False
+
+    for error in response_body["errors"]:
+      if "extensions" in error and error["extensions"] != None and error["extensions"].get("errorType") == "AUTHORIZATION":
+        return True
+
+    return False
+
+  def __get_session(self):
+    """Get the shared session, creating it if it doesn't exist or has been closed"""
+    if self._session is None or self._session.closed:
+      connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout=CONNECTION_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=DNS_CACHE_TTL
+      )
+
+      trace_config = aiohttp.TraceConfig()
+      trace_config.on_connection_create_end.append(self.__async_on_connection_created)
+      trace_config.on_connection_reuseconn.append(self.__async_on_connection_reused)
+
+      self._session = aiohttp.ClientSession(
+        connector=connector,
+        headers={ "Accept-Encoding": "gzip" },
+        trace_configs=[trace_config]
+      )
+
+    return self._session
+
+  async def __async_on_connection_created(self, session, trace_config_ctx, params):
+    self._stats["connections_created"] += 1
+
+  async def __async_on_connection_reused(self, session, trace_config_ctx, params):
+    self._stats["connections_reused"] += 1
+
   async def __async_read_response(self, response, url):
     """Reads the response, logging any json errors"""
 
@@ -1,10 +1,9 @@
 from datetime import timedelta
-import math
 import logging
 from custom_components.octopus_energy.utils import apply_offset
 
 from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.util.dt import (utcnow, now, as_utc, parse_datetime)
+from homeassistant.util.dt import (utcnow, now)
 from homeassistant.helpers.update_coordinator import (
   CoordinatorEntity
 )
@@ -16,26 +15,20 @@ from .const import (
   DOMAIN,
 
   CONFIG_TARGET_NAME,
-  CONFIG_TARGET_HOURS,
-  CONFIG_TARGET_TYPE,
-  CONFIG_TARGET_START_TIME,
-  CONFIG_TARGET_END_TIME,
-  CONFIG_TARGET_MPAN,
-  CONFIG_TARGET_ROLLING_TARGET,
-
-  DATA_ELECTRICITY_RATES_COORDINATOR
+
+  DATA_ELECTRICITY_RATES_COORDINATOR,
+  DATA_RATES_VERSIONS,
+  DATA_TARGET_PLANNER
 )
 
+from .scheduler import OctopusEnergyScheduler
 from .target_sensor_utils import (
-  calculate_continuous_times,
-  calculate_intermittent_times,
-  is_target_rate_active
+  create_target_schedule,
+  is_target_schedule_active
 )
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(minutes=1)
-
 async def async_setup_entry(hass, entry, async_add_entities):
   """Setup sensors based on our entry"""
 
@@ -68,6 +61,8 @@ class OctopusEnergyTargetRate(CoordinatorEntity, BinarySensorEntity):
     self._config = config
     self._attributes = self._config.copy()
     self._target_rates = []
+    self._target_schedule = create_target_schedule([])
+    self._planner = None
 
   @property
   def unique_id(self):
@@ -89,89 +84,70 @@ class OctopusEnergyTargetRate(CoordinatorEntity, BinarySensorEntity):
     """Attributes of the sensor."""
     return self._attributes
 
-  @property
-  def is_on(self):
-    """The state of the sensor."""
+  async def async_added_to_hass(self):
+    """Call when entity about to be added to hass."""
+    await super().async_added_to_hass()
 
+    # Our target times are calculated along with all other targets after our rates are refreshed. We keep hold of the
+    # planner we're registered with, as that's the one that will tell us about our target times
+    self._planner = self.hass.data[DOMAIN][DATA_TARGET_PLANNER]
+    self.async_on_remove(self._planner.register(self.unique_id, self._config, self.__is_plan_due, self.__on_planned))
+    self.__plan()
+
+    # Our target can only turn on or off at the start of a slot, shifted by our offset, so we only need to update then
+    # rather than polling
+    offset = timedelta(0)
     if CONFIG_TARGET_OFFSET in self._config:
-      offset = self._config[CONFIG_TARGET_OFFSET]
-    else:
-      offset = None
+      current = utcnow()
+      offset = apply_offset(current, self._config[CONFIG_TARGET_OFFSET]) - current
+
+    scheduler = OctopusEnergyScheduler(self.hass, self.unique_id, self.__async_scheduled_update, offset)
+    scheduler.start()
+    self.async_on_remove(scheduler.stop)
+
+  async def __async_scheduled_update(self):
+    # Our rates may not have been refreshed since our target times passed, so make sure our targets are up to date
+    self.__plan()
+    self.async_write_ha_state()
+
+  def __plan(self):
+    self._planner.plan(now(), self.coordinator.data, self.hass.data[DOMAIN].get(DATA_RATES_VERSIONS, {}), [self.unique_id])
 
-    # Find the current rate. Rates change a maximum of once every 30 minutes.
+  def __is_plan_due(self):
+    # If all of our target times have passed, it's time to recalculate the next set
     current_date = utcnow()
-    if (current_date.minute % 30) == 0 or len(self._target_rates) == 0:
-      _LOGGER.debug(f'Updating OctopusEnergyTargetRate {self._config[CONFIG_TARGET_NAME]}')
-
-      # If all of our target times have passed, it's time to recalculate the next set
-      all_rates_in_past = True
-      for rate in self._target_rates:
-        if rate["valid_to"] > current_date:
-          all_rates_in_past = False
-          break
-      
-      if all_rates_in_past:
-        if self.coordinator.data != None:
-          all_rates = self.coordinator.data
-          
-          # Retrieve our rates. For backwards compatibility, if CONFIG_TARGET_MPAN is not set, then pick the first set
-          if CONFIG_TARGET_MPAN not in self._config:
-            _LOGGER.debug(f"'CONFIG_TARGET_MPAN' not set.'{len(all_rates)}' rates available. Retrieving the first rate.")
-            all_rates = next(iter(all_rates.values()))
-          else:
-            _LOGGER.debug(f"Retrieving rates for '{self._config[CONFIG_TARGET_MPAN]}'")
-            all_rates = all_rates.get(self._config[CONFIG_TARGET_MPAN])
-        else:
-          _LOGGER.debug(f"Rate data missing. Setting to empty string")
-          all_rates = []
-
-        _LOGGER.debug(f'{len(all_rates) if all_rates != None else None} rate periods found')
-
-        start_time = None
-        if CONFIG_TARGET_START_TIME in self._config:
-          start_time = self._config[CONFIG_TARGET_START_TIME]
-
-        end_time = None
-        if CONFIG_TARGET_END_TIME in self._config:
-          end_time = self._config[CONFIG_TARGET_END_TIME]
-
-        # True by default for backwards compatibility
-        is_rolling_target = True
-        if CONFIG_TARGET_ROLLING_TARGET in self._config:
-          is_rolling_target = self._config[CONFIG_TARGET_ROLLING_TARGET]     
-
-        target_hours = float(self._config[CONFIG_TARGET_HOURS])
-
-        if (self._config[CONFIG_TARGET_TYPE] == "Continuous"):
-          self._target_rates = calculate_continuous_times(
-            now(),
-            start_time,
-            end_time,
-            target_hours,
-            all_rates,
-            offset,
-            is_rolling_target
-          )
-        elif (self._config[CONFIG_TARGET_TYPE] == "Intermittent"):
-          self._target_rates = calculate_intermittent_times(
-            now(),
-            start_time,
-            end_time,
-            target_hours,
-            all_rates,
-            offset,
-            is_rolling_target
-          )
-        else:
-          _LOGGER.error(f"Unexpected target type: {self._config[CONFIG_TARGET_TYPE]}")
-
-        self._attributes["target_times"] = self._target_rates
-
-    active_result = is_target_rate_active(current_date, self._target_rates, offset)
-
-    if offset != None and active_result["next_time"] != None:
-      self._attributes["next_time"] = apply_offset(active_result["next_time"], offset)
+    for rate in self._target_rates:
+      if rate["valid_to"] > current_date:
+        return False
+
+    return True
+
+  def __on_planned(self, result):
+    _LOGGER.debug(f'Updating OctopusEnergyTargetRate {self._config[CONFIG_TARGET_NAME]}')
+
+    if result["is_cached"]:
+      self._attributes["target_times_cache_hits"] = self._attributes.get("target_times_cache_hits", 0) + 1
     else:
-      self._attributes["next_time"] = active_result["next_time"]
+      self._attributes["target_times_cache_misses"] = self._attributes.get("target_times_cache_misses", 0) + 1
+
+    if result["candidates"] != None:
+      # Expose the next best blocks, so automations can fall back to them
+      self._attributes["candidate_times"] = list(map(lambda candidate: {
+        "valid_from": candidate["rates"][0]["valid_from"],
+        "valid_to": candidate["rates"][-1]["valid_to"],
+        "total_value_inc_vat": candidate["total"]
+      }, result["candidates"]))
+
+    self._target_rates = result["target_rates"]
+    self._attributes["target_times"] = list(map(dict, self._target_rates))
+    self._target_schedule = create_target_schedule(self._target_rates, self._config[CONFIG_TARGET_OFFSET] if CONFIG_TARGET_OFFSET in self._config else None)
+
+  @property
+  def is_on(self):
+    """The state of the sensor."""
+
+    # Our schedule has our offset applied, so our next time is already shifted
+    active_result = is_target_schedule_active(utcnow(), self._target_schedule)
+    self._attributes["next_time"] = active_result["next_time"]
 
-    return active_result["is_active"]
\ No newline at end of file
+    return active_result["is_active"]
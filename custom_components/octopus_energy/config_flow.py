@@ -26,8 +26,7 @@ from .const import (
   CONFIG_SMETS1,
 
   DATA_SCHEMA_ACCOUNT,
-  DATA_CLIENT,
-  DATA_ACCOUNT_ID,
+  DATA_ACCOUNT,
 
   REGEX_TIME,
   REGEX_ENTITY_NAME,
@@ -85,6 +84,8 @@ class OctopusEnergyConfigFlow(ConfigFlow, domain=DOMAIN):
 
     client = OctopusEnergyApiClient(user_input[CONFIG_MAIN_API_KEY])
     account_info = await client.async_get_account(user_input[CONFIG_MAIN_ACCOUNT_ID])
+    await client.async_close()
+
     if (account_info == None):
       errors[CONFIG_MAIN_ACCOUNT_ID] = "account_not_found"
       return self.async_show_form(
@@ -98,14 +99,14 @@ class OctopusEnergyConfigFlow(ConfigFlow, domain=DOMAIN):
     )
 
   async def async_setup_target_rate_schema(self):
-    client = self.hass.data[DOMAIN][DATA_CLIENT]
-    account_info = await client.async_get_account(self.hass.data[DOMAIN][DATA_ACCOUNT_ID])
+    account_cache = self.hass.data[DOMAIN][DATA_ACCOUNT]
+    account_info = await account_cache.async_get_account()
 
     meters = []
     now = utcnow()
     if len(account_info["electricity_meter_points"]) > 0:
       for point in account_info["electricity_meter_points"]:
-        active_tariff_code = get_active_tariff_code(now, point["agreements"])
+        active_tariff_code = get_active_tariff_code(now, account_cache.get_agreement_index(point))
         if active_tariff_code != None:
           meters.append(point["mpan"])
 
@@ -183,14 +184,14 @@ class OptionsFlowHandler(OptionsFlow):
     self._entry = entry
 
   async def __async_setup_target_rate_schema(self, config, errors):
-    client = self.hass.data[DOMAIN][DATA_CLIENT]
-    account_info = await client.async_get_account(self.hass.data[DOMAIN][DATA_ACCOUNT_ID])
+    account_cache = self.hass.data[DOMAIN][DATA_ACCOUNT]
+    account_info = await account_cache.async_get_account()
 
     meters = []
     now = utcnow()
     if len(account_info["electricity_meter_points"]) > 0:
       for point in account_info["electricity_meter_points"]:
-        active_tariff_code = get_active_tariff_code(now, point["agreements"])
+        active_tariff_code = get_active_tariff_code(now, account_cache.get_agreement_index(point))
         if active_tariff_code != None:
           meters.append(point["mpan"])
 
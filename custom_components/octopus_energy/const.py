@@ -19,8 +19,13 @@ DATA_CONFIG = "CONFIG"
 DATA_ELECTRICITY_RATES_COORDINATOR = "ELECTRICITY_RATES_COORDINATOR"
 DATA_CLIENT = "CLIENT"
 DATA_RATES = "RATES"
+DATA_RATES_VERSIONS = "RATES_VERSIONS"
+DATA_RATES_REFRESH_STATS = "RATES_REFRESH_STATS"
 DATA_GAS_TARIFF_CODE = "GAS_TARIFF_CODE"
-DATA_ACCOUNT_ID = "ACCOUNT_ID"
+DATA_ACCOUNT = "ACCOUNT"
+DATA_STORE = "STORE"
+DATA_SCHEDULERS = "SCHEDULERS"
+DATA_TARGET_PLANNER = "TARGET_PLANNER"
 
 REGEX_HOURS = "^[0-9]+(\\.[0-9]+)*$"
 REGEX_TIME = "^([0-1]?[0-9]|2[0-3]):[0-5][0-9]$"
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+
+# Each of our consumption intervals covers 30 minutes
+INTERVAL_LENGTH = timedelta(minutes=30)
+
+class OctopusEnergyCostLedger:
+  """
+  The costs that have already been calculated for a meter's consumption within a period, so only consumption that
+  has arrived since needs to be priced. Costs are held as spans of consecutive consumption at the same price, with
+  the charge for each interval only created when asked for.
+  """
+
+  def __init__(
+    self,
+    tariff_code: str,
+    period_from: datetime,
+    period_to: datetime,
+    standing_charge: float = None,
+    spans: list = None,
+    total_cost_in_pence: float = 0,
+    last_calculated_timestamp: datetime = None
+  ):
+    self._tariff_code = tariff_code
+    self._period_from = period_from
+    self._period_to = period_to
+    self._standing_charge = standing_charge
+    self.__set_spans(spans if spans != None else [])
+    self._total_cost_in_pence = total_cost_in_pence
+    self._last_calculated_timestamp = last_calculated_timestamp
+
+  @property
+  def tariff_code(self):
+    return self._tariff_code
+
+  @property
+  def period_from(self):
+    return self._period_from
+
+  @property
+  def period_to(self):
+    return self._period_to
+
+  @property
+  def standing_charge(self):
+    return self._standing_charge
+
+  @standing_charge.setter
+  def standing_charge(self, value: float):
+    self._standing_charge = value
+
+  @property
+  def spans(self):
+    return self._spans
+
+  @property
+  def total_intervals(self):
+    return self._total_intervals
+
+  @property
+  def charges(self):
+    """The charge for each priced interval"""
+    # Charges are only created for intervals that have been priced since we were last asked. Our charges are exposed as
+    # part of our sensor attributes, so we create a new list rather than changing the exposed one
+    if len(self._charges) < self._total_intervals:
+      self._charges = self._charges + self.__create_charges(len(self._charges))
+
+    return self._charges
+
+  @property
+  def total_cost_in_pence(self):
+    return self._total_cost_in_pence
+
+  @property
+  def last_calculated_timestamp(self):
+    return self._last_calculated_timestamp
+
+  def copy(self):
+    """Create a copy of the ledger, which can be changed without changing this ledger"""
+    cost_ledger = OctopusEnergyCostLedger(
+      self._tariff_code,
+      self._period_from,
+      self._period_to,
+      self._standing_charge,
+      self._spans,
+      self._total_cost_in_pence,
+      self._last_calculated_timestamp
+    )
+
+    # Our charges are never changed in place, so they can be shared rather than created again
+    cost_ledger._charges = self._charges
+    return cost_ledger
+
+  def is_for(self, tariff_code: str, period_from: datetime, period_to: datetime):
+    """Determines if the ledger holds costs for the tariff and period"""
+    return self._tariff_code == tariff_code and self._period_from == period_from and self._period_to == period_to
+
+  def get_unpriced_consumption(self, sorted_consumption_data):
+    """
+    Get the consumption that hasn't been priced yet. If the consumption that has been priced has since changed,
+    then our costs are discarded and all of the consumption is returned
+    """
+    total_intervals = self._total_intervals
+    if (total_intervals > 0 and
+        len(sorted_consumption_data) >= total_intervals and
+        sorted_consumption_data[0]["interval_start"] == self._spans[0]["from"] and
+        sorted_consumption_data[total_intervals - 1]["interval_end"] == self._last_calculated_timestamp):
+      return sorted_consumption_data[total_intervals:]
+
+    self.__set_spans([])
+    self._total_cost_in_pence = 0
+    self._last_calculated_timestamp = None
+    return sorted_consumption_data
+
+  def add_spans(self, spans: list, cost_in_pence: float, last_calculated_timestamp: datetime):
+    """Add the spans of newly priced consumption"""
+    total_new_intervals = sum(map(lambda span: len(span["consumptions"]), spans))
+    if len(spans) > 0 and len(self._spans) > 0:
+      last_span = self._spans[-1]
+      first_span = spans[0]
+
+      # Carry on our last span if our new consumption follows on from it at the same price
+      if last_span["to"] == first_span["from"] and last_span["rate"] == first_span["rate"]:
+        spans = [{
+          "from": last_span["from"],
+          "to": first_span["to"],
+          "rate": last_span["rate"],
+          "consumptions": last_span["consumptions"] + first_span["consumptions"],
+          "cost": last_span["cost"] + first_span["cost"]
+        }] + spans[1:]
+        self._spans = self._spans[:-1]
+
+    self._spans = self._spans + spans
+    self._total_intervals = self._total_intervals + total_new_intervals
+    self._total_cost_in_pence = self._total_cost_in_pence + cost_in_pence
+    self._last_calculated_timestamp = last_calculated_timestamp
+
+  def __set_spans(self, spans: list):
+    self._spans = spans
+    self._total_intervals = sum(map(lambda span: len(span["consumptions"]), spans))
+    self._charges = []
+
+  def __create_charges(self, from_interval: int):
+    charges = []
+    span_start_interval = 0
+    for span in self._spans:
+      total_span_intervals = len(span["consumptions"])
+      for index in range(max(from_interval - span_start_interval, 0), total_span_intervals):
+        value = span["consumptions"][index]
+        interval_start = span["from"] + (INTERVAL_LENGTH * index)
+        cost = span["rate"] * value
+        charges.append({
+          "from": interval_start,
+          "to": interval_start + INTERVAL_LENGTH,
+          "rate": f'{span["rate"]}p',
+          "consumption": f'{value} kWh',
+          "cost": f'£{round(cost / 100, 2)}'
+        })
+
+      span_start_interval += total_span_intervals
+
+    return charges
@@ -1,13 +1,17 @@
 """Diagnostics support."""
 import logging
+import copy
 
 from homeassistant.components.diagnostics import async_redact_data
 
 from .const import (
   DOMAIN,
 
-  DATA_ACCOUNT_ID,
-  DATA_CLIENT
+  DATA_ACCOUNT,
+  DATA_CLIENT,
+  DATA_SCHEDULERS,
+  DATA_TARGET_PLANNER,
+  DATA_RATES_REFRESH_STATS
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -19,7 +23,8 @@ async def async_get_device_diagnostics(hass, config_entry, device):
 
     _LOGGER.info('Retrieving account details for diagnostics...')
     
-    account_info = await client.async_get_account(hass.data[DOMAIN][DATA_ACCOUNT_ID])
+    # Our account information is shared, so take a copy before we redact it
+    account_info = copy.deepcopy(await hass.data[DOMAIN][DATA_ACCOUNT].async_get_account(True))
 
     points_length = len(account_info["electricity_meter_points"])
     if points_length > 0:
@@ -37,6 +42,23 @@ async def async_get_device_diagnostics(hass, config_entry, device):
         for meter_index in range(meters_length):
           account_info["gas_meter_points"][point_index]["meters"][meter_index] = async_redact_data(account_info["gas_meter_points"][point_index]["meters"][meter_index], { "serial_number" })
     
+    account_info["client_stats"] = client.get_stats()
+
+    account_info["account_stats"] = hass.data[DOMAIN][DATA_ACCOUNT].get_stats()
+
+    if DATA_RATES_REFRESH_STATS in hass.data[DOMAIN]:
+      account_info["rates_refresh_stats"] = hass.data[DOMAIN][DATA_RATES_REFRESH_STATS]
+
+    if DATA_TARGET_PLANNER in hass.data[DOMAIN]:
+      account_info["target_planner_stats"] = hass.data[DOMAIN][DATA_TARGET_PLANNER].get_stats()
+
+    # Our consumption schedulers are named after their meters, so we don't include their names
+    schedulers = hass.data[DOMAIN].get(DATA_SCHEDULERS, {})
+    account_info["next_runs"] = {
+      "rates": schedulers["rates"].next_run if "rates" in schedulers else None,
+      "consumption": list(map(lambda name: schedulers[name].next_run, filter(lambda name: name != "rates", schedulers)))
+    }
+
     _LOGGER.info(f'Returning diagnostic details; {len(account_info["electricity_meter_points"])} electricity meter point(s), {len(account_info["gas_meter_points"])} gas meter point(s)')
 
     return account_info
\ No newline at end of file
@@ -0,0 +1,44 @@
+from .rate_timeline import RateTimeline
+
+def calculate_span_costs(rates, consumption_data, get_consumption_value):
+  """
+  Price sorted consumption against rates. Consecutive consumption at the same price is grouped into a span and priced
+  as a whole, so for flat rate tariffs our consumption is priced once rather than once per interval.
+  """
+  # Our rates are usually held as runs of the same price, so we walk these alongside our consumption
+  runs = rates.runs() if isinstance(rates, RateTimeline) else rates
+
+  spans = []
+  missing_intervals = []
+  run_index = 0
+  for consumption in consumption_data:
+    while run_index < len(runs) and runs[run_index]["valid_to"] <= consumption["interval_start"]:
+      run_index += 1
+
+    if (run_index >= len(runs) or
+        runs[run_index]["valid_from"] > consumption["interval_start"] or
+        runs[run_index]["valid_to"] < consumption["interval_end"]):
+      missing_intervals.append(consumption)
+      continue
+
+    value = get_consumption_value(consumption)
+    rate = runs[run_index]["value_inc_vat"]
+    if len(spans) > 0 and spans[-1]["rate"] == rate and spans[-1]["to"] == consumption["interval_start"]:
+      spans[-1]["to"] = consumption["interval_end"]
+      spans[-1]["consumptions"].append(value)
+    else:
+      spans.append({
+        "from": consumption["interval_start"],
+        "to": consumption["interval_end"],
+        "rate": rate,
+        "consumptions": [value]
+      })
+
+  for span in spans:
+    span["cost"] = sum(span["consumptions"]) * span["rate"]
+
+  return {
+    "spans": spans,
+    "total": sum(map(lambda span: span["cost"], spans)),
+    "missing_intervals": missing_intervals
+  }
@@ -0,0 +1,262 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from homeassistant.util.dt import (utc_from_timestamp)
+
+# Rates and consumption are reported in 30 minute slots, so each of our rates covers one slot
+RATE_SECONDS = 30 * 60
+
+RATE_KEYS = ("value_exc_vat", "value_inc_vat", "valid_from", "valid_to", "tariff_code")
+
+class RateTimelineEntry(Mapping):
+  """Read only, dict compatible view of a single rate within a timeline"""
+
+  __slots__ = ("_timeline", "_run", "_start")
+
+  def __init__(self, timeline, run: int, start: int):
+    self._timeline = timeline
+    self._run = run
+    self._start = start
+
+  def __getitem__(self, key):
+    timeline = self._timeline
+    if key == "value_inc_vat":
+      return timeline._values_inc_vat[self._run]
+    if key == "valid_from":
+      return utc_from_timestamp(self._start)
+    if key == "valid_to":
+      return utc_from_timestamp(self._start + RATE_SECONDS)
+    if key == "value_exc_vat":
+      return timeline._values_exc_vat[self._run]
+    if key == "tariff_code":
+      return timeline._tariff_codes[timeline._tariff_code_indexes[self._run]]
+
+    raise KeyError(key)
+
+  def __iter__(self):
+    return iter(RATE_KEYS)
+
+  def __len__(self):
+    return len(RATE_KEYS)
+
+  def __repr__(self):
+    return repr(self.as_dict())
+
+  def copy(self):
+    return self.as_dict()
+
+  def as_dict(self):
+    """Get the rate as a dictionary. This is also used when the rate is serialised as part of an entity's attributes"""
+    return {key: self[key] for key in RATE_KEYS}
+
+class RateTimeline(Sequence):
+  """
+  Compact collection of 30 minute rates, in ascending order. Rates are exposed as dict compatible views.
+
+  Rates are held as runs. If run length encoded, consecutive rates with the same price are held as a single run,
+  otherwise each run is a single rate.
+  """
+
+  __slots__ = ("_is_run_length_encoded", "_starts", "_counts", "_offsets", "_values_exc_vat", "_values_inc_vat", "_tariff_codes", "_tariff_code_indexes")
+
+  def __init__(self, run_length_encoded: bool = False):
+    self._is_run_length_encoded = run_length_encoded
+
+    # Our rates start on the half hour, so we hold when each run starts as seconds since the epoch rather than as datetimes
+    self._starts = array("q")
+    self._values_exc_vat = array("d")
+    self._values_inc_vat = array("d")
+
+    # How many rates are in each run, and how many rates come before each run
+    self._counts = array("q")
+    self._offsets = array("q")
+
+    # Our rates will usually all be for the same tariff, so we only hold each tariff code once
+    self._tariff_codes = []
+    self._tariff_code_indexes = array("H")
+
+  @classmethod
+  def from_rates(cls, rates, run_length_encoded: bool = False):
+    """Create a timeline from a collection of 30 minute rates, which are expected to be in ascending order"""
+    if isinstance(rates, RateTimeline) and rates.is_run_length_encoded == run_length_encoded:
+      return rates
+
+    timeline = cls(run_length_encoded)
+    for rate in rates:
+      timeline.append(rate["value_exc_vat"], rate["value_inc_vat"], rate["valid_from"], rate["tariff_code"])
+
+    return timeline
+
+  @property
+  def is_run_length_encoded(self):
+    return self._is_run_length_encoded
+
+  @property
+  def starts(self):
+    """When each rate starts, as seconds since the epoch"""
+    if self.__is_expanded():
+      return self._starts
+
+    starts = array("q")
+    for (run, start) in enumerate(self._starts):
+      starts.extend(range(start, start + (self._counts[run] * RATE_SECONDS), RATE_SECONDS))
+
+    return starts
+
+  @property
+  def values_inc_vat(self):
+    return self.__expand(self._values_inc_vat)
+
+  def runs(self):
+    """Get our runs of rates, each spanning all of the rates within the run"""
+    return list(map(lambda run: {
+      "value_exc_vat": self._values_exc_vat[run],
+      "value_inc_vat": self._values_inc_vat[run],
+      "valid_from": utc_from_timestamp(self._starts[run]),
+      "valid_to": utc_from_timestamp(self._starts[run] + (self._counts[run] * RATE_SECONDS)),
+      "tariff_code": self._tariff_codes[self._tariff_code_indexes[run]]
+    }, range(len(self._starts))))
+
+  def append(self, value_exc_vat: float, value_inc_vat: float, valid_from: datetime, tariff_code: str, total_rates: int = 1):
+    """Add one or more consecutive rates with the same price, which must start after all existing rates"""
+    if total_rates < 1:
+      return
+
+    if tariff_code in self._tariff_codes:
+      tariff_code_index = self._tariff_codes.index(tariff_code)
+    else:
+      tariff_code_index = len(self._tariff_codes)
+      self._tariff_codes.append(tariff_code)
+
+    start = int(valid_from.timestamp())
+    if self._is_run_length_encoded == False:
+      for index in range(total_rates):
+        self.__append_run(start + (index * RATE_SECONDS), 1, value_exc_vat, value_inc_vat, tariff_code_index)
+      return
+
+    # Extend our last run if our rates carry on from it at the same price
+    last_run = len(self._starts) - 1
+    if (last_run >= 0 and
+        self._starts[last_run] + (self._counts[last_run] * RATE_SECONDS) == start and
+        self._values_exc_vat[last_run] == value_exc_vat and
+        self._values_inc_vat[last_run] == value_inc_vat and
+        self._tariff_code_indexes[last_run] == tariff_code_index):
+      self._counts[last_run] += total_rates
+      return
+
+    self.__append_run(start, total_rates, value_exc_vat, value_inc_vat, tariff_code_index)
+
+  def as_list(self):
+    """Get our rates as a list of dictionaries"""
+    return list(map(lambda rate: rate.as_dict(), self))
+
+  def __len__(self):
+    if len(self._starts) == 0:
+      return 0
+
+    return self._offsets[-1] + self._counts[-1]
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return self.__slice(index)
+
+    total_rates = len(self)
+    if index < 0:
+      index += total_rates
+    if index < 0 or index >= total_rates:
+      raise IndexError("rate index out of range")
+
+    if self.__is_expanded():
+      return RateTimelineEntry(self, index, self._starts[index])
+
+    run = bisect_right(self._offsets, index) - 1
+    return RateTimelineEntry(self, run, self._starts[run] + ((index - self._offsets[run]) * RATE_SECONDS))
+
+  def __iter__(self):
+    # Our runs are only expanded into their rates as they're iterated
+    for run in range(len(self._starts)):
+      start = self._starts[run]
+      for index in range(self._counts[run]):
+        yield RateTimelineEntry(self, run, start + (index * RATE_SECONDS))
+
+  def __eq__(self, other):
+    if isinstance(other, RateTimeline):
+      return (
+        self.starts == other.starts and
+        self.__expand(self._values_exc_vat) == other.__expand(other._values_exc_vat) and
+        self.values_inc_vat == other.values_inc_vat and
+        self.__expand_tariff_codes() == other.__expand_tariff_codes()
+      )
+
+    if isinstance(other, Sequence) and not isinstance(other, str):
+      return len(self) == len(other) and all(rate == other_rate for (rate, other_rate) in zip(self, other))
+
+    return NotImplemented
+
+  def __repr__(self):
+    return f"RateTimeline({self.as_list()!r})"
+
+  def __is_expanded(self):
+    # Each of our runs holds a single rate, so our runs are our rates
+    return len(self._starts) == len(self)
+
+  def __expand(self, values):
+    if self.__is_expanded():
+      return values
+
+    expanded = array(values.typecode)
+    for (run, value) in enumerate(values):
+      expanded.extend([value] * self._counts[run])
+
+    return expanded
+
+  def __expand_tariff_codes(self):
+    return list(map(lambda tariff_code_index: self._tariff_codes[tariff_code_index], self.__expand(self._tariff_code_indexes)))
+
+  def __append_run(self, start: int, total_rates: int, value_exc_vat: float, value_inc_vat: float, tariff_code_index: int):
+    self._offsets.append(len(self))
+    self._starts.append(start)
+    self._counts.append(total_rates)
+    self._values_exc_vat.append(value_exc_vat)
+    self._values_inc_vat.append(value_inc_vat)
+    self._tariff_code_indexes.append(tariff_code_index)
+
+  def __slice(self, index: slice):
+    (start, stop, step) = index.indices(len(self))
+    timeline = RateTimeline(self._is_run_length_encoded)
+    timeline._tariff_codes = list(self._tariff_codes)
+
+    if step != 1:
+      for rate_index in range(start, stop, step):
+        rate = self[rate_index]
+        timeline.append(rate["value_exc_vat"], rate["value_inc_vat"], rate["valid_from"], rate["tariff_code"])
+      return timeline
+
+    if stop <= start:
+      return timeline
+
+    if self.__is_expanded():
+      timeline._starts = self._starts[start:stop]
+      timeline._counts = self._counts[start:stop]
+      timeline._offsets = array("q", range(stop - start))
+      timeline._values_exc_vat = self._values_exc_vat[start:stop]
+      timeline._values_inc_vat = self._values_inc_vat[start:stop]
+      timeline._tariff_code_indexes = self._tariff_code_indexes[start:stop]
+      return timeline
+
+    # Clip the runs that our slice starts and ends within
+    first_run = bisect_right(self._offsets, start) - 1
+    last_run = bisect_right(self._offsets, stop - 1) - 1
+    for run in range(first_run, last_run + 1):
+      run_start = max(start, self._offsets[run])
+      run_stop = min(stop, self._offsets[run] + self._counts[run])
+      timeline.__append_run(
+        self._starts[run] + ((run_start - self._offsets[run]) * RATE_SECONDS),
+        run_stop - run_start,
+        self._values_exc_vat[run],
+        self._values_inc_vat[run],
+        self._tariff_code_indexes[run]
+      )
+
+    return timeline
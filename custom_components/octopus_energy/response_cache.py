@@ -0,0 +1,37 @@
+from collections import OrderedDict
+from datetime import datetime
+from homeassistant.util.dt import (utcnow)
+
+class OctopusEnergyResponseCache:
+  """In memory cache of api responses. Entries can expire, and the least recently used entry is removed once full"""
+
+  def __init__(self, max_size: int):
+    self._max_size = max_size
+    self._entries = OrderedDict()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def get(self, key, current: datetime = None):
+    """Get the cached value for the key, or None if it's not available or has expired"""
+    if key not in self._entries:
+      return None
+
+    (value, expires_at) = self._entries[key]
+    if expires_at is not None and (current if current is not None else utcnow()) >= expires_at:
+      del self._entries[key]
+      return None
+
+    self._entries.move_to_end(key)
+    return value
+
+  def set(self, key, value, expires_at: datetime = None):
+    """Cache the value for the key. If expires_at is None, then the value will be cached until it's evicted"""
+    self._entries[key] = (value, expires_at)
+    self._entries.move_to_end(key)
+
+    while len(self._entries) > self._max_size:
+      self._entries.popitem(last=False)
+
+  def clear(self):
+    self._entries.clear()
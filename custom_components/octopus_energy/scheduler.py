@@ -0,0 +1,82 @@
+import logging
+import math
+from datetime import datetime, timedelta
+from homeassistant.core import HomeAssistant
+from homeassistant.util.dt import (utcnow, as_local, as_utc, parse_datetime, utc_from_timestamp)
+from homeassistant.helpers.event import async_track_point_in_utc_time
+
+from .rate_timeline import RATE_SECONDS
+
+_LOGGER = logging.getLogger(__name__)
+
+def get_next_slot_start(current: datetime, offset: timedelta = timedelta(0)):
+  """Get the start of the next slot after the current time. Slot starts can be shifted by the provided offset"""
+  offset_seconds = offset.total_seconds()
+  next_slot = (math.floor((current.timestamp() - offset_seconds) / RATE_SECONDS) + 1) * RATE_SECONDS
+  return utc_from_timestamp(next_slot + offset_seconds)
+
+def get_next_run(current: datetime, offset: timedelta = timedelta(0), availability_times: list = None):
+  """Get the next time we should run, which is either the next slot or the next time new data is expected to be available"""
+  next_run = get_next_slot_start(current, offset)
+
+  if availability_times is not None:
+    local_current = as_local(current)
+    for availability_time in availability_times:
+      # Availability times are in local time, as that is when Octopus Energy publish their data
+      next_available = as_utc(parse_datetime(local_current.strftime(f"%Y-%m-%dT{availability_time}:00%z")))
+      if next_available <= current:
+        next_available = as_utc(parse_datetime((local_current + timedelta(days=1)).strftime(f"%Y-%m-%dT{availability_time}:00%z")))
+
+      if next_available < next_run:
+        next_run = next_available
+
+  return next_run
+
+class OctopusEnergyScheduler:
+  """Runs an action at the start of each slot, and any time new data is expected to be available"""
+
+  def __init__(self, hass: HomeAssistant, name: str, async_action, offset: timedelta = timedelta(0), availability_times: list = None):
+    self._hass = hass
+    self._name = name
+    self._async_action = async_action
+    self._offset = offset
+    self._availability_times = availability_times
+    self._next_run = None
+    self._unsub = None
+    self._is_started = False
+
+  @property
+  def next_run(self):
+    return self._next_run
+
+  def start(self):
+    """Start running our action at each of our scheduled times"""
+    self.stop()
+    self._is_started = True
+    self.__schedule_next_run()
+
+  def stop(self):
+    """Stop running our action, cancelling our next run"""
+    self._is_started = False
+    if self._unsub is not None:
+      self._unsub()
+      self._unsub = None
+
+    self._next_run = None
+
+  def __schedule_next_run(self):
+    self._next_run = get_next_run(utcnow(), self._offset, self._availability_times)
+    self._unsub = async_track_point_in_utc_time(self._hass, self.__async_run, self._next_run)
+    _LOGGER.debug(f"Next run of '{self._name}' scheduled for {self._next_run}")
+
+  async def __async_run(self, scheduled_time: datetime):
+    self._unsub = None
+
+    try:
+      await self._async_action()
+    except Exception as e:
+      _LOGGER.error(f"Failed to run '{self._name}': {e}")
+    finally:
+      # We could have been stopped while our action was running
+      if self._is_started:
+        self.__schedule_next_run()
@@ -15,53 +15,60 @@ from homeassistant.const import (
     ENERGY_KILO_WATT_HOUR,
     VOLUME_CUBIC_METERS
 )
+from homeassistant.core import callback
 from homeassistant.helpers.restore_state import RestoreEntity
 
 from .sensor_utils import (
   async_get_consumption_data,
-  calculate_electricity_consumption,
+  get_consumption_gaps,
   async_calculate_electricity_cost,
-  calculate_gas_consumption,
-  async_calculate_gas_cost
+  async_calculate_gas_cost,
+  OctopusEnergyConsumptionAccumulator
 )
 
 from typing import Generic, TypeVar
 
+from .scheduler import OctopusEnergyScheduler
 from .utils import (get_active_tariff_code)
 from .const import (
   DOMAIN,
   
   CONFIG_MAIN_API_KEY,
-  CONFIG_MAIN_ACCOUNT_ID,
   
   CONFIG_SMETS1,
 
   DATA_ELECTRICITY_RATES_COORDINATOR,
-  DATA_CLIENT
+  DATA_CLIENT,
+  DATA_ACCOUNT,
+  DATA_STORE,
+  DATA_SCHEDULERS
 )
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(minutes=1)
-
 def create_reading_coordinator(hass, client, is_electricity, identifier, serial_number):
   """Create reading coordinator"""
 
   async def async_update_data():
     """Fetch data from API endpoint."""
 
+    period_from = as_utc((now() - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0))
+    period_to = as_utc(now().replace(hour=0, minute=0, second=0, microsecond=0))
+
+    store = hass.data[DOMAIN][DATA_STORE]
     previous_consumption_key = f'{identifier}_{serial_number}_previous_consumption'
     previous_data = None
     if previous_consumption_key in hass.data[DOMAIN]:
       previous_data = hass.data[DOMAIN][previous_consumption_key]
-
-    period_from = as_utc((now() - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0))
-    period_to = as_utc(now().replace(hour=0, minute=0, second=0, microsecond=0))
+    else:
+      # After a restart, start from our stored consumption so only the consumption we're missing is requested
+      stored_data = store.get_consumption(identifier, serial_number)
+      if stored_data != None:
+        previous_data = [item for item in stored_data if item["interval_start"] >= period_from and item["interval_end"] <= period_to]
 
     data = await async_get_consumption_data(
       client,
       previous_data,
-      utcnow(),
       period_from,
       period_to,
       identifier,
@@ -70,6 +77,14 @@ def create_reading_coordinator(hass, client, is_electricity, identifier, serial_
     )
 
     if data != None and len(data) > 0:
+      if data is not previous_data:
+        store.set_consumption(identifier, serial_number, data)
+
+        gaps = get_consumption_gaps(data, period_from)
+        if len(gaps) > 0:
+          _LOGGER.debug(f'Consumption missing for {len(gaps)} period(s); identifier: {identifier}; serial number: {serial_number}; gaps: {gaps}')
+        hass.data[DOMAIN][f'{identifier}_{serial_number}_consumption_gaps'] = gaps
+
       hass.data[DOMAIN][previous_consumption_key] = data
       return data
 
@@ -80,13 +95,21 @@ def create_reading_coordinator(hass, client, is_electricity, identifier, serial_
     _LOGGER,
     name="rates",
     update_method=async_update_data,
-    # Because of how we're using the data, we'll update every minute, but we will only actually retrieve
-    # data every 30 minutes
-    update_interval=timedelta(minutes=1),
+    # Our consumption is reported in 30 minute intervals, so our scheduler refreshes our data rather than polling
+    update_interval=None,
   )
 
   hass.data[DOMAIN][f'{identifier}_{serial_number}_consumption_coordinator'] = coordinator
 
+  schedulers = hass.data[DOMAIN].setdefault(DATA_SCHEDULERS, {})
+  scheduler_name = f'{identifier}_{serial_number}_consumption'
+  if scheduler_name in schedulers:
+    schedulers[scheduler_name].stop()
+
+  scheduler = OctopusEnergyScheduler(hass, scheduler_name, coordinator.async_refresh)
+  scheduler.start()
+  schedulers[scheduler_name] = scheduler
+
   return coordinator
 
 async def async_setup_entry(hass, entry, async_add_entities):
@@ -113,14 +136,15 @@ async def async_setup_default_sensors(hass, entry, async_add_entities):
 
   entities = []
   
-  account_info = await client.async_get_account(config[CONFIG_MAIN_ACCOUNT_ID])
+  account_cache = hass.data[DOMAIN][DATA_ACCOUNT]
+  account_info = await account_cache.async_get_account()
 
   now = utcnow()
 
   if len(account_info["electricity_meter_points"]) > 0:
     for point in account_info["electricity_meter_points"]:
       # We only care about points that have active agreements
-      electricity_tariff_code = get_active_tariff_code(now, point["agreements"])
+      electricity_tariff_code = get_active_tariff_code(now, account_cache.get_agreement_index(point))
       if electricity_tariff_code != None:
         for meter in point["meters"]:
           _LOGGER.info(f'Adding electricity meter; mpan: {point["mpan"]}; serial number: {meter["serial_number"]}')
@@ -139,7 +163,7 @@ async def async_setup_default_sensors(hass, entry, async_add_entities):
   if len(account_info["gas_meter_points"]) > 0:
     for point in account_info["gas_meter_points"]:
       # We only care about points that have active agreements
-      gas_tariff_code = get_active_tariff_code(now, point["agreements"])
+      gas_tariff_code = get_active_tariff_code(now, account_cache.get_agreement_index(point))
       if gas_tariff_code != None:
         for meter in point["meters"]:
           _LOGGER.info(f'Adding gas meter; mprn: {point["mprn"]}; serial number: {meter["serial_number"]}')
@@ -225,39 +249,44 @@ class OctopusEnergyElectricityCurrentRate(CoordinatorEntity, OctopusEnergyElectr
   @property
   def state(self):
     """The state of the sensor."""
-    # Find the current rate. We only need to do this every half an hour
-    now = utcnow()
-    if (now.minute % 30) == 0 or self._state == None:
-      _LOGGER.debug(f"Updating OctopusEnergyElectricityCurrentRate for '{self._mpan}/{self._serial_number}'")
+    return self._state
 
-      current_rate = None
-      if self.coordinator.data != None:
-        rate = self.coordinator.data[self._mpan]
-        if rate != None:
-          for period in rate:
-            if now >= period["valid_from"] and now <= period["valid_to"]:
-              current_rate = period
-              break
+  @callback
+  def _handle_coordinator_update(self) -> None:
+    """Find our current rate whenever our rates are refreshed, which happens at the start of each slot"""
+    self.__update_rate()
+    super()._handle_coordinator_update()
 
-      if current_rate != None:
-        ratesAttributes = list(map(lambda x: {
-          "from": x["valid_from"],
-          "to":   x["valid_to"],
-          "rate": x["value_inc_vat"]
-        }, rate))
-        self._attributes = {
-          "rate": current_rate,
-          "is_export": self._is_export,
-          "is_smart_meter": self._is_smart_meter,
-          "rates": ratesAttributes
-        }
-        
-        self._state = current_rate["value_inc_vat"] / 100
-      else:
-        self._state = None
-        self._attributes = {}
+  def __update_rate(self):
+    _LOGGER.debug(f"Updating OctopusEnergyElectricityCurrentRate for '{self._mpan}/{self._serial_number}'")
 
-    return self._state
+    now = utcnow()
+    current_rate = None
+    if self.coordinator.data != None:
+      rate = self.coordinator.data[self._mpan]
+      if rate != None:
+        for period in rate:
+          if now >= period["valid_from"] and now <= period["valid_to"]:
+            current_rate = period
+            break
+
+    if current_rate != None:
+      ratesAttributes = list(map(lambda x: {
+        "from": x["valid_from"],
+        "to":   x["valid_to"],
+        "rate": x["value_inc_vat"]
+      }, rate))
+      self._attributes = {
+        "rate": dict(current_rate),
+        "is_export": self._is_export,
+        "is_smart_meter": self._is_smart_meter,
+        "rates": ratesAttributes
+      }
+      
+      self._state = current_rate["value_inc_vat"] / 100
+    else:
+      self._state = None
+      self._attributes = {}
 
   async def async_added_to_hass(self):
     """Call when entity about to be added to hass."""
@@ -270,6 +299,10 @@ class OctopusEnergyElectricityCurrentRate(CoordinatorEntity, OctopusEnergyElectr
     
     _LOGGER.debug(f'Restored state: {self._state}')
 
+    # Our rates may have been retrieved before we were added
+    if self.coordinator.data != None:
+      self.__update_rate()
+
 class OctopusEnergyElectricityPreviousRate(CoordinatorEntity, OctopusEnergyElectricitySensor):
   """Sensor for displaying the previous rate."""
 
@@ -314,36 +347,40 @@ class OctopusEnergyElectricityPreviousRate(CoordinatorEntity, OctopusEnergyElect
   @property
   def state(self):
     """The state of the sensor."""
-    # Find the previous rate. We only need to do this every half an hour
-    now = utcnow()
-    if (now.minute % 30) == 0 or self._state == None:
-      _LOGGER.debug(f"Updating OctopusEnergyElectricityPreviousRate for '{self._mpan}/{self._serial_number}'")
-
-      target = now - timedelta(minutes=30)
-
-      previous_rate = None
-      if self.coordinator.data != None:
-        rate = self.coordinator.data[self._mpan]
-        if rate != None:
-          for period in rate:
-            if target >= period["valid_from"] and target <= period["valid_to"]:
-              previous_rate = period
-              break
-
-      if previous_rate != None:
-        self._attributes = {
-          "rate": previous_rate,
-          "is_export": self._is_export,
-          "is_smart_meter": self._is_smart_meter
-        }
-
-        self._state = previous_rate["value_inc_vat"] / 100
-      else:
-        self._state = None
-        self._attributes = {}
-
     return self._state
 
+  @callback
+  def _handle_coordinator_update(self) -> None:
+    """Find our previous rate whenever our rates are refreshed, which happens at the start of each slot"""
+    self.__update_rate()
+    super()._handle_coordinator_update()
+
+  def __update_rate(self):
+    _LOGGER.debug(f"Updating OctopusEnergyElectricityPreviousRate for '{self._mpan}/{self._serial_number}'")
+
+    target = utcnow() - timedelta(minutes=30)
+
+    previous_rate = None
+    if self.coordinator.data != None:
+      rate = self.coordinator.data[self._mpan]
+      if rate != None:
+        for period in rate:
+          if target >= period["valid_from"] and target <= period["valid_to"]:
+            previous_rate = period
+            break
+
+    if previous_rate != None:
+      self._attributes = {
+        "rate": dict(previous_rate),
+        "is_export": self._is_export,
+        "is_smart_meter": self._is_smart_meter
+      }
+
+      self._state = previous_rate["value_inc_vat"] / 100
+    else:
+      self._state = None
+      self._attributes = {}
+
   async def async_added_to_hass(self):
     """Call when entity about to be added to hass."""
     # If not None, we got an initial value.
@@ -355,6 +392,10 @@ class OctopusEnergyElectricityPreviousRate(CoordinatorEntity, OctopusEnergyElect
     
     _LOGGER.debug(f'Restored state: {self._state}')
 
+    # Our rates may have been retrieved before we were added
+    if self.coordinator.data != None:
+      self.__update_rate()
+
 class OctopusEnergyPreviousAccumulativeElectricityReading(CoordinatorEntity, OctopusEnergyElectricitySensor):
   """Sensor for displaying the previous days accumulative electricity reading."""
 
@@ -364,7 +405,7 @@ class OctopusEnergyPreviousAccumulativeElectricityReading(CoordinatorEntity, Oct
     OctopusEnergyElectricitySensor.__init__(self, mpan, serial_number, is_export, is_smart_meter)
 
     self._state = None
-    self._latest_date = None
+    self._consumption_accumulator = OctopusEnergyConsumptionAccumulator(False)
 
   @property
   def unique_id(self):
@@ -403,16 +444,23 @@ class OctopusEnergyPreviousAccumulativeElectricityReading(CoordinatorEntity, Oct
 
   @property
   def state(self):
-    """Retrieve the previous days accumulative consumption"""
-    consumption = calculate_electricity_consumption(
-      self.coordinator.data,
-      self._latest_date
-    )
+    """Retrieve the previously calculated accumulative consumption"""
+    return self._state
+
+  @callback
+  def _handle_coordinator_update(self) -> None:
+    """Add any new consumption to our totals when our consumption has been updated"""
+    self.__update_consumption()
+    super()._handle_coordinator_update()
+
+  def __update_consumption(self):
+    if self._consumption_accumulator.update(self.coordinator.data) == False:
+      return
 
+    consumption = self._consumption_accumulator.get_consumption()
     if (consumption != None and len(consumption["consumptions"]) > 2):
       _LOGGER.debug(f"Calculated previous electricity consumption for '{self._mpan}/{self._serial_number}'...")
       self._state = consumption["total"]
-      self._latest_date = consumption["last_calculated_timestamp"]
 
       self._attributes = {
         "mpan": self._mpan,
@@ -423,8 +471,6 @@ class OctopusEnergyPreviousAccumulativeElectricityReading(CoordinatorEntity, Oct
         "last_calculated_timestamp": consumption["last_calculated_timestamp"],
         "charges": consumption["consumptions"]
       }
-    
-    return self._state
 
   async def async_added_to_hass(self):
     """Call when entity about to be added to hass."""
@@ -437,6 +483,9 @@ class OctopusEnergyPreviousAccumulativeElectricityReading(CoordinatorEntity, Oct
     
     _LOGGER.debug(f'Restored state: {self._state}')
 
+    # Our consumption may have been retrieved before we were added
+    self.__update_consumption()
+
 class OctopusEnergyPreviousAccumulativeElectricityCost(CoordinatorEntity, OctopusEnergyElectricitySensor):
   """Sensor for displaying the previous days accumulative electricity cost."""
 
@@ -450,6 +499,7 @@ class OctopusEnergyPreviousAccumulativeElectricityCost(CoordinatorEntity, Octopu
 
     self._state = None
     self._latest_date = None
+    self._cost_ledger = None
 
   @property
   def unique_id(self):
@@ -484,22 +534,30 @@ class OctopusEnergyPreviousAccumulativeElectricityCost(CoordinatorEntity, Octopu
   @property
   def extra_state_attributes(self):
     """Attributes of the sensor."""
-    return self._attributes
+    # Our charges are only created from our cost ledger when our attributes are read
+    if self._cost_ledger != None:
+      return {**self._attributes, "charges": self._cost_ledger.charges}
 
-  @property
-  def should_poll(self):
-    return True
+    return self._attributes
 
   @property
   def state(self):
     """Retrieve the previously calculated state"""
     return self._state
 
+  @callback
+  def _handle_coordinator_update(self) -> None:
+    """Recalculate our cost when our consumption has been updated"""
+    self.async_schedule_update_ha_state(True)
+
   async def async_update(self):
     current_datetime = now()
     period_from = as_utc((current_datetime - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0))
     period_to = as_utc(current_datetime.replace(hour=0, minute=0, second=0, microsecond=0))
 
+    # Our previously calculated costs are stored, so only new consumption needs to be priced, even after a restart
+    store = self.hass.data[DOMAIN][DATA_STORE]
+    cost_ledger = store.get_cost_ledger(self._mpan, self._serial_number)
     consumption_cost = await async_calculate_electricity_cost(
       self._client,
       self.coordinator.data,
@@ -507,10 +565,15 @@ class OctopusEnergyPreviousAccumulativeElectricityCost(CoordinatorEntity, Octopu
       period_from,
       period_to,
       self._tariff_code,
-      self._is_smart_meter
+      self._is_smart_meter,
+      cost_ledger
     )
 
-    if (consumption_cost != None and len(consumption_cost["charges"]) > 2):
+    # Our ledger is only replaced when it changes, so we only need to store it then
+    if consumption_cost != None and consumption_cost["cost_ledger"] is not cost_ledger:
+      store.set_cost_ledger(self._mpan, self._serial_number, consumption_cost["cost_ledger"])
+
+    if (consumption_cost != None and consumption_cost["total_intervals"] > 2):
       _LOGGER.debug(f"Calculated previous electricity consumption cost for '{self._mpan}/{self._serial_number}'...")
       self._latest_date = consumption_cost["last_calculated_timestamp"]
       self._state = consumption_cost["total"]
@@ -524,9 +587,9 @@ class OctopusEnergyPreviousAccumulativeElectricityCost(CoordinatorEntity, Octopu
         "standing_charge": f'{consumption_cost["standing_charge"]}p',
         "total_without_standing_charge": f'£{consumption_cost["total_without_standing_charge"]}',
         "total": f'£{consumption_cost["total"]}',
-        "last_calculated_timestamp": consumption_cost["last_calculated_timestamp"],
-        "charges": consumption_cost["charges"]
+        "last_calculated_timestamp": consumption_cost["last_calculated_timestamp"]
       }
+      self._cost_ledger = consumption_cost["cost_ledger"]
 
   async def async_added_to_hass(self):
     """Call when entity about to be added to hass."""
@@ -605,6 +668,10 @@ class OctopusEnergyGasCurrentRate(OctopusEnergyGasSensor):
     """Attributes of the sensor."""
     return self._attributes
 
+  @property
+  def should_poll(self):
+    return False
+
   @property
   def state(self):
     """Retrieve the latest gas price"""
@@ -633,7 +700,9 @@ class OctopusEnergyGasCurrentRate(OctopusEnergyGasSensor):
       if current_rate != None:
         self._state = current_rate["value_inc_vat"] / 100
 
-        # Adjust our period, as our gas only changes on a daily basis
+        # Adjust our period, as our gas only changes on a daily basis. Our rates can be shared with other
+        # sensors, so make sure we don't change the original
+        current_rate = current_rate.copy()
         current_rate["valid_from"] = period_from
         current_rate["valid_to"] = period_to
         self._attributes = current_rate
@@ -654,6 +723,14 @@ class OctopusEnergyGasCurrentRate(OctopusEnergyGasSensor):
     
     _LOGGER.debug(f'Restored state: {self._state}')
 
+    # Our rate only changes daily, so we only need to check at the start of each slot rather than polling
+    scheduler = OctopusEnergyScheduler(self.hass, self.unique_id, self.__async_scheduled_update)
+    scheduler.start()
+    self.async_on_remove(scheduler.stop)
+
+  async def __async_scheduled_update(self):
+    self.async_schedule_update_ha_state(True)
+
 class OctopusEnergyPreviousAccumulativeGasReading(CoordinatorEntity, OctopusEnergyGasSensor):
   """Sensor for displaying the previous days accumulative gas reading."""
 
@@ -663,7 +740,7 @@ class OctopusEnergyPreviousAccumulativeGasReading(CoordinatorEntity, OctopusEner
     OctopusEnergyGasSensor.__init__(self, mprn, serial_number, is_smets1_meter)
 
     self._state = None
-    self._latest_date = None
+    self._consumption_accumulator = OctopusEnergyConsumptionAccumulator(True)
 
   @property
   def unique_id(self):
@@ -702,16 +779,23 @@ class OctopusEnergyPreviousAccumulativeGasReading(CoordinatorEntity, OctopusEner
 
   @property
   def state(self):
-    """Retrieve the previous days accumulative consumption"""
-    consumption = calculate_gas_consumption(
-      self.coordinator.data,
-      self._latest_date
-    )
+    """Retrieve the previously calculated accumulative consumption"""
+    return self._state
+
+  @callback
+  def _handle_coordinator_update(self) -> None:
+    """Add any new consumption to our totals when our consumption has been updated"""
+    self.__update_consumption()
+    super()._handle_coordinator_update()
+
+  def __update_consumption(self):
+    if self._consumption_accumulator.update(self.coordinator.data) == False:
+      return
 
+    consumption = self._consumption_accumulator.get_consumption()
     if (consumption != None and len(consumption["consumptions"]) > 2):
       _LOGGER.debug(f"Calculated previous gas consumption for '{self._mprn}/{self._serial_number}'...")
       self._state = consumption["total_m3"]
-      self._latest_date = consumption["last_calculated_timestamp"]
 
       self._attributes = {
         "mprn": self._mprn,
@@ -722,8 +806,6 @@ class OctopusEnergyPreviousAccumulativeGasReading(CoordinatorEntity, OctopusEner
         "last_calculated_timestamp": consumption["last_calculated_timestamp"],
         "charges": consumption["consumptions"]
       }
-    
-    return self._state
 
   async def async_added_to_hass(self):
     """Call when entity about to be added to hass."""
@@ -736,6 +818,9 @@ class OctopusEnergyPreviousAccumulativeGasReading(CoordinatorEntity, OctopusEner
     
     _LOGGER.debug(f'Restored state: {self._state}')
 
+    # Our consumption may have been retrieved before we were added
+    self.__update_consumption()
+
 class OctopusEnergyPreviousAccumulativeGasCost(CoordinatorEntity, OctopusEnergyGasSensor):
   """Sensor for displaying the previous days accumulative gas cost."""
 
@@ -749,6 +834,7 @@ class OctopusEnergyPreviousAccumulativeGasCost(CoordinatorEntity, OctopusEnergyG
 
     self._state = None
     self._latest_date = None
+    self._cost_ledger = None
 
   @property
   def unique_id(self):
@@ -783,22 +869,30 @@ class OctopusEnergyPreviousAccumulativeGasCost(CoordinatorEntity, OctopusEnergyG
   @property
   def extra_state_attributes(self):
     """Attributes of the sensor."""
-    return self._attributes
+    # Our charges are only created from our cost ledger when our attributes are read
+    if self._cost_ledger != None:
+      return {**self._attributes, "charges": self._cost_ledger.charges}
 
-  @property
-  def should_poll(self):
-    return True
+    return self._attributes
 
   @property
   def state(self):
     """Retrieve the previously calculated state"""
     return self._state
 
+  @callback
+  def _handle_coordinator_update(self) -> None:
+    """Recalculate our cost when our consumption has been updated"""
+    self.async_schedule_update_ha_state(True)
+
   async def async_update(self):
     current_datetime = now()
     period_from = as_utc((current_datetime - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0))
     period_to = as_utc(current_datetime.replace(hour=0, minute=0, second=0, microsecond=0))
 
+    # Our previously calculated costs are stored, so only new consumption needs to be priced, even after a restart
+    store = self.hass.data[DOMAIN][DATA_STORE]
+    cost_ledger = store.get_cost_ledger(self._mprn, self._serial_number)
     consumption_cost = await async_calculate_gas_cost(
       self._client,
       self.coordinator.data,
@@ -808,10 +902,15 @@ class OctopusEnergyPreviousAccumulativeGasCost(CoordinatorEntity, OctopusEnergyG
       {
         "tariff_code": self._tariff_code,
         "is_smets1_meter": self._is_smets1_meter
-      }
+      },
+      cost_ledger
     )
 
-    if (consumption_cost != None and len(consumption_cost["charges"]) > 2):
+    # Our ledger is only replaced when it changes, so we only need to store it then
+    if consumption_cost != None and consumption_cost["cost_ledger"] is not cost_ledger:
+      store.set_cost_ledger(self._mprn, self._serial_number, consumption_cost["cost_ledger"])
+
+    if (consumption_cost != None and consumption_cost["total_intervals"] > 2):
       _LOGGER.debug(f"Calculated previous gas consumption cost for '{self._mprn}/{self._serial_number}'...")
       self._latest_date = consumption_cost["last_calculated_timestamp"]
       self._state = consumption_cost["total"]
@@ -824,9 +923,9 @@ class OctopusEnergyPreviousAccumulativeGasCost(CoordinatorEntity, OctopusEnergyG
         "standing_charge": f'{consumption_cost["standing_charge"]}p',
         "total_without_standing_charge": f'£{consumption_cost["total_without_standing_charge"]}',
         "total": f'£{consumption_cost["total"]}',
-        "last_calculated_timestamp": consumption_cost["last_calculated_timestamp"],
-        "charges": consumption_cost["charges"]
+        "last_calculated_timestamp": consumption_cost["last_calculated_timestamp"]
       }
+      self._cost_ledger = consumption_cost["cost_ledger"]
 
   async def async_added_to_hass(self):
     """Call when entity about to be added to hass."""
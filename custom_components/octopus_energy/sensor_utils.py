@@ -1,35 +1,95 @@
 from .api_client import OctopusEnergyApiClient
+from .cost_ledger import OctopusEnergyCostLedger
+from .pricing import calculate_span_costs
 
 def __get_interval_end(item):
     return item["interval_end"]
 
+def __raise_for_missing_intervals(missing_intervals, tariff_code):
+  """Raise an exception listing every consumption interval without a rate"""
+  if len(missing_intervals) > 0:
+    missing_periods = ", ".join(map(lambda consumption: f'{consumption["interval_start"]} - {consumption["interval_end"]}', missing_intervals))
+    raise Exception(f"Failed to find rates for {len(missing_intervals)} consumption interval(s) for tariff {tariff_code}: {missing_periods}")
+
 def __sort_consumption(consumption_data):
   sorted = consumption_data.copy()
   sorted.sort(key=__get_interval_end)
   return sorted
 
+def get_consumption_gaps(consumption_data, period_from):
+  """Get the periods missing from our consumption, from the start of our period up to the last interval we've received"""
+  gaps = []
+  expected_start = period_from
+  for consumption in consumption_data:
+    if consumption["interval_start"] > expected_start:
+      gaps.append({
+        "from": expected_start,
+        "to": consumption["interval_start"]
+      })
+
+    expected_start = max(expected_start, consumption["interval_end"])
+
+  return gaps
+
+def __merge_consumption(consumption_data, new_consumption_data):
+  """Merge two sorted lists of consumption, preferring the new consumption where both have the same interval"""
+  merged = []
+  index = 0
+  new_index = 0
+  while index < len(consumption_data) and new_index < len(new_consumption_data):
+    consumption = consumption_data[index]
+    new_consumption = new_consumption_data[new_index]
+    if consumption["interval_start"] < new_consumption["interval_start"]:
+      merged.append(consumption)
+      index += 1
+    else:
+      if consumption["interval_start"] == new_consumption["interval_start"]:
+        index += 1
+
+      merged.append(new_consumption)
+      new_index += 1
+
+  merged.extend(consumption_data[index:])
+  merged.extend(new_consumption_data[new_index:])
+  return merged
+
 async def async_get_consumption_data(
   client: OctopusEnergyApiClient,
   previous_data,
-  current_utc_timestamp,
   period_from,
   period_to,
   sensor_identifier,
   sensor_serial_number,
   is_electricity: bool
 ):
-  if (previous_data == None or 
-      ((len(previous_data) < 1 or previous_data[-1]["interval_end"] < period_to) and 
-       current_utc_timestamp.minute % 30 == 0)
-      ):
+  # Only our consumption within our period is still relevant, which will be none of it once our period has moved on
+  existing_data = []
+  if previous_data != None:
+    existing_data = [item for item in previous_data if item["interval_start"] >= period_from and item["interval_end"] <= period_to]
+
+  gaps = get_consumption_gaps(existing_data, period_from)
+  is_complete = len(existing_data) > 0 and existing_data[-1]["interval_end"] >= period_to and len(gaps) == 0
+
+  # We're refreshed by our scheduler at the start of each slot, so if we're missing anything we request it, no matter how
+  # late our refresh has run
+  if is_complete == False:
+    # Our consumption arrives in order, so we only need what's arrived since our last interval, unless
+    # earlier intervals are missing
+    if len(gaps) > 0:
+      request_from = gaps[0]["from"]
+    elif len(existing_data) > 0:
+      request_from = existing_data[-1]["interval_end"]
+    else:
+      request_from = period_from
+
     if (is_electricity == True):
-      data = await client.async_get_electricity_consumption(sensor_identifier, sensor_serial_number, period_from, period_to)
+      data = await client.async_get_electricity_consumption(sensor_identifier, sensor_serial_number, request_from, period_to)
     else:
-      data = await client.async_get_gas_consumption(sensor_identifier, sensor_serial_number, period_from, period_to)
+      data = await client.async_get_gas_consumption(sensor_identifier, sensor_serial_number, request_from, period_to)
     
+    # Our consumption is requested ordered by period, so it's already sorted
     if data != None and len(data) > 0:
-      data = __sort_consumption(data)
-      return data
+      return __merge_consumption(existing_data, data)
     
   if previous_data != None:
     return previous_data
@@ -42,76 +102,86 @@ def calculate_electricity_consumption(consumption_data, last_calculated_timestam
     sorted_consumption_data = __sort_consumption(consumption_data)
 
     if (last_calculated_timestamp == None or last_calculated_timestamp < sorted_consumption_data[-1]["interval_end"]):
-      total = 0
-
-      consumption_parts = []
-      for consumption in sorted_consumption_data:
-        total = total + consumption["consumption"]
-
-        current_consumption = consumption["consumption"]
-
-        consumption_parts.append({
-          "from": consumption["interval_start"],
-          "to": consumption["interval_end"],
-          "consumption": current_consumption,
-        })
-      
-      last_calculated_timestamp = sorted_consumption_data[-1]["interval_end"]
-
-      return {
-        "total": total,
-        "last_calculated_timestamp": last_calculated_timestamp,
-        "consumptions": consumption_parts
-      }
+      accumulator = OctopusEnergyConsumptionAccumulator(False)
+      accumulator.update(sorted_consumption_data)
+      return accumulator.get_consumption()
 
-async def async_calculate_electricity_cost(client: OctopusEnergyApiClient, consumption_data, last_calculated_timestamp, period_from, period_to, tariff_code, is_smart_meter):
+async def __async_calculate_cost(
+  consumption_data,
+  last_calculated_timestamp,
+  period_from,
+  period_to,
+  tariff_code,
+  async_get_rates,
+  async_get_standing_charge,
+  get_consumption_value,
+  cost_ledger: OctopusEnergyCostLedger
+):
   if (consumption_data != None and len(consumption_data) > 0):
 
     sorted_consumption_data = __sort_consumption(consumption_data)
 
     # Only calculate our consumption if our data has changed
     if (last_calculated_timestamp == None or last_calculated_timestamp < sorted_consumption_data[-1]["interval_end"]):
-      rates = await client.async_get_electricity_rates(tariff_code, is_smart_meter, period_from, period_to)
-      standard_charge_result = await client.async_get_electricity_standing_charge(tariff_code, period_from, period_to)
-
-      if (rates != None and len(rates) > 0 and standard_charge_result != None):
-        standard_charge = standard_charge_result["value_inc_vat"]
-
-        charges = []
-        total_cost_in_pence = 0
-        for consumption in sorted_consumption_data:
-          value = consumption["consumption"]
-          consumption_from = consumption["interval_start"]
-          consumption_to = consumption["interval_end"]
-
-          try:
-            rate = next(r for r in rates if r["valid_from"] == consumption_from and r["valid_to"] == consumption_to)
-          except StopIteration:
-            raise Exception(f"Failed to find rate for consumption between {consumption_from} and {consumption_to} for tariff {tariff_code}")
-
-          cost = (rate["value_inc_vat"] * value)
-          total_cost_in_pence = total_cost_in_pence + cost
-
-          charges.append({
-            "from": rate["valid_from"],
-            "to": rate["valid_to"],
-            "rate": f'{rate["value_inc_vat"]}p',
-            "consumption": f'{value} kWh',
-            "cost": f'£{round(cost / 100, 2)}'
-          })
-        
-        total_cost = round(total_cost_in_pence / 100, 2)
-        total_cost_plus_standing_charge = round((total_cost_in_pence + standard_charge) / 100, 2)
-
-        last_calculated_timestamp = sorted_consumption_data[-1]["interval_end"]
-
-        return {
-          "standing_charge": standard_charge,
-          "total_without_standing_charge": total_cost,
-          "total": total_cost_plus_standing_charge,
-          "last_calculated_timestamp": last_calculated_timestamp,
-          "charges": charges
-        }
+      # Our previous charges are only relevant if they were for the same tariff and period. Our ledger is stored, so we
+      # work on a copy which is only returned once all of our consumption has been priced
+      if cost_ledger == None or cost_ledger.is_for(tariff_code, period_from, period_to) == False:
+        new_cost_ledger = OctopusEnergyCostLedger(tariff_code, period_from, period_to)
+      else:
+        new_cost_ledger = cost_ledger.copy()
+
+      unpriced_consumption_data = new_cost_ledger.get_unpriced_consumption(sorted_consumption_data)
+      is_cost_ledger_changed = len(unpriced_consumption_data) > 0
+
+      if new_cost_ledger.standing_charge == None:
+        standard_charge_result = await async_get_standing_charge()
+        if standard_charge_result == None:
+          return None
+
+        new_cost_ledger.standing_charge = standard_charge_result["value_inc_vat"]
+        is_cost_ledger_changed = True
+
+      if len(unpriced_consumption_data) > 0:
+        rates = await async_get_rates()
+        if rates == None or len(rates) == 0:
+          return None
+
+        # Our rates will usually be the same for long periods, so our consumption is priced a span at a time
+        result = calculate_span_costs(rates, unpriced_consumption_data, get_consumption_value)
+        __raise_for_missing_intervals(result["missing_intervals"], tariff_code)
+
+        new_cost_ledger.add_spans(result["spans"], result["total"], unpriced_consumption_data[-1]["interval_end"])
+
+      # If nothing has changed, then we hand back the ledger we were given so it doesn't need to be stored again
+      if is_cost_ledger_changed:
+        cost_ledger = new_cost_ledger
+
+      standard_charge = cost_ledger.standing_charge
+      total_cost_in_pence = cost_ledger.total_cost_in_pence
+      total_cost = round(total_cost_in_pence / 100, 2)
+      total_cost_plus_standing_charge = round((total_cost_in_pence + standard_charge) / 100, 2)
+
+      return {
+        "standing_charge": standard_charge,
+        "total_without_standing_charge": total_cost,
+        "total": total_cost_plus_standing_charge,
+        "last_calculated_timestamp": cost_ledger.last_calculated_timestamp,
+        "total_intervals": cost_ledger.total_intervals,
+        "cost_ledger": cost_ledger
+      }
+
+async def async_calculate_electricity_cost(client: OctopusEnergyApiClient, consumption_data, last_calculated_timestamp, period_from, period_to, tariff_code, is_smart_meter, cost_ledger: OctopusEnergyCostLedger = None):
+  return await __async_calculate_cost(
+    consumption_data,
+    last_calculated_timestamp,
+    period_from,
+    period_to,
+    tariff_code,
+    lambda: client.async_get_electricity_rates(tariff_code, is_smart_meter, period_from, period_to),
+    lambda: client.async_get_electricity_standing_charge(tariff_code, period_from, period_to),
+    lambda consumption: consumption["consumption"],
+    cost_ledger
+  )
 
 # Adapted from https://www.theenergyshop.com/guides/how-to-convert-gas-units-to-kwh
 def convert_m3_to_kwh(value):
@@ -119,95 +189,112 @@ def convert_m3_to_kwh(value):
   kwh_value = kwh_value * 40.0 # Calorific value
   return round(kwh_value / 3.6, 3) # kWh Conversion factor
 
-def calculate_gas_consumption(consumption_data, last_calculated_timestamp):
-  if (consumption_data != None and len(consumption_data) > 0):
-
-    sorted_consumption_data = __sort_consumption(consumption_data)
-
-    if (last_calculated_timestamp == None or last_calculated_timestamp < sorted_consumption_data[-1]["interval_end"]):
-      total_m3 = 0
-      total_kwh = 0
-
-      consumption_parts = []
-      for consumption in sorted_consumption_data:
-        current_consumption_m3 = 0
-        current_consumption_kwh = 0
+class OctopusEnergyConsumptionAccumulator:
+  """
+  Keeps running totals of consumption, so that as consumption arrives only the new intervals need to be added.
+  Consumption is expected to be sorted, as it is when provided by our coordinators.
+  """
+
+  def __init__(self, is_gas: bool):
+    self._is_gas = is_gas
+    self.__reset()
+
+  def update(self, consumption_data):
+    """Add any new consumption to our totals. Returns True if our totals have changed"""
+    if consumption_data == None or len(consumption_data) == 0:
+      return False
+
+    # We can only carry on from our totals if the consumption they were calculated from is unchanged, otherwise
+    # our period has moved on or earlier intervals have been filled in
+    total_consumptions = len(self._consumptions)
+    if (total_consumptions > 0 and
+        len(consumption_data) >= total_consumptions and
+        consumption_data[0]["interval_start"] == self._consumptions[0]["from"] and
+        consumption_data[total_consumptions - 1]["interval_end"] == self._last_calculated_timestamp):
+      if consumption_data[-1]["interval_end"] <= self._last_calculated_timestamp:
+        return False
+
+      new_consumption_data = consumption_data[total_consumptions:]
+    else:
+      self.__reset()
+      new_consumption_data = consumption_data
 
-        current_consumption = consumption["consumption"]
-        
+    consumption_parts = []
+    for consumption in new_consumption_data:
+      current_consumption = consumption["consumption"]
+      if self._is_gas:
         # Despite what the documentation (https://developer.octopus.energy/docs/api/#consumption) states, after a few emails with 
         # Octopus Energy and personal experience, gas data is always reported in m3
-        current_consumption_m3 = current_consumption
         current_consumption_kwh = convert_m3_to_kwh(current_consumption)
-
-        total_m3 = total_m3 + current_consumption_m3
-        total_kwh = total_kwh + current_consumption_kwh
+        self._total = self._total + current_consumption
+        self._total_kwh = self._total_kwh + current_consumption_kwh
 
         consumption_parts.append({
           "from": consumption["interval_start"],
           "to": consumption["interval_end"],
-          "consumption_m3": current_consumption_m3,
+          "consumption_m3": current_consumption,
           "consumption_kwh": current_consumption_kwh,
         })
-      
-      last_calculated_timestamp = sorted_consumption_data[-1]["interval_end"]
+      else:
+        self._total = self._total + current_consumption
 
+        consumption_parts.append({
+          "from": consumption["interval_start"],
+          "to": consumption["interval_end"],
+          "consumption": current_consumption,
+        })
+
+    # Our consumption is exposed as part of our attributes, so we create a new list rather than changing the one we've exposed
+    self._consumptions = self._consumptions + consumption_parts
+    self._last_calculated_timestamp = new_consumption_data[-1]["interval_end"]
+    return True
+
+  def get_consumption(self):
+    """Get our accumulated consumption, or None if we haven't accumulated any"""
+    if len(self._consumptions) == 0:
+      return None
+
+    if self._is_gas:
       return {
-        "total_m3": round(total_m3, 3),
-        "total_kwh": round(total_kwh, 3),
-        "last_calculated_timestamp": last_calculated_timestamp,
-        "consumptions": consumption_parts
+        "total_m3": round(self._total, 3),
+        "total_kwh": round(self._total_kwh, 3),
+        "last_calculated_timestamp": self._last_calculated_timestamp,
+        "consumptions": self._consumptions
       }
-      
-async def async_calculate_gas_cost(client: OctopusEnergyApiClient, consumption_data, last_calculated_timestamp, period_from, period_to, sensor):
+
+    return {
+      "total": self._total,
+      "last_calculated_timestamp": self._last_calculated_timestamp,
+      "consumptions": self._consumptions
+    }
+
+  def __reset(self):
+    self._total = 0
+    self._total_kwh = 0
+    self._last_calculated_timestamp = None
+    self._consumptions = []
+
+def calculate_gas_consumption(consumption_data, last_calculated_timestamp):
   if (consumption_data != None and len(consumption_data) > 0):
 
     sorted_consumption_data = __sort_consumption(consumption_data)
 
-    # Only calculate our consumption if our data has changed
     if (last_calculated_timestamp == None or last_calculated_timestamp < sorted_consumption_data[-1]["interval_end"]):
-      rates = await client.async_get_gas_rates(sensor["tariff_code"], period_from, period_to)
-      standard_charge_result = await client.async_get_gas_standing_charge(sensor["tariff_code"], period_from, period_to)
-
-      if (rates != None and len(rates) > 0 and standard_charge_result != None):
-        standard_charge = standard_charge_result["value_inc_vat"]
-
-        charges = []
-        total_cost_in_pence = 0
-        for consumption in sorted_consumption_data:
-          value = consumption["consumption"]
-
-          # Despite what the documentation (https://developer.octopus.energy/docs/api/#consumption) states, after a few emails with 
-          # Octopus Energy and personal experience, gas data is always reported in m3. So we need to convert to kWh before we calculate the cost
-          value = convert_m3_to_kwh(value)
-
-          consumption_from = consumption["interval_start"]
-          consumption_to = consumption["interval_end"]
-
-          try:
-            rate = next(r for r in rates if r["valid_from"] == consumption_from and r["valid_to"] == consumption_to)
-          except StopIteration:
-            raise Exception(f"Failed to find rate for consumption between {consumption_from} and {consumption_to} for tariff {sensor['tariff_code']}")
-
-          cost = (rate["value_inc_vat"] * value)
-          total_cost_in_pence = total_cost_in_pence + cost
-
-          charges.append({
-            "from": rate["valid_from"],
-            "to": rate["valid_to"],
-            "rate": f'{rate["value_inc_vat"]}p',
-            "consumption": f'{value} kWh',
-            "cost": f'£{round(cost / 100, 2)}'
-          })
-        
-        total_cost = round(total_cost_in_pence / 100, 2)
-        total_cost_plus_standing_charge = round((total_cost_in_pence + standard_charge) / 100, 2)
-        last_calculated_timestamp = sorted_consumption_data[-1]["interval_end"]
-
-        return {
-          "standing_charge": standard_charge,
-          "total_without_standing_charge": total_cost,
-          "total": total_cost_plus_standing_charge,
-          "last_calculated_timestamp": last_calculated_timestamp,
-          "charges": charges
-        }
\ No newline at end of file
+      accumulator = OctopusEnergyConsumptionAccumulator(True)
+      accumulator.update(sorted_consumption_data)
+      return accumulator.get_consumption()
+      
+async def async_calculate_gas_cost(client: OctopusEnergyApiClient, consumption_data, last_calculated_timestamp, period_from, period_to, sensor, cost_ledger: OctopusEnergyCostLedger = None):
+  return await __async_calculate_cost(
+    consumption_data,
+    last_calculated_timestamp,
+    period_from,
+    period_to,
+    sensor["tariff_code"],
+    lambda: client.async_get_gas_rates(sensor["tariff_code"], period_from, period_to),
+    lambda: client.async_get_gas_standing_charge(sensor["tariff_code"], period_from, period_to),
+    # Despite what the documentation (https://developer.octopus.energy/docs/api/#consumption) states, after a few emails with 
+    # Octopus Energy and personal experience, gas data is always reported in m3. So we need to convert to kWh before we calculate the cost
+    lambda consumption: convert_m3_to_kwh(consumption["consumption"]),
+    cost_ledger
+  )
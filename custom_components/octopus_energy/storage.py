@@ -0,0 +1,186 @@
+import logging
+from datetime import datetime, timedelta
+from homeassistant.core import HomeAssistant
+from homeassistant.util.dt import (utcnow, parse_datetime)
+from homeassistant.helpers.storage import Store
+
+from .const import (
+  DOMAIN
+)
+
+from .rate_timeline import RateTimeline
+from .cost_ledger import OctopusEnergyCostLedger
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 2
+STORAGE_KEY = f"{DOMAIN}.data"
+
+# How long to wait before saving our changes, so multiple changes in quick succession result in a single write
+STORAGE_SAVE_DELAY = 30
+
+# How long we keep our rates, consumption and costs for before they're removed during compaction
+RATES_RETENTION = timedelta(days=2)
+CONSUMPTION_RETENTION = timedelta(days=3)
+COST_LEDGER_RETENTION = timedelta(days=3)
+
+class OctopusEnergyStore(Store):
+  """Store which discards data from previous schema versions, as everything we hold can be retrieved again"""
+
+  async def _async_migrate_func(self, old_version, *args):
+    _LOGGER.debug(f'Discarding stored data from version {old_version}')
+    return {}
+
+class OctopusEnergyDataStore:
+  """Persists our rates, consumption and calculated costs, so they're available straight away after a restart. Rates are held run length encoded"""
+
+  def __init__(self, hass: HomeAssistant):
+    self._store = OctopusEnergyStore(hass, STORAGE_VERSION, STORAGE_KEY)
+    self._rates = {}
+    self._consumption = {}
+    self._cost_ledgers = {}
+
+  async def async_load(self):
+    """Load our previously stored data"""
+    data = await self._store.async_load()
+    if data is None:
+      return
+
+    for (key, rates) in data.get("rates", {}).items():
+      self._rates[key] = RateTimeline.from_rates(map(lambda rate: {
+        "value_exc_vat": rate["value_exc_vat"],
+        "value_inc_vat": rate["value_inc_vat"],
+        "valid_from": parse_datetime(rate["valid_from"]),
+        "valid_to": parse_datetime(rate["valid_to"]),
+        "tariff_code": rate["tariff_code"]
+      }, rates), run_length_encoded=True)
+
+    for (key, consumption) in data.get("consumption", {}).items():
+      self._consumption[key] = list(map(lambda item: {
+        "consumption": item["consumption"],
+        "interval_start": parse_datetime(item["interval_start"]),
+        "interval_end": parse_datetime(item["interval_end"])
+      }, consumption))
+
+    for (key, cost_ledger) in data.get("cost_ledgers", {}).items():
+      self._cost_ledgers[key] = OctopusEnergyCostLedger(
+        cost_ledger["tariff_code"],
+        parse_datetime(cost_ledger["period_from"]),
+        parse_datetime(cost_ledger["period_to"]),
+        cost_ledger["standing_charge"],
+        list(map(lambda span: {
+          **span,
+          "from": parse_datetime(span["from"]),
+          "to": parse_datetime(span["to"])
+        }, cost_ledger["spans"])),
+        cost_ledger["total_cost_in_pence"],
+        parse_datetime(cost_ledger["last_calculated_timestamp"]) if cost_ledger["last_calculated_timestamp"] != None else None
+      )
+
+    _LOGGER.debug(f'Loaded {len(self._rates)} rate set(s), {len(self._consumption)} consumption set(s) and {len(self._cost_ledgers)} cost ledger(s)')
+
+  def get_rates(self, meter_point, tariff_code, is_smart_meter, period_from: datetime, period_to: datetime):
+    """Get the stored rates within the period, which may not cover all of it. None is returned if we have no rates for the meter"""
+    key = self.__get_rates_key(meter_point, tariff_code, is_smart_meter)
+    if key not in self._rates:
+      return None
+
+    return RateTimeline.from_rates([rate for rate in self._rates[key] if rate["valid_from"] >= period_from and rate["valid_to"] <= period_to], run_length_encoded=True)
+
+  def set_rates(self, meter_point, tariff_code, is_smart_meter, rates):
+    """Merge the rates into our stored rates"""
+    key = self.__get_rates_key(meter_point, tariff_code, is_smart_meter)
+    merged_rates = {}
+    for rate in self._rates.get(key, []):
+      merged_rates[rate["valid_from"]] = rate
+    for rate in rates:
+      merged_rates[rate["valid_from"]] = rate
+
+    self._rates[key] = RateTimeline.from_rates(sorted(merged_rates.values(), key=lambda rate: rate["valid_from"]), run_length_encoded=True)
+    self.__schedule_save()
+
+  def get_consumption(self, identifier, serial_number):
+    """Get the stored consumption for the meter"""
+    return self._consumption.get(self.__get_consumption_key(identifier, serial_number))
+
+  def set_consumption(self, identifier, serial_number, consumption):
+    """Replace the stored consumption for the meter"""
+    self._consumption[self.__get_consumption_key(identifier, serial_number)] = consumption
+    self.__schedule_save()
+
+  def get_cost_ledger(self, identifier, serial_number):
+    """Get the stored cost ledger for the meter"""
+    return self._cost_ledgers.get(self.__get_consumption_key(identifier, serial_number))
+
+  def set_cost_ledger(self, identifier, serial_number, cost_ledger: OctopusEnergyCostLedger):
+    """Replace the stored cost ledger for the meter"""
+    self._cost_ledgers[self.__get_consumption_key(identifier, serial_number)] = cost_ledger
+    self.__schedule_save()
+
+  def compact(self, current: datetime):
+    """Remove any data that is too old to be useful"""
+    for key in list(self._rates.keys()):
+      self._rates[key] = RateTimeline.from_rates([rate for rate in self._rates[key] if rate["valid_to"] >= current - RATES_RETENTION], run_length_encoded=True)
+      if len(self._rates[key]) == 0:
+        del self._rates[key]
+
+    for key in list(self._consumption.keys()):
+      self._consumption[key] = [item for item in self._consumption[key] if item["interval_end"] >= current - CONSUMPTION_RETENTION]
+      if len(self._consumption[key]) == 0:
+        del self._consumption[key]
+
+    for key in list(self._cost_ledgers.keys()):
+      if self._cost_ledgers[key].period_to < current - COST_LEDGER_RETENTION:
+        del self._cost_ledgers[key]
+
+  def __get_rates_key(self, meter_point, tariff_code, is_smart_meter):
+    return f'{meter_point}_{tariff_code}_{is_smart_meter}'
+
+  def __get_consumption_key(self, identifier, serial_number):
+    return f'{identifier}_{serial_number}'
+
+  def __schedule_save(self):
+    self._store.async_delay_save(self.__data_to_save, STORAGE_SAVE_DELAY)
+
+  def __data_to_save(self):
+    self.compact(utcnow())
+
+    rates = {}
+    for (key, items) in self._rates.items():
+      rates[key] = list(map(lambda rate: {
+        "value_exc_vat": rate["value_exc_vat"],
+        "value_inc_vat": rate["value_inc_vat"],
+        "valid_from": rate["valid_from"].isoformat(),
+        "valid_to": rate["valid_to"].isoformat(),
+        "tariff_code": rate["tariff_code"]
+      }, items))
+
+    consumption = {}
+    for (key, items) in self._consumption.items():
+      consumption[key] = list(map(lambda item: {
+        "consumption": item["consumption"],
+        "interval_start": item["interval_start"].isoformat(),
+        "interval_end": item["interval_end"].isoformat()
+      }, items))
+
+    cost_ledgers = {}
+    for (key, cost_ledger) in self._cost_ledgers.items():
+      cost_ledgers[key] = {
+        "tariff_code": cost_ledger.tariff_code,
+        "period_from": cost_ledger.period_from.isoformat(),
+        "period_to": cost_ledger.period_to.isoformat(),
+        "standing_charge": cost_ledger.standing_charge,
+        "spans": list(map(lambda span: {
+          **span,
+          "from": span["from"].isoformat(),
+          "to": span["to"].isoformat()
+        }, cost_ledger.spans)),
+        "total_cost_in_pence": cost_ledger.total_cost_in_pence,
+        "last_calculated_timestamp": cost_ledger.last_calculated_timestamp.isoformat() if cost_ledger.last_calculated_timestamp != None else None
+      }
+
+    return {
+      "rates": rates,
+      "consumption": consumption,
+      "cost_ledgers": cost_ledgers,
+    }
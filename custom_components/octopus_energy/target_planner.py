@@ -0,0 +1,150 @@
+import logging
+from datetime import datetime
+
+from .const import (
+  CONFIG_TARGET_HOURS,
+  CONFIG_TARGET_TYPE,
+  CONFIG_TARGET_START_TIME,
+  CONFIG_TARGET_END_TIME,
+  CONFIG_TARGET_MPAN,
+  CONFIG_TARGET_OFFSET,
+  CONFIG_TARGET_ROLLING_TARGET
+)
+
+from .target_sensor_utils import (
+  get_target_period,
+  get_target_rates_cache_key,
+  create_rate_search_index,
+  calculate_continuous_time_candidates_from_index,
+  calculate_intermittent_times_from_index
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# The number of continuous blocks to calculate, including the chosen block
+CONTINUOUS_CANDIDATE_COUNT = 3
+
+class OctopusEnergyTargetRatePlanner:
+  """Calculates the target times for all of our target rate sensors, sharing the work for targets that use the same rates"""
+
+  def __init__(self, candidate_count: int = CONTINUOUS_CANDIDATE_COUNT):
+    self._candidate_count = candidate_count
+    self._targets = {}
+    self._search_indexes = {}
+    self._stats = {
+      "plans": 0,
+      "search_indexes_created": 0,
+      "cache_hits": 0,
+      "cache_misses": 0,
+    }
+
+  def get_stats(self):
+    return self._stats.copy()
+
+  def register(self, target_id: str, config, is_due, on_planned):
+    """Register a target. When planned, on_planned is called with the result if is_due returns True. Returns a function to unregister the target"""
+    self._targets[target_id] = {
+      "config": config,
+      "is_due": is_due,
+      "on_planned": on_planned,
+      "cache_key": None,
+      "result": None
+    }
+
+    def unregister():
+      self._targets.pop(target_id, None)
+
+    return unregister
+
+  def plan(self, current_date: datetime, all_rates, rates_versions, target_ids: list = None):
+    """Calculate the target times for each registered target that is due. If target_ids is provided, then only those targets are planned"""
+    self._stats["plans"] += 1
+
+    # Targets can unregister as part of being told about their result
+    for (target_id, target) in list(self._targets.items()):
+      if target_ids != None and target_id not in target_ids:
+        continue
+
+      if target["is_due"]() == False:
+        continue
+
+      (rates_key, rates) = self.__get_rates(target["config"], all_rates)
+      rates_version = rates_versions.get(rates_key) if rates_key != None else None
+      target["on_planned"](self.__plan_target(current_date, target, rates_key, rates_version, rates))
+
+  def __plan_target(self, current_date: datetime, target, rates_key, rates_version, rates):
+    config = target["config"]
+    target_type = config[CONFIG_TARGET_TYPE]
+    target_hours = float(config[CONFIG_TARGET_HOURS])
+
+    # True by default for backwards compatibility
+    is_rolling_target = True
+    if CONFIG_TARGET_ROLLING_TARGET in config:
+      is_rolling_target = config[CONFIG_TARGET_ROLLING_TARGET]
+
+    (target_start, target_end) = get_target_period(
+      current_date,
+      config[CONFIG_TARGET_START_TIME] if CONFIG_TARGET_START_TIME in config else None,
+      config[CONFIG_TARGET_END_TIME] if CONFIG_TARGET_END_TIME in config else None,
+      config[CONFIG_TARGET_OFFSET] if CONFIG_TARGET_OFFSET in config else None,
+      is_rolling_target
+    )
+
+    # If our rates and target period haven't changed since our last calculation, then we'll get the same result
+    cache_key = get_target_rates_cache_key(rates_key, rates_version, target_type, target_hours, target_start, target_end)
+
+    if rates_version != None and cache_key == target["cache_key"]:
+      self._stats["cache_hits"] += 1
+      return { **target["result"], "is_cached": True }
+
+    self._stats["cache_misses"] += 1
+
+    search_index = self.__get_search_index(rates_key, rates_version, rates)
+    if (target_type == "Continuous"):
+      candidates = calculate_continuous_time_candidates_from_index(search_index, target_start, target_end, target_hours, self._candidate_count)
+      target_rates = candidates[0]["rates"] if len(candidates) > 0 else []
+    elif (target_type == "Intermittent"):
+      candidates = None
+      target_rates = calculate_intermittent_times_from_index(search_index, target_start, target_end, target_hours)
+    else:
+      _LOGGER.error(f"Unexpected target type: {target_type}")
+      candidates = None
+      target_rates = []
+
+    target["cache_key"] = cache_key
+    target["result"] = {
+      "target_rates": target_rates,
+      "candidates": candidates,
+      "is_cached": False
+    }
+
+    return target["result"]
+
+  def __get_rates(self, config, all_rates):
+    if all_rates == None:
+      _LOGGER.debug("Rate data missing")
+      return (None, None)
+
+    # For backwards compatibility, if CONFIG_TARGET_MPAN is not set, then pick the first set
+    if CONFIG_TARGET_MPAN not in config:
+      rates_key = next(iter(all_rates.keys()), None)
+    else:
+      rates_key = config[CONFIG_TARGET_MPAN]
+
+    return (rates_key, all_rates.get(rates_key))
+
+  def __get_search_index(self, rates_key, rates_version, rates):
+    # Only sort and total our rates once for each version, no matter how many targets use them
+    if rates_version != None and rates_key in self._search_indexes:
+      (search_index_version, search_index) = self._search_indexes[rates_key]
+      if search_index_version == rates_version:
+        return search_index
+
+    search_index = create_rate_search_index(rates)
+    self._stats["search_indexes_created"] += 1
+    _LOGGER.debug(f"Created search index of {len(search_index['rates'])} rates for '{rates_key}'")
+
+    if rates_version != None:
+      self._search_indexes[rates_key] = (rates_version, search_index)
+
+    return search_index
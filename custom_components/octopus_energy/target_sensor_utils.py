@@ -1,12 +1,17 @@
 from datetime import datetime, timedelta
 import math
+import heapq
+import bisect
+import itertools
 from homeassistant.util.dt import (as_utc, parse_datetime)
-from .utils import (apply_offset)
+from .utils import (apply_offset, get_valid_from)
+from .rate_timeline import (RateTimeline, RATE_SECONDS)
 import logging
 
 _LOGGER = logging.getLogger(__name__)
 
-def __get_applicable_rates(current_date, target_start_time, target_end_time, rates, target_start_offset, is_rolling_target):
+def get_target_period(current_date, target_start_time, target_end_time, target_start_offset = None, is_rolling_target = True):
+  """Get the period, in UTC, that our target times must fall within"""
   if target_end_time != None:
     # Get the target end for today. If this is in the past, then look at tomorrow
     target_end = parse_datetime(current_date.strftime(f"%Y-%m-%dT{target_end_time}:00%z"))
@@ -43,103 +48,164 @@ def __get_applicable_rates(current_date, target_start_time, target_end_time, rat
   if target_end is not None:
     target_end = as_utc(target_end)
 
+  return (target_start, target_end)
+
+def get_target_rates_cache_key(rates_key, rates_version, target_type, target_hours, target_start, target_end):
+  """
+  Get the key for the inputs of our target times. Our targets only depend on the rates within our target period, so
+  if neither has changed since our last calculation then we'll get the same result. Rates start on the half hour, so
+  our period start can be rounded up to the next slot without changing which rates are applicable
+  """
+  return (
+    rates_key,
+    rates_version,
+    target_type,
+    target_hours,
+    math.ceil(target_start.timestamp() / RATE_SECONDS),
+    target_end
+  )
+
+def create_rate_search_index(rates):
+  """Sort our rates and precompute their running totals, so any number of targets can be calculated from them"""
+  if isinstance(rates, RateTimeline):
+    # Our timeline is already in ascending order and knows when each rate starts, so we don't need to create any datetimes
+    sorted_rates = rates
+    starts = rates.starts
+    ends = list(map(lambda start: start + RATE_SECONDS, starts))
+    values = rates.values_inc_vat
+  else:
+    sorted_rates = sorted(rates, key=get_valid_from) if rates != None else []
+    starts = list(map(lambda rate: rate["valid_from"].timestamp(), sorted_rates))
+    ends = list(map(lambda rate: rate["valid_to"].timestamp(), sorted_rates))
+    values = list(map(lambda rate: rate["value_inc_vat"], sorted_rates))
+
+  return {
+    "rates": sorted_rates,
+    "starts": starts,
+    "ends": ends,
+    "prefix_totals": [0] + list(itertools.accumulate(values))
+  }
+
+def __get_applicable_range(search_index, target_start, target_end):
   _LOGGER.debug(f'Finding rates between {target_start} and {target_end}')
 
-  # Retrieve the rates that are applicable for our target rate
-  applicable_rates = []
-  if rates != None:
-    for rate in rates:
-      if rate["valid_from"] >= target_start and (target_end == None or rate["valid_to"] <= target_end):
-        applicable_rates.append(rate)
+  # Our rates are in ascending order and don't overlap, so our applicable rates are all next to each other
+  start_index = bisect.bisect_left(search_index["starts"], target_start.timestamp())
+  end_index = bisect.bisect_right(search_index["ends"], target_end.timestamp()) if target_end != None else len(search_index["rates"])
 
-  return applicable_rates
+  _LOGGER.debug(f'{max(end_index - start_index, 0)} applicable rates found')
 
-def __get_rate(rate):
-  return rate["value_inc_vat"]
+  return (start_index, max(start_index, end_index))
 
-def __get_valid_to(rate):
-  return rate["valid_to"]
+def calculate_continuous_time_candidates_from_index(search_index, target_start, target_end, target_hours, candidate_count = 1):
+  """Find the cheapest blocks of continuous time within the period, cheapest first"""
+  (start_index, end_index) = __get_applicable_range(search_index, target_start, target_end)
+  total_required_rates = math.ceil(target_hours * 2)
+  if total_required_rates < 1 or total_required_rates > (end_index - start_index):
+    return []
 
-def calculate_continuous_times(current_date, target_start_time, target_end_time, target_hours, rates, target_start_offset = None, is_rolling_target = True):
-  applicable_rates = __get_applicable_rates(current_date, target_start_time, target_end_time, rates, target_start_offset, is_rolling_target)
-  applicable_rates_count = len(applicable_rates)
+  # Our totals are rounded, so that floating point errors don't change which of two equally priced blocks is picked.
+  # When blocks are equally priced, the earliest block is picked
+  rates = search_index["rates"]
+  prefix_totals = search_index["prefix_totals"]
+  window_totals = [
+    (round(prefix_totals[index + total_required_rates] - prefix_totals[index], 6), index)
+    for index in range(start_index, end_index - total_required_rates + 1)
+  ]
+  heapq.heapify(window_totals)
+
+  # Our candidates are alternatives to each other, so any block that overlaps a block that has already been picked is skipped
+  candidates = []
+  picked_indexes = []
+  while len(candidates) < candidate_count and len(window_totals) > 0:
+    (total, index) = heapq.heappop(window_totals)
+    if any(abs(index - picked_index) < total_required_rates for picked_index in picked_indexes):
+      continue
+
+    picked_indexes.append(index)
+    candidates.append({
+      "total": total,
+      "rates": rates[index:(index + total_required_rates)]
+    })
+
+  return candidates
+
+def calculate_intermittent_times_from_index(search_index, target_start, target_end, target_hours):
+  """Find the cheapest rates within the period, in ascending order"""
+  (start_index, end_index) = __get_applicable_range(search_index, target_start, target_end)
   total_required_rates = math.ceil(target_hours * 2)
+  if ((end_index - start_index) < total_required_rates):
+    return []
+
+  # Only select the cheapest rates rather than sorting them all. This is equivalent to a stable sort, so equally priced
+  # rates are picked in time order
+  rates = search_index["rates"]
+  cheapest_indexes = heapq.nsmallest(total_required_rates, range(start_index, end_index), key=lambda index: rates[index]["value_inc_vat"])
 
-  best_continuous_rates = None
-  best_continuous_rates_total = None
-
-  _LOGGER.debug(f'{applicable_rates_count} applicable rates found')
-
-  # Loop through our rates and try and find the block of time that meets our desired
-  # hours and has the lowest combined rates
-  for index, rate in enumerate(applicable_rates):
-    continuous_rates = [rate]
-    continuous_rates_total = rate["value_inc_vat"]
-    
-    for offset in range(1, total_required_rates):
-      if (index + offset) < applicable_rates_count:
-        offset_rate = applicable_rates[(index + offset)]
-        continuous_rates.append(offset_rate)
-        continuous_rates_total += offset_rate["value_inc_vat"]
-      else:
-        break
-    
-    if ((best_continuous_rates == None or continuous_rates_total < best_continuous_rates_total) and len(continuous_rates) == total_required_rates):
-      best_continuous_rates = continuous_rates
-      best_continuous_rates_total = continuous_rates_total
-    else:
-      _LOGGER.debug(f'Total rates for current block {continuous_rates_total}. Total rates for best block {best_continuous_rates_total}')
-
-  if best_continuous_rates is not None:
-    # Make sure our rates are in ascending order before returning
-    best_continuous_rates.sort(key=__get_valid_to)
-    return best_continuous_rates
+  # Our rates are in ascending order, so sorting our indexes puts our rates back in ascending order
+  cheapest_indexes.sort()
+  return list(map(lambda index: rates[index], cheapest_indexes))
+
+def calculate_continuous_time_candidates(current_date, target_start_time, target_end_time, target_hours, rates, target_start_offset = None, is_rolling_target = True, candidate_count = 1):
+  """Find the cheapest blocks of continuous time, cheapest first"""
+  (target_start, target_end) = get_target_period(current_date, target_start_time, target_end_time, target_start_offset, is_rolling_target)
+  return calculate_continuous_time_candidates_from_index(create_rate_search_index(rates), target_start, target_end, target_hours, candidate_count)
+
+def calculate_continuous_times(current_date, target_start_time, target_end_time, target_hours, rates, target_start_offset = None, is_rolling_target = True):
+  candidates = calculate_continuous_time_candidates(current_date, target_start_time, target_end_time, target_hours, rates, target_start_offset, is_rolling_target)
+  if len(candidates) > 0:
+    return candidates[0]["rates"]
   
   return []
 
 def calculate_intermittent_times(current_date, target_start_time, target_end_time, target_hours, rates, target_start_offset = None, is_rolling_target = True):
-  applicable_rates = __get_applicable_rates(current_date, target_start_time, target_end_time, rates, target_start_offset, is_rolling_target)
-  total_required_rates = math.ceil(target_hours * 2)
+  (target_start, target_end) = get_target_period(current_date, target_start_time, target_end_time, target_start_offset, is_rolling_target)
+  return calculate_intermittent_times_from_index(create_rate_search_index(rates), target_start, target_end, target_hours)
 
-  applicable_rates.sort(key=__get_rate)
-  applicable_rates = applicable_rates[:total_required_rates]
-  
-  _LOGGER.debug(f'{len(applicable_rates)} applicable rates found')
-  
-  if (len(applicable_rates) < total_required_rates):
-    return []
+def create_target_schedule(applicable_rates, offset: str = None):
+  """Precompute when each of our target rates starts and ends with our offset applied, so they can be searched quickly"""
+  offset_delta = timedelta(0)
+  if offset != None and len(applicable_rates) > 0:
+    reference = applicable_rates[0]["valid_from"]
+    offset_delta = apply_offset(reference, offset) - reference
 
-  # Make sure our rates are in ascending order before returning
-  applicable_rates.sort(key=__get_valid_to)
-  return applicable_rates
+  return {
+    "offset": offset_delta,
+    "starts": list(map(lambda rate: rate["valid_from"] + offset_delta, applicable_rates)),
+    "ends": list(map(lambda rate: rate["valid_to"] + offset_delta, applicable_rates))
+  }
 
-def is_target_rate_active(current_date: datetime, applicable_rates, offset: str = None):
+def is_target_schedule_active(current_date: datetime, schedule):
+  """Determine if our schedule is active, with the next time our schedule starts a target rate with our offset applied"""
   is_active = False
   next_time = None
-  total_applicable_rates = len(applicable_rates)
+  starts = schedule["starts"]
+  total_applicable_rates = len(starts)
 
   if (total_applicable_rates > 0):
-    if (current_date < applicable_rates[0]["valid_from"]):
-      next_time = applicable_rates[0]["valid_from"]
-
-    for index, rate in enumerate(applicable_rates):
-      if (offset != None):
-        valid_from = apply_offset(rate["valid_from"], offset)
-        valid_to = apply_offset(rate["valid_to"], offset)
-      else:
-        valid_from = rate["valid_from"]
-        valid_to = rate["valid_to"]
-
-      if current_date >= valid_from and current_date < valid_to:
-        is_active = True
-
-        next_index = index + 1
-        if (next_index < total_applicable_rates):
-          next_time = applicable_rates[next_index]["valid_from"]
-        
-        break
+    if (current_date < starts[0]):
+      next_time = starts[0]
+
+    # Our rates are in ascending order, so the only rate we can be in is the last one to start before now
+    index = bisect.bisect_right(starts, current_date) - 1
+    if index >= 0 and current_date < schedule["ends"][index]:
+      is_active = True
+
+      next_index = index + 1
+      if (next_index < total_applicable_rates):
+        next_time = starts[next_index]
 
   return {
     "next_time": next_time,
     "is_active": is_active,
   }
+
+def is_target_rate_active(current_date: datetime, applicable_rates, offset: str = None):
+  schedule = create_target_schedule(applicable_rates, offset)
+  result = is_target_schedule_active(current_date, schedule)
+
+  # Our next time is based on our rates, without our offset
+  if result["next_time"] != None:
+    result["next_time"] = result["next_time"] - schedule["offset"]
+
+  return result
@@ -0,0 +1,71 @@
+import logging
+import asyncio
+from datetime import timedelta
+from homeassistant.util.dt import (utcnow)
+
+from .utils import get_token_expiry
+
+_LOGGER = logging.getLogger(__name__)
+
+# Kraken tokens are valid for an hour. This is used if we're unable to determine the expiry from the token itself
+DEFAULT_TOKEN_LIFETIME = timedelta(hours=1)
+
+# How long before the token expires that we should start refreshing it in the background
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+class OctopusEnergyTokenManager:
+  """Caches the Kraken token, refreshing it shortly before it expires"""
+
+  def __init__(self, async_request_token):
+    self._async_request_token = async_request_token
+    self._token = None
+    self._expires_at = None
+    self._refresh_task = None
+
+  @property
+  def expires_at(self):
+    return self._expires_at
+
+  async def async_get_token(self):
+    """Get a valid token, only requesting a new one if our cached token has expired"""
+    current = utcnow()
+    if self._token is not None and current < self._expires_at:
+      # Our token is still valid, but will expire soon so refresh it without holding up the caller
+      if current >= (self._expires_at - TOKEN_REFRESH_MARGIN):
+        self.__start_refresh(True)
+
+      return self._token
+
+    # Shield the refresh so a cancelled caller doesn't cancel the refresh for everyone else waiting on it
+    return await asyncio.shield(self.__start_refresh(False))
+
+  def invalidate(self):
+    """Discard our cached token so the next request retrieves a new one"""
+    self._token = None
+    self._expires_at = None
+
+  def __start_refresh(self, is_background):
+    # Only allow one refresh to be in flight, so multiple callers share the same request
+    if self._refresh_task is None or self._refresh_task.done():
+      self._refresh_task = asyncio.get_running_loop().create_task(self.__async_refresh())
+      if is_background:
+        self._refresh_task.add_done_callback(self.__on_background_refresh_done)
+
+    return self._refresh_task
+
+  async def __async_refresh(self):
+    token = await self._async_request_token()
+    if token is not None:
+      expires_at = get_token_expiry(token)
+      if expires_at is None:
+        expires_at = utcnow() + DEFAULT_TOKEN_LIFETIME
+
+      self._token = token
+      self._expires_at = expires_at
+      _LOGGER.debug(f'Kraken token refreshed; expires_at: {expires_at}')
+
+    return token
+
+  def __on_background_refresh_done(self, task):
+    if task.cancelled() == False and task.exception() is not None:
+      _LOGGER.warning(f'Failed to refresh Kraken token in the background: {task.exception()}')
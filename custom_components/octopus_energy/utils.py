@@ -1,13 +1,19 @@
 from datetime import date, datetime, timedelta
-from homeassistant.util.dt import (as_utc, parse_datetime)
+from homeassistant.util.dt import (as_utc, parse_datetime, utc_from_timestamp)
 
 import re
+import math
+import json
+import base64
 
 from .const import (
   REGEX_TARIFF_PARTS,
   REGEX_OFFSET_PARTS,
 )
 
+from .rate_timeline import RateTimeline
+from .agreement_index import OctopusEnergyAgreementIndex
+
 def get_tariff_parts(tariff_code):
   matches = re.search(REGEX_TARIFF_PARTS, tariff_code)
   if matches == None:
@@ -28,30 +34,29 @@ def get_tariff_parts(tariff_code):
   }
 
 def get_active_tariff_code(utcnow: datetime, agreements):
-  latest_agreement = None
-  latest_valid_from = None
-
-  # Find our latest agreement
-  for agreement in agreements:
-    if agreement["tariff_code"] == None:
-      continue
+  """Get the tariff code active at the specified time. Agreements can either be raw or already parsed into an index"""
+  if isinstance(agreements, OctopusEnergyAgreementIndex) == False:
+    agreements = OctopusEnergyAgreementIndex(agreements)
 
-    valid_from = as_utc(parse_datetime(agreement["valid_from"]))
+  return agreements.get_tariff_code(utcnow)
 
-    if utcnow >= valid_from and (latest_valid_from == None or valid_from > latest_valid_from):
+def get_token_expiry(token: str):
+  """Extract when a JWT expires from its payload, returning None if this can't be determined"""
+  parts = token.split(".")
+  if len(parts) != 3:
+    return None
 
-      latest_valid_to = None
-      if "valid_to" in agreement and agreement["valid_to"] != None:
-        latest_valid_to = as_utc(parse_datetime(agreement["valid_to"]))
+  try:
+    # JWT payloads are base64 url encoded with their padding removed
+    payload = parts[1] + "=" * (-len(parts[1]) % 4)
+    claims = json.loads(base64.urlsafe_b64decode(payload))
+  except ValueError:
+    return None
 
-      if latest_valid_to == None or latest_valid_to >= utcnow:
-        latest_agreement = agreement
-        latest_valid_from = valid_from
+  if isinstance(claims, dict) == False or "exp" not in claims:
+    return None
 
-  if latest_agreement != None:
-    return latest_agreement["tariff_code"]
-  
-  return None
+  return utc_from_timestamp(claims["exp"])
 
 def apply_offset(date_time: datetime, offset: str, inverse = False):
   matches = re.search(REGEX_OFFSET_PARTS, offset)
@@ -70,11 +75,27 @@ def apply_offset(date_time: datetime, offset: str, inverse = False):
 
 def get_valid_from(rate):
   return rate["valid_from"]
-    
-def rates_to_thirty_minute_increments(data, period_from: datetime, period_to: datetime, tariff_code: str):
-  """Process the collection of rates to ensure they're in 30 minute periods"""
+
+def get_contiguous_rates(rates, period_from: datetime):
+  """Get the rates that carry on from the start of the period without any gaps"""
+  if rates == None:
+    return RateTimeline(run_length_encoded=True)
+
+  total_rates = 0
+  expected_valid_from = period_from
+  for rate in rates:
+    if rate["valid_from"] != expected_valid_from:
+      break
+
+    expected_valid_from = rate["valid_to"]
+    total_rates += 1
+
+  return rates[:total_rates]
+
+def rates_to_thirty_minute_increments(data, period_from: datetime, period_to: datetime, tariff_code: str, run_length_encoded: bool = False):
+  """Process the collection of rates to ensure they're in 30 minute periods. If run_length_encoded, then rates with the same price are held together"""
   starting_period_from = period_from
-  results = []
+  results = RateTimeline(run_length_encoded)
   if ("results" in data):
     items = data["results"]
     items.sort(key=get_valid_from)
@@ -105,17 +126,10 @@ def rates_to_thirty_minute_increments(data, period_from: datetime, period_to: da
       else:
         target_date = period_to
       
-      while valid_from < target_date:
-        valid_to = valid_from + timedelta(minutes=30)
-        results.append({
-          "value_exc_vat": value_exc_vat,
-          "value_inc_vat": value_inc_vat,
-          "valid_from": valid_from,
-          "valid_to": valid_to,
-          "tariff_code": tariff_code
-        })
-
-        valid_from = valid_to
-        starting_period_from = valid_to
+      if valid_from < target_date:
+        total_rates = math.ceil((target_date - valid_from) / timedelta(minutes=30))
+        results.append(value_exc_vat, value_inc_vat, valid_from, tariff_code, total_rates)
+
+        starting_period_from = valid_from + (timedelta(minutes=30) * total_rates)
     
   return results
\ No newline at end of file
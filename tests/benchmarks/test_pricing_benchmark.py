@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+import random
+import timeit
+import pytest
+
+from custom_components.octopus_energy.pricing import calculate_span_costs
+from custom_components.octopus_energy.rate_timeline import RateTimeline
+
+REPEATS = 5
+
+# Half hourly intervals for a day, a month and a year
+PERIODS = [
+  ("day", 48),
+  ("month", 30 * 48),
+  ("year", 365 * 48),
+]
+
+def measure_time(action):
+  return min(timeit.repeat(action, number=1, repeat=REPEATS))
+
+def report(name, baseline_value, value, labels):
+  print(f'{name}: {labels[0]} {baseline_value:.6f}s; {labels[1]} {value:.6f}s; ratio {value / baseline_value:.2f}')
+
+def create_flat_rate_data(total_intervals):
+  period_from = datetime.strptime("2022-01-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = RateTimeline(run_length_encoded=True)
+  rates.append(20, 21, period_from, "E-1R-SUPER-GREEN-24M-21-07-30-A", total_intervals)
+
+  generator = random.Random(total_intervals)
+  consumption_data = []
+  for index in range(total_intervals):
+    interval_start = period_from + timedelta(minutes=30 * index)
+    consumption_data.append({
+      "consumption": generator.uniform(0, 2),
+      "interval_start": interval_start,
+      "interval_end": interval_start + timedelta(minutes=30)
+    })
+
+  return (rates, consumption_data)
+
+@pytest.mark.parametrize("name,total_intervals", PERIODS)
+def test_flat_rate_pricing_speed(name, total_intervals):
+  # Arrange
+  (rates, consumption_data) = create_flat_rate_data(total_intervals)
+  expanded_rates = RateTimeline.from_rates(rates)
+  get_consumption_value = lambda consumption: consumption["consumption"]
+
+  # Act & Assert
+  report(
+    f'Price a {name} of flat rates ({total_intervals} intervals)',
+    measure_time(lambda: calculate_span_costs(expanded_rates, consumption_data, get_consumption_value)),
+    measure_time(lambda: calculate_span_costs(rates, consumption_data, get_consumption_value)),
+    ("rate per interval", "run length encoded rates")
+  )
+
+  assert calculate_span_costs(rates, consumption_data, get_consumption_value)["total"] == pytest.approx(calculate_span_costs(expanded_rates, consumption_data, get_consumption_value)["total"])
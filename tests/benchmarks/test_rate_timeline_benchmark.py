@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+import timeit
+import tracemalloc
+
+from custom_components.octopus_energy.rate_timeline import RateTimeline
+from custom_components.octopus_energy.pricing import calculate_span_costs
+from custom_components.octopus_energy.target_sensor_utils import create_rate_search_index
+
+# A year of 30 minute rates, which is roughly what a backfill would hold
+TOTAL_RATES = 365 * 48
+REPEATS = 5
+
+def create_rates(is_fixed = False):
+  period_from = datetime.strptime("2022-01-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = []
+  for index in range(TOTAL_RATES):
+    valid_from = period_from + timedelta(minutes=30 * index)
+    rates.append({
+      "value_exc_vat": 20 if is_fixed else (index % 48) / 2,
+      "value_inc_vat": 21 if is_fixed else (index % 48) / 2 * 1.05,
+      "valid_from": valid_from,
+      "valid_to": valid_from + timedelta(minutes=30),
+      "tariff_code": "E-1R-AGILE-18-02-21-A"
+    })
+
+  return rates
+
+def measure_memory(create):
+  tracemalloc.start()
+  try:
+    result = create()
+    (current, _) = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+
+  return (result, current)
+
+def measure_time(action):
+  return min(timeit.repeat(action, number=1, repeat=REPEATS))
+
+def report(name, baseline_value, value, unit, labels = ("dicts", "timeline")):
+  print(f'{name}: {labels[0]} {baseline_value:.4f}{unit}; {labels[1]} {value:.4f}{unit}; ratio {value / baseline_value:.2f}')
+
+def test_rate_timeline_memory():
+  # Act
+  (_, dict_memory) = measure_memory(create_rates)
+  (_, timeline_memory) = measure_memory(lambda: RateTimeline.from_rates(create_rates()))
+
+  # Assert
+  report(f'Memory for {TOTAL_RATES} rates', dict_memory / 1024 / 1024, timeline_memory / 1024 / 1024, "MiB")
+  assert timeline_memory < dict_memory / 4
+
+def test_rate_timeline_speed():
+  # Arrange
+  rates = create_rates()
+  timeline = RateTimeline.from_rates(rates)
+
+  # Act & Assert
+  report(
+    'Sum value_inc_vat',
+    measure_time(lambda: sum(rate["value_inc_vat"] for rate in rates)),
+    measure_time(lambda: sum(timeline.values_inc_vat)),
+    "s"
+  )
+
+  report(
+    'Iterate valid_from',
+    measure_time(lambda: [rate["valid_from"] for rate in rates]),
+    measure_time(lambda: [rate["valid_from"] for rate in timeline]),
+    "s"
+  )
+
+  report(
+    'Create rate search index',
+    measure_time(lambda: create_rate_search_index(rates)),
+    measure_time(lambda: create_rate_search_index(timeline)),
+    "s"
+  )
+
+def test_run_length_encoded_rate_timeline_memory():
+  # Act
+  (_, timeline_memory) = measure_memory(lambda: RateTimeline.from_rates(create_rates(True)))
+  (_, encoded_timeline_memory) = measure_memory(lambda: RateTimeline.from_rates(create_rates(True), run_length_encoded=True))
+
+  # Assert
+  report(f'Memory for {TOTAL_RATES} fixed rates', timeline_memory / 1024 / 1024, encoded_timeline_memory / 1024 / 1024, "MiB", ("timeline", "encoded timeline"))
+  assert encoded_timeline_memory < timeline_memory / 10
+
+def test_run_length_encoded_rate_timeline_speed():
+  # Arrange
+  rates = create_rates(True)
+  timeline = RateTimeline.from_rates(rates)
+  encoded_timeline = RateTimeline.from_rates(rates, run_length_encoded=True)
+
+  # A day of consumption at the end of our rates
+  consumption_data = list(map(lambda rate: {
+    "consumption": 0.5,
+    "interval_start": rate["valid_from"],
+    "interval_end": rate["valid_to"]
+  }, rates[-48:]))
+  get_consumption_value = lambda consumption: consumption["consumption"]
+
+  # Act & Assert
+  report(
+    'Price consumption',
+    measure_time(lambda: calculate_span_costs(timeline, consumption_data, get_consumption_value)),
+    measure_time(lambda: calculate_span_costs(encoded_timeline, consumption_data, get_consumption_value)),
+    "s",
+    ("timeline", "encoded timeline")
+  )
+
+  report(
+    'Sum value_inc_vat',
+    measure_time(lambda: sum(timeline.values_inc_vat)),
+    measure_time(lambda: sum(encoded_timeline.values_inc_vat)),
+    "s",
+    ("timeline", "encoded timeline")
+  )
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+import pytest
+
+from integration import get_test_context
+from custom_components.octopus_energy.api_client import OctopusEnergyApiClient
+
+period_from = datetime.strptime("2022-02-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+period_to = datetime.strptime("2022-02-08T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+def assert_consumption_data(data):
+    # A week of half hourly data
+    assert len(data) == 336
+
+    # Make sure our data is returned in 30 minute increments
+    expected_valid_from = period_from
+    for item in data:
+        expected_valid_to = expected_valid_from + timedelta(minutes=30)
+
+        assert "interval_start" in item
+        assert item["interval_start"] == expected_valid_from
+        assert "interval_end" in item
+        assert item["interval_end"] == expected_valid_to
+        assert "consumption" in item
+
+        expected_valid_from = expected_valid_to
+
+@pytest.mark.asyncio
+async def test_when_get_electricity_consumption_is_called_with_small_page_size_then_all_pages_are_returned():
+    # Arrange
+    context = get_test_context()
+    client = OctopusEnergyApiClient(context["api_key"])
+
+    # Act
+    data = await client.async_get_electricity_consumption(context["electricity_mpan"], context["electricity_serial_number"], period_from, period_to, 100)
+    await client.async_close()
+
+    # Assert
+    assert data != None
+    assert_consumption_data(data)
+
+@pytest.mark.asyncio
+async def test_when_iter_gas_consumption_is_called_with_small_page_size_then_all_intervals_are_yielded_in_order():
+    # Arrange
+    context = get_test_context()
+    client = OctopusEnergyApiClient(context["api_key"])
+
+    # Act
+    data = []
+    async for item in client.async_iter_gas_consumption(context["gas_mprn"], context["gas_serial_number"], period_from, period_to, 100):
+        data.append(item)
+    await client.async_close()
+
+    # Assert
+    assert_consumption_data(data)
@@ -59,11 +59,11 @@ async def test_when_calculate_electricity_cost_uses_real_data_then_calculation_r
   assert consumption_cost["total"] == 1.87
   assert consumption_cost["last_calculated_timestamp"] == consumption_data[-1]["interval_end"]
 
-  assert len(consumption_cost["charges"]) == 48
+  assert len(consumption_cost["cost_ledger"].charges) == 48
 
   # Make sure our data is returned in 30 minute increments
   expected_valid_from = period_from
-  for item in consumption_cost["charges"]:
+  for item in consumption_cost["cost_ledger"].charges:
     expected_valid_to = expected_valid_from + timedelta(minutes=30)
 
     assert "from" in item
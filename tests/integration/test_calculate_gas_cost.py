@@ -65,11 +65,11 @@ async def test_when_calculate_gas_cost_using_real_data_then_calculation_returned
   assert consumption_cost["total_without_standing_charge"] == 2.88
   assert consumption_cost["total"] == 3.14
 
-  assert len(consumption_cost["charges"]) == 48
+  assert len(consumption_cost["cost_ledger"].charges) == 48
 
   # Make sure our data is returned in 30 minute increments
   expected_valid_from = period_from
-  for item in consumption_cost["charges"]:
+  for item in consumption_cost["cost_ledger"].charges:
     expected_valid_to = expected_valid_from + timedelta(minutes=30)
 
     assert "from" in item
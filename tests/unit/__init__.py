@@ -1,4 +1,7 @@
 import os
+import json
+import base64
+import asyncio
 from datetime import timedelta
 
 def create_consumption_data(period_from, period_to, reverse = False):
@@ -46,3 +49,48 @@ def create_rate_data(period_from, period_to, expected_rates: list):
       rate_index = 0
 
   return rates
+
+def create_token(claims):
+  header = base64.urlsafe_b64encode(json.dumps({ "alg": "HS256", "typ": "JWT" }).encode()).decode().rstrip("=")
+  payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+  return f'{header}.{payload}.signature'
+
+class FakeResponse:
+  def __init__(self, session, status, body):
+    self._session = session
+    self.status = status
+    self._body = body
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *args):
+    return False
+
+  async def text(self):
+    self._session.in_flight += 1
+    self._session.max_in_flight = max(self._session.max_in_flight, self._session.in_flight)
+
+    # Give any other requests a chance to start
+    await asyncio.sleep(0.01)
+
+    self._session.in_flight -= 1
+    return json.dumps(self._body)
+
+class FakeSession:
+  """Session which serves the body of the first response whose url fragment is within the requested url"""
+
+  def __init__(self, responses: list):
+    self.closed = False
+    self.requested_urls = []
+    self.in_flight = 0
+    self.max_in_flight = 0
+    self._responses = responses
+
+  def get(self, url, **kwargs):
+    self.requested_urls.append(url)
+    for (url_fragment, body) in self._responses:
+      if url_fragment in url:
+        return FakeResponse(self, 200, body)
+
+    return FakeResponse(self, 404, { "detail": "Not found." })
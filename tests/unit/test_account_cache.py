@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+import pytest
+
+from custom_components.octopus_energy.account_cache import OctopusEnergyAccountCache
+
+class FakeClient:
+  def __init__(self, accounts):
+    self._accounts = accounts
+    self.requests = 0
+
+  async def async_get_account(self, account_id):
+    account = self._accounts[min(self.requests, len(self._accounts) - 1)]
+    self.requests += 1
+    return account
+
+@pytest.mark.asyncio
+async def test_when_account_cached_then_account_not_requested_again():
+  # Arrange
+  account = { "id": "A-123", "electricity_meter_points": [], "gas_meter_points": [] }
+  client = FakeClient([account])
+  cache = OctopusEnergyAccountCache(client, "A-123")
+  await cache.async_get_account()
+
+  # Act
+  result = await cache.async_get_account()
+
+  # Assert
+  assert result == account
+  assert client.requests == 1
+  assert cache.get_stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_when_cache_expired_or_refresh_forced_then_account_requested():
+  # Arrange
+  account = { "id": "A-123", "electricity_meter_points": [], "gas_meter_points": [] }
+  client = FakeClient([account])
+  expired_cache = OctopusEnergyAccountCache(client, "A-123", timedelta(seconds=-1))
+  await expired_cache.async_get_account()
+
+  # Act
+  await expired_cache.async_get_account()
+
+  cache = OctopusEnergyAccountCache(client, "A-123")
+  await cache.async_get_account()
+  await cache.async_get_account(True)
+
+  # Assert
+  assert client.requests == 4
+  assert expired_cache.get_stats()["refreshes"] == 2
+  assert cache.get_stats()["refreshes"] == 2
+
+@pytest.mark.asyncio
+async def test_when_account_changes_then_agreements_parsed_again():
+  # Arrange
+  point = { "mpan": "123", "agreements": [{ "tariff_code": "E-1R-AGILE-18-02-21-A", "valid_from": "2022-01-01T00:00:00Z", "valid_to": None }] }
+  changed_point = { "mpan": "123", "agreements": [{ "tariff_code": "E-1R-GO-22-07-05-A", "valid_from": "2022-01-01T00:00:00Z", "valid_to": None }] }
+  account = { "id": "A-123", "electricity_meter_points": [point], "gas_meter_points": [] }
+  changed_account = { "id": "A-123", "electricity_meter_points": [changed_point], "gas_meter_points": [] }
+  client = FakeClient([account, changed_account])
+  cache = OctopusEnergyAccountCache(client, "A-123")
+
+  # Act
+  await cache.async_get_account()
+  first_agreement_index = cache.get_agreement_index(point)
+  result = await cache.async_get_account(True)
+  changed_agreement_index = cache.get_agreement_index(changed_point)
+
+  # Assert
+  assert result == changed_account
+  assert changed_agreement_index is not first_agreement_index
+  assert changed_agreement_index.get_tariff_code(datetime.strptime("2022-02-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")) == "E-1R-GO-22-07-05-A"
+
+@pytest.mark.asyncio
+async def test_when_refresh_fails_then_cached_account_returned():
+  # Arrange
+  account = { "id": "A-123", "electricity_meter_points": [], "gas_meter_points": [] }
+  client = FakeClient([account, None])
+  cache = OctopusEnergyAccountCache(client, "A-123")
+  await cache.async_get_account()
+
+  # Act
+  result = await cache.async_get_account(True)
+
+  # Assert
+  assert result == account
+  assert cache.get_stats()["failed_refreshes"] == 1
+
+@pytest.mark.asyncio
+async def test_when_account_cached_then_agreements_parsed_once():
+  # Arrange
+  account = {
+    "id": "A-123",
+    "electricity_meter_points": [{
+      "mpan": "123",
+      "agreements": [{ "tariff_code": "E-1R-AGILE-18-02-21-A", "valid_from": "2022-01-01T00:00:00Z", "valid_to": None }]
+    }],
+    "gas_meter_points": []
+  }
+  client = FakeClient([account])
+  cache = OctopusEnergyAccountCache(client, "A-123")
+
+  # Act
+  result = await cache.async_get_account()
+  first_agreement_index = cache.get_agreement_index(result["electricity_meter_points"][0])
+  await cache.async_get_account(True)
+  second_agreement_index = cache.get_agreement_index(result["electricity_meter_points"][0])
+
+  # Assert
+  assert first_agreement_index is second_agreement_index
+  assert first_agreement_index.get_tariff_code(datetime.strptime("2022-02-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")) == "E-1R-AGILE-18-02-21-A"
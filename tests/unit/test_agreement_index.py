@@ -0,0 +1,91 @@
+import pytest
+from datetime import datetime
+
+from custom_components.octopus_energy.agreement_index import OctopusEnergyAgreementIndex
+
+def create_agreements():
+  return [
+    {
+      'tariff_code': 'E-1R-FIX-12M-21-02-16-A',
+      'valid_from': '2021-04-02T00:00:00+01:00',
+      'valid_to': '2022-04-02T00:00:00+01:00'
+    },
+    {
+      'tariff_code': None,
+      'valid_from': '2022-04-02T00:00:00+01:00',
+      'valid_to': '2022-05-02T00:00:00+01:00'
+    },
+    {
+      'tariff_code': 'E-1R-AGILE-18-02-21-A',
+      'valid_from': '2022-05-02T00:00:00+01:00',
+      'valid_to': None
+    },
+    {
+      'tariff_code': 'E-1R-VAR-20-10-01-A',
+      'valid_from': '2018-04-02T00:00:00+01:00',
+      'valid_to': '2021-04-02T00:00:00+01:00'
+    }
+  ]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("at,expected_tariff_code",[
+  ("2018-01-01T00:00:00Z", None),
+  ("2019-06-01T00:00:00Z", 'E-1R-VAR-20-10-01-A'),
+  ("2021-06-01T00:00:00Z", 'E-1R-FIX-12M-21-02-16-A'),
+  ("2022-04-10T00:00:00Z", None),
+  ("2023-01-01T00:00:00Z", 'E-1R-AGILE-18-02-21-A'),
+])
+async def test_when_get_tariff_code_called_then_tariff_code_applicable_at_time_returned(at, expected_tariff_code):
+  # Arrange
+  agreement_index = OctopusEnergyAgreementIndex(create_agreements())
+
+  # Act
+  result = agreement_index.get_tariff_code(datetime.strptime(at, "%Y-%m-%dT%H:%M:%S%z"))
+
+  # Assert
+  assert len(agreement_index) == 3
+  assert result == expected_tariff_code
+
+@pytest.mark.asyncio
+async def test_when_latest_agreement_ended_but_earlier_agreement_still_active_then_earlier_tariff_code_returned():
+  # Arrange
+  agreement_index = OctopusEnergyAgreementIndex([
+    {
+      'tariff_code': 'E-1R-VAR-20-10-01-A',
+      'valid_from': '2021-01-01T00:00:00Z',
+      'valid_to': None
+    },
+    {
+      'tariff_code': 'E-1R-FIX-12M-21-02-16-A',
+      'valid_from': '2021-06-01T00:00:00Z',
+      'valid_to': '2021-07-01T00:00:00Z'
+    },
+  ])
+
+  # Act
+  result = agreement_index.get_tariff_code(datetime.strptime("2021-08-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z"))
+
+  # Assert
+  assert result == 'E-1R-VAR-20-10-01-A'
+
+@pytest.mark.asyncio
+async def test_when_agreements_start_at_same_time_then_first_agreement_returned():
+  # Arrange
+  agreement_index = OctopusEnergyAgreementIndex([
+    {
+      'tariff_code': 'E-1R-VAR-20-10-01-A',
+      'valid_from': '2021-01-01T00:00:00Z',
+      'valid_to': None
+    },
+    {
+      'tariff_code': 'E-1R-FIX-12M-21-02-16-A',
+      'valid_from': '2021-01-01T00:00:00Z',
+      'valid_to': None
+    },
+  ])
+
+  # Act
+  result = agreement_index.get_tariff_code(datetime.strptime("2021-08-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z"))
+
+  # Assert
+  assert result == 'E-1R-VAR-20-10-01-A'
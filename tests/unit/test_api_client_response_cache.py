@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+import pytest
+import mock
+from homeassistant.util.dt import (utcnow)
+
+from custom_components.octopus_energy.api_client import OctopusEnergyApiClient
+
+tariff_code = "E-1R-SUPER-GREEN-24M-21-07-30-A"
+
+@pytest.mark.asyncio
+async def test_when_period_has_passed_then_standing_charge_is_only_requested_once():
+  # Arrange
+  requests = []
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+  async def async_mocked_get_electricity_standing_charge(*args, **kwargs):
+    requests.append(args)
+    return { "value_exc_vat": 1, "value_inc_vat": 2 }
+
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__async_get_electricity_standing_charge', new=async_mocked_get_electricity_standing_charge):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    # Act
+    first_result = await client.async_get_electricity_standing_charge(tariff_code, period_from, period_to)
+    second_result = await client.async_get_electricity_standing_charge(tariff_code, period_from, period_to)
+
+    # Assert
+    assert len(requests) == 1
+    assert first_result == second_result
+
+    stats = client.get_stats()
+    assert stats["cache_hits"] == 1
+    assert stats["cache_misses"] == 1
+
+@pytest.mark.asyncio
+async def test_when_period_is_current_then_rates_are_requested_again_once_expired():
+  # Arrange
+  requests = []
+  period_from = utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+  period_to = period_from + timedelta(days=2)
+
+  async def async_mocked_get_electricity_rates(*args, **kwargs):
+    requests.append(args)
+    return []
+
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__async_get_electricity_rates', new=async_mocked_get_electricity_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    await client.async_get_electricity_rates(tariff_code, False, period_from, period_to)
+    await client.async_get_electricity_rates(tariff_code, False, period_from, period_to)
+    assert len(requests) == 1
+
+    # Act
+    with mock.patch('custom_components.octopus_energy.response_cache.utcnow', return_value=utcnow() + timedelta(hours=1)):
+      await client.async_get_electricity_rates(tariff_code, False, period_from, period_to)
+
+    # Assert
+    assert len(requests) == 2
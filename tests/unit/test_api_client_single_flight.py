@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime
+import pytest
+import mock
+
+from custom_components.octopus_energy.api_client import OctopusEnergyApiClient
+
+period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+tariff_code = "G-1R-SUPER-GREEN-24M-21-07-30-A"
+
+@pytest.mark.asyncio
+async def test_when_identical_requests_are_in_flight_then_single_request_is_made():
+  # Arrange
+  requests = []
+  expected_rates = [{ "value_inc_vat": 10 }]
+
+  async def async_mocked_get_gas_rates(*args, **kwargs):
+    requests.append(args)
+    await asyncio.sleep(0.01)
+    return expected_rates
+
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__async_get_gas_rates', new=async_mocked_get_gas_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    # Act
+    results = await asyncio.gather(*[client.async_get_gas_rates(tariff_code, period_from, period_to) for _ in range(5)])
+
+    # Assert
+    assert len(requests) == 1
+    assert all(result is expected_rates for result in results)
+    assert client.get_stats()["single_flight_hits"] == 4
+
+@pytest.mark.asyncio
+async def test_when_requests_differ_then_separate_requests_are_made():
+  # Arrange
+  requests = []
+
+  async def async_mocked_get_gas_rates(*args, **kwargs):
+    requests.append(args)
+    await asyncio.sleep(0.01)
+    return []
+
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__async_get_gas_rates', new=async_mocked_get_gas_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    # Act
+    await asyncio.gather(
+      client.async_get_gas_rates(tariff_code, period_from, period_to),
+      client.async_get_gas_rates("G-1R-VAR-22-11-01-A", period_from, period_to)
+    )
+
+    # Assert
+    assert len(requests) == 2
+    assert client.get_stats()["single_flight_hits"] == 0
+
+@pytest.mark.asyncio
+async def test_when_request_has_completed_and_failed_then_new_request_is_made():
+  # Arrange
+  requests = []
+
+  async def async_mocked_get_gas_rates(*args, **kwargs):
+    requests.append(args)
+    return None
+
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__async_get_gas_rates', new=async_mocked_get_gas_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    # Act
+    await client.async_get_gas_rates(tariff_code, period_from, period_to)
+    await client.async_get_gas_rates(tariff_code, period_from, period_to)
+
+    # Assert
+    assert len(requests) == 2
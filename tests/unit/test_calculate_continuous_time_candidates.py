@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+import pytest
+
+from unit import (create_rate_data)
+from custom_components.octopus_energy.target_sensor_utils import calculate_continuous_time_candidates
+
+@pytest.mark.asyncio
+async def test_when_multiple_candidates_requested_then_cheapest_blocks_that_do_not_overlap_returned_in_order():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-09T14:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  current_date = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = create_rate_data(period_from, period_to, [10, 30, 5, 5, 30, 12, 12, 20])
+
+  # Act
+  result = calculate_continuous_time_candidates(
+    current_date,
+    None,
+    None,
+    1,
+    rates,
+    None,
+    True,
+    3
+  )
+
+  # Assert
+  assert len(result) == 3
+
+  assert result[0]["total"] == 10
+  assert result[0]["rates"][0]["valid_from"] == datetime.strptime("2022-02-09T11:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  assert result[0]["rates"][-1]["valid_to"] == datetime.strptime("2022-02-09T12:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+  assert result[1]["total"] == 24
+  assert result[1]["rates"][0]["valid_from"] == datetime.strptime("2022-02-09T12:30:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+  # The blocks starting at 10:30, 11:30 and 13:00 are cheaper, but overlap blocks that have already been picked
+  assert result[2]["total"] == 40
+  assert result[2]["rates"][0]["valid_from"] == period_from
+  assert result[2]["rates"][-1]["valid_to"] == datetime.strptime("2022-02-09T11:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+@pytest.mark.asyncio
+async def test_when_blocks_are_equally_priced_then_earliest_block_returned_first():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-09T13:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  current_date = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = create_rate_data(period_from, period_to, [0.1, 0.2])
+
+  # Act
+  result = calculate_continuous_time_candidates(
+    current_date,
+    None,
+    None,
+    1,
+    rates,
+    None,
+    True,
+    2
+  )
+
+  # Assert
+  assert len(result) == 2
+  assert result[0]["total"] == result[1]["total"]
+  assert result[0]["rates"][0]["valid_from"] == period_from
+  assert result[1]["rates"][0]["valid_from"] == period_from + timedelta(hours=1)
+
+@pytest.mark.asyncio
+async def test_when_not_enough_rates_then_no_candidates_returned():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-09T11:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  current_date = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = create_rate_data(period_from, period_to, [10])
+
+  # Act
+  result = calculate_continuous_time_candidates(
+    current_date,
+    None,
+    None,
+    2,
+    rates,
+    None,
+    True,
+    3
+  )
+
+  # Assert
+  assert result == []
@@ -125,7 +125,7 @@ async def test_when_electricity_consumption_available_then_calculation_returned(
     # Assert
     assert consumption_cost != None
 
-    assert len(consumption_cost["charges"]) == 48
+    assert len(consumption_cost["cost_ledger"].charges) == 48
 
     assert consumption_cost["standing_charge"] == expected_standing_charge["value_inc_vat"]
     assert consumption_cost["total_without_standing_charge"] == round((48 * expected_rate_price) / 100, 2)
@@ -134,7 +134,7 @@ async def test_when_electricity_consumption_available_then_calculation_returned(
 
     # Make sure our data is returned in 30 minute increments
     expected_valid_from = period_from
-    for item in consumption_cost["charges"]:
+    for item in consumption_cost["cost_ledger"].charges:
       expected_valid_to = expected_valid_from + timedelta(minutes=30)
 
       assert "from" in item
@@ -197,7 +197,7 @@ async def test_when_electricity_consumption_starting_at_latest_date_then_calcula
     # Assert
     assert consumption_cost != None
 
-    assert len(consumption_cost["charges"]) == 48
+    assert len(consumption_cost["cost_ledger"].charges) == 48
 
     assert consumption_cost["standing_charge"] == expected_standing_charge["value_inc_vat"]
 
@@ -208,7 +208,7 @@ async def test_when_electricity_consumption_starting_at_latest_date_then_calcula
 
     # Make sure our data is returned in 30 minute increments
     expected_valid_from = period_from
-    for item in consumption_cost["charges"]:
+    for item in consumption_cost["cost_ledger"].charges:
       expected_valid_to = expected_valid_from + timedelta(minutes=30)
 
       assert "from" in item
@@ -216,4 +216,126 @@ async def test_when_electricity_consumption_starting_at_latest_date_then_calcula
       assert "to" in item
       assert item["to"] == expected_valid_to
 
-      expected_valid_from = expected_valid_to
\ No newline at end of file
+      expected_valid_from = expected_valid_to
+
+@pytest.mark.asyncio
+async def test_when_cost_ledger_provided_then_only_new_consumption_priced():
+  # Arrange
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  received_to = datetime.strptime("2022-02-28T12:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  expected_rate_price = 50
+  requests = []
+
+  async def async_mocked_get_electricity_rates(*args, **kwargs):
+    requests.append("rates")
+    return create_rate_data(period_from, period_to, [expected_rate_price])
+
+  async def async_mocked_get_electricity_standing_charge(*args, **kwargs):
+    requests.append("standing_charge")
+    return { "value_exc_vat": 1, "value_inc_vat": 2 }
+
+  with mock.patch.multiple(OctopusEnergyApiClient, async_get_electricity_rates=async_mocked_get_electricity_rates, async_get_electricity_standing_charge=async_mocked_get_electricity_standing_charge):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    tariff_code = "E-1R-SUPER-GREEN-24M-21-07-30-A"
+
+    previous_cost = await async_calculate_electricity_cost(
+      client,
+      create_consumption_data(period_from, received_to),
+      None,
+      period_from,
+      period_to,
+      tariff_code,
+      False
+    )
+    previous_charges = previous_cost["cost_ledger"].charges
+
+    # Act
+    consumption_cost = await async_calculate_electricity_cost(
+      client,
+      create_consumption_data(period_from, period_to),
+      previous_cost["last_calculated_timestamp"],
+      period_from,
+      period_to,
+      tariff_code,
+      False,
+      previous_cost["cost_ledger"]
+    )
+
+    # Assert
+    assert requests == ["standing_charge", "rates", "rates"]
+    assert len(consumption_cost["cost_ledger"].charges) == 48
+    assert consumption_cost["cost_ledger"].charges[0] is previous_charges[0]
+    assert len(previous_charges) == 24
+    assert consumption_cost["total_without_standing_charge"] == round((48 * expected_rate_price) / 100, 2)
+    assert consumption_cost["total"] == round(((48 * expected_rate_price) + 2) / 100, 2)
+    assert consumption_cost["last_calculated_timestamp"] == period_to
+
+    # Once everything has been priced, nothing else needs to be requested, such as after a restart
+    requests.clear()
+    restarted_cost = await async_calculate_electricity_cost(
+      client,
+      create_consumption_data(period_from, period_to),
+      None,
+      period_from,
+      period_to,
+      tariff_code,
+      False,
+      consumption_cost["cost_ledger"]
+    )
+
+    assert requests == []
+    assert restarted_cost["total"] == consumption_cost["total"]
+
+    # Our ledger hasn't changed, so we're given back the same ledger
+    assert restarted_cost["cost_ledger"] is consumption_cost["cost_ledger"]
+
+@pytest.mark.asyncio
+async def test_when_cost_ledger_provided_and_rates_not_available_then_cost_ledger_unchanged():
+  # Arrange
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  received_to = datetime.strptime("2022-02-28T12:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  are_rates_available = True
+
+  async def async_mocked_get_electricity_rates(*args, **kwargs):
+    return create_rate_data(period_from, period_to, [50]) if are_rates_available else None
+
+  async def async_mocked_get_electricity_standing_charge(*args, **kwargs):
+    return { "value_exc_vat": 1, "value_inc_vat": 2 }
+
+  with mock.patch.multiple(OctopusEnergyApiClient, async_get_electricity_rates=async_mocked_get_electricity_rates, async_get_electricity_standing_charge=async_mocked_get_electricity_standing_charge):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    tariff_code = "E-1R-SUPER-GREEN-24M-21-07-30-A"
+
+    previous_cost = await async_calculate_electricity_cost(
+      client,
+      create_consumption_data(period_from, received_to),
+      None,
+      period_from,
+      period_to,
+      tariff_code,
+      False
+    )
+    cost_ledger = previous_cost["cost_ledger"]
+    previous_charges = cost_ledger.charges
+    are_rates_available = False
+
+    # Act
+    # Our earlier consumption has changed, so everything needs to be priced again
+    consumption_cost = await async_calculate_electricity_cost(
+      client,
+      create_consumption_data(period_from + timedelta(hours=1), period_to),
+      None,
+      period_from,
+      period_to,
+      tariff_code,
+      False,
+      cost_ledger
+    )
+
+    # Assert
+    assert consumption_cost == None
+    assert cost_ledger.charges == previous_charges
+    assert cost_ledger.total_cost_in_pence == 24 * 50
+    assert cost_ledger.last_calculated_timestamp == received_to
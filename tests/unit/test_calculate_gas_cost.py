@@ -150,7 +150,7 @@ async def test_when_gas_consumption_available_then_calculation_returned(is_smets
 
     # Assert
     assert consumption_cost != None
-    assert len(consumption_cost["charges"]) == 48
+    assert len(consumption_cost["cost_ledger"].charges) == 48
 
     assert consumption_cost["standing_charge"] == expected_standing_charge["value_inc_vat"]
     
@@ -163,7 +163,7 @@ async def test_when_gas_consumption_available_then_calculation_returned(is_smets
 
     # Make sure our data is returned in 30 minute increments
     expected_valid_from = period_from
-    for item in consumption_cost["charges"]:
+    for item in consumption_cost["cost_ledger"].charges:
       expected_valid_to = expected_valid_from + timedelta(minutes=30)
 
       assert "from" in item
@@ -228,7 +228,7 @@ async def test_when_gas_consumption_starting_at_latest_date_then_calculation_ret
 
     # Assert
     assert consumption_cost != None
-    assert len(consumption_cost["charges"]) == 48
+    assert len(consumption_cost["cost_ledger"].charges) == 48
 
     assert consumption_cost["last_calculated_timestamp"] == consumption_data[0]["interval_end"]
     assert consumption_cost["standing_charge"] == expected_standing_charge["value_inc_vat"]
@@ -240,7 +240,7 @@ async def test_when_gas_consumption_starting_at_latest_date_then_calculation_ret
 
     # Make sure our data is returned in 30 minute increments
     expected_valid_from = period_from
-    for item in consumption_cost["charges"]:
+    for item in consumption_cost["cost_ledger"].charges:
       expected_valid_to = expected_valid_from + timedelta(minutes=30)
 
       assert "from" in item
@@ -138,4 +138,39 @@ async def test_when_offset_set_then_next_continuous_times_returned_have_offset_a
 
   assert result[1]["valid_from"] == datetime.strptime("2022-02-09T13:30:00Z", "%Y-%m-%dT%H:%M:%S%z")
   assert result[1]["valid_to"] == datetime.strptime("2022-02-09T13:30:00Z", "%Y-%m-%dT%H:%M:%S%z") + timedelta(minutes=30)
-  assert result[1]["value_inc_vat"] == 0.1
\ No newline at end of file
+  assert result[1]["value_inc_vat"] == 0.1
+
+@pytest.mark.asyncio
+async def test_when_rates_are_equally_priced_then_earliest_intermittent_times_returned():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-11T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  expected_rates = [0.2, 0.1, 0.3, 0.1]
+  current_date = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+  # Restrict our time block
+  target_hours = 2
+
+  rates = create_rate_data(
+    period_from,
+    period_to,
+    expected_rates
+  )
+
+  # Act
+  result = calculate_intermittent_times(
+    current_date,
+    None,
+    None,
+    target_hours,
+    rates,
+    None,
+    False
+  )
+
+  # Assert
+  assert result != None
+  assert len(result) == 4
+  for index, rate in enumerate(result):
+    assert rate["valid_from"] == period_from + timedelta(minutes=30 + (60 * index))
+    assert rate["value_inc_vat"] == 0.1
@@ -0,0 +1,73 @@
+from datetime import datetime
+import pytest
+
+from unit import (create_consumption_data, create_rate_data)
+from custom_components.octopus_energy.pricing import calculate_span_costs
+from custom_components.octopus_energy.rate_timeline import RateTimeline
+
+def create_rates(period_from, period_to, expected_rates: list):
+  rates = create_rate_data(period_from, period_to, expected_rates)
+  for rate in rates:
+    rate["value_exc_vat"] = rate["value_inc_vat"]
+    rate["tariff_code"] = "E-1R-SUPER-GREEN-24M-21-07-30-A"
+
+  return RateTimeline.from_rates(rates, run_length_encoded=True)
+
+@pytest.mark.asyncio
+async def test_when_rates_are_flat_then_consumption_priced_as_single_span():
+  # Arrange
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = create_rates(period_from, period_to, [20])
+  consumption_data = create_consumption_data(period_from, period_to)
+
+  # Act
+  result = calculate_span_costs(rates, consumption_data, lambda consumption: consumption["consumption"])
+
+  # Assert
+  assert len(result["spans"]) == 1
+  assert result["spans"][0]["from"] == period_from
+  assert result["spans"][0]["to"] == period_to
+  assert result["spans"][0]["rate"] == 20
+  assert len(result["spans"][0]["consumptions"]) == 48
+  assert result["spans"][0]["cost"] == 48 * 20
+  assert result["total"] == 48 * 20
+  assert result["missing_intervals"] == []
+
+@pytest.mark.asyncio
+async def test_when_rates_change_then_consumption_priced_for_each_price():
+  # Arrange
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-28T02:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = create_rates(period_from, period_to, [10, 10, 20, 20])
+  consumption_data = create_consumption_data(period_from, period_to)
+
+  # Act
+  result = calculate_span_costs(rates, consumption_data, lambda consumption: consumption["consumption"] * 2)
+
+  # Assert
+  assert list(map(lambda span: (span["rate"], span["consumptions"], span["cost"]), result["spans"])) == [
+    (10, [2, 2], 40),
+    (20, [2, 2], 80),
+  ]
+  assert result["total"] == 120
+
+@pytest.mark.asyncio
+async def test_when_rates_missing_for_consumption_then_missing_intervals_returned():
+  # Arrange
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates_to = datetime.strptime("2022-02-28T01:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-28T02:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = create_rates(period_from, rates_to, [10])
+  consumption_data = create_consumption_data(period_from, period_to)
+
+  # Act
+  result = calculate_span_costs(rates, consumption_data, lambda consumption: consumption["consumption"])
+
+  # Assert
+  assert len(result["spans"]) == 1
+  assert result["total"] == 20
+  assert list(map(lambda consumption: consumption["interval_start"], result["missing_intervals"])) == [
+    rates_to,
+    datetime.strptime("2022-02-28T01:30:00Z", "%Y-%m-%dT%H:%M:%S%z"),
+  ]
@@ -0,0 +1,74 @@
+from datetime import datetime
+import pytest
+
+from unit import (create_consumption_data)
+from custom_components.octopus_energy.sensor_utils import (OctopusEnergyConsumptionAccumulator, convert_m3_to_kwh)
+
+@pytest.mark.asyncio
+async def test_when_new_consumption_arrives_then_only_new_consumption_added():
+  # Arrange
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  received_to = datetime.strptime("2022-02-28T12:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  accumulator = OctopusEnergyConsumptionAccumulator(False)
+  accumulator.update(create_consumption_data(period_from, received_to))
+  previous_consumptions = accumulator.get_consumption()["consumptions"]
+
+  # Act
+  consumption_data = create_consumption_data(period_from, period_to)
+  is_updated = accumulator.update(consumption_data)
+  is_updated_again = accumulator.update(consumption_data)
+
+  # Assert
+  assert is_updated == True
+  assert is_updated_again == False
+
+  result = accumulator.get_consumption()
+  assert result["total"] == 48
+  assert result["last_calculated_timestamp"] == period_to
+  assert len(result["consumptions"]) == 48
+  assert result["consumptions"][0] is previous_consumptions[0]
+
+  # The consumptions we've previously exposed are left untouched
+  assert len(previous_consumptions) == 24
+
+@pytest.mark.asyncio
+async def test_when_period_moves_on_then_totals_reset():
+  # Arrange
+  accumulator = OctopusEnergyConsumptionAccumulator(True)
+  accumulator.update(create_consumption_data(
+    datetime.strptime("2022-02-27T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z"),
+    datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  ))
+
+  # Act
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-28T02:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  is_updated = accumulator.update(create_consumption_data(period_from, period_to))
+
+  # Assert
+  assert is_updated == True
+
+  result = accumulator.get_consumption()
+  assert result["total_m3"] == 4
+  assert result["total_kwh"] == round(convert_m3_to_kwh(1) * 4, 3)
+  assert result["last_calculated_timestamp"] == period_to
+  assert len(result["consumptions"]) == 4
+  assert result["consumptions"][0]["from"] == period_from
+
+@pytest.mark.asyncio
+async def test_when_earlier_consumption_filled_in_then_totals_recalculated():
+  # Arrange
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  gap_from = datetime.strptime("2022-02-28T01:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  gap_to = datetime.strptime("2022-02-28T02:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-28T03:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  accumulator = OctopusEnergyConsumptionAccumulator(False)
+  accumulator.update(create_consumption_data(period_from, gap_from) + create_consumption_data(gap_to, period_to))
+
+  # Act
+  is_updated = accumulator.update(create_consumption_data(period_from, period_to))
+
+  # Assert
+  assert is_updated == True
+  assert accumulator.get_consumption()["total"] == 6
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta
+import pytest
+import mock
+
+from unit import (create_consumption_data, create_rate_data)
+from custom_components.octopus_energy.storage import OctopusEnergyDataStore
+from custom_components.octopus_energy.cost_ledger import OctopusEnergyCostLedger
+
+period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+period_to = datetime.strptime("2022-03-02T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+tariff_code = "E-1R-SUPER-GREEN-24M-21-07-30-A"
+
+class FakeStore:
+  def __init__(self, hass, version, key):
+    self.data = None
+    self.data_func = None
+
+  async def async_load(self):
+    return self.data
+
+  def async_delay_save(self, data_func, delay = 0):
+    self.data_func = data_func
+
+def create_rates(period_from, period_to):
+  rates = create_rate_data(period_from, period_to, [10, 20])
+  for rate in rates:
+    rate["value_exc_vat"] = rate["value_inc_vat"]
+    rate["tariff_code"] = tariff_code
+  return rates
+
+@pytest.mark.asyncio
+async def test_when_rates_cover_period_then_rates_returned():
+  with mock.patch('custom_components.octopus_energy.storage.OctopusEnergyStore', new=FakeStore):
+    # Arrange
+    store = OctopusEnergyDataStore(None)
+    store.set_rates("mpan", tariff_code, False, create_rates(period_from, period_to))
+
+    # Act
+    result = store.get_rates("mpan", tariff_code, False, period_from, period_to)
+
+    # Assert
+    assert result != None
+    assert len(result) == 96
+
+@pytest.mark.asyncio
+async def test_when_rates_partially_cover_period_then_available_rates_returned():
+  with mock.patch('custom_components.octopus_energy.storage.OctopusEnergyStore', new=FakeStore):
+    # Arrange
+    store = OctopusEnergyDataStore(None)
+    store.set_rates("mpan", tariff_code, False, create_rates(period_from, period_to - timedelta(days=1)))
+
+    # Act
+    result = store.get_rates("mpan", tariff_code, False, period_from, period_to)
+
+    # Assert
+    assert result != None
+    assert len(result) == 48
+    assert result[0]["valid_from"] == period_from
+    assert result[-1]["valid_to"] == period_to - timedelta(days=1)
+
+@pytest.mark.asyncio
+async def test_when_rates_are_set_for_different_meter_then_none_returned():
+  with mock.patch('custom_components.octopus_energy.storage.OctopusEnergyStore', new=FakeStore):
+    # Arrange
+    store = OctopusEnergyDataStore(None)
+    store.set_rates("mpan", tariff_code, False, create_rates(period_from, period_to))
+
+    # Act
+    result = store.get_rates("mpan", tariff_code, True, period_from, period_to)
+
+    # Assert
+    assert result == None
+
+@pytest.mark.asyncio
+async def test_when_rates_are_merged_then_rates_are_in_order_without_duplicates():
+  with mock.patch('custom_components.octopus_energy.storage.OctopusEnergyStore', new=FakeStore):
+    # Arrange
+    store = OctopusEnergyDataStore(None)
+    store.set_rates("mpan", tariff_code, False, create_rates(period_from + timedelta(days=1), period_to))
+
+    # Act
+    store.set_rates("mpan", tariff_code, False, create_rates(period_from, period_to - timedelta(hours=12)))
+
+    # Assert
+    result = store.get_rates("mpan", tariff_code, False, period_from, period_to)
+    assert result != None
+    assert len(result) == 96
+
+    expected_valid_from = period_from
+    for rate in result:
+      assert rate["valid_from"] == expected_valid_from
+      expected_valid_from = rate["valid_to"]
+
+@pytest.mark.asyncio
+async def test_when_data_saved_and_loaded_then_same_data_returned():
+  with mock.patch('custom_components.octopus_energy.storage.OctopusEnergyStore', new=FakeStore):
+    # Arrange
+    rates = create_rates(period_from, period_to)
+    consumption = create_consumption_data(period_from, period_to)
+
+    store = OctopusEnergyDataStore(None)
+    store.set_rates("mpan", tariff_code, False, rates)
+    store.set_consumption("mpan", "serial", consumption)
+
+    with mock.patch('custom_components.octopus_energy.storage.utcnow', return_value=period_to):
+      saved_data = store._store.data_func()
+
+    # Act
+    loaded_store = OctopusEnergyDataStore(None)
+    loaded_store._store.data = saved_data
+    await loaded_store.async_load()
+
+    # Assert
+    assert loaded_store.get_rates("mpan", tariff_code, False, period_from, period_to) == rates
+    assert loaded_store.get_consumption("mpan", "serial") == consumption
+
+@pytest.mark.asyncio
+async def test_when_compacted_then_old_data_removed():
+  with mock.patch('custom_components.octopus_energy.storage.OctopusEnergyStore', new=FakeStore):
+    # Arrange
+    store = OctopusEnergyDataStore(None)
+    store.set_rates("mpan", tariff_code, False, create_rates(period_from, period_to))
+    store.set_consumption("mpan", "serial", create_consumption_data(period_from, period_to))
+
+    # Act
+    store.compact(period_to + timedelta(days=10))
+
+    # Assert
+    assert store.get_rates("mpan", tariff_code, False, period_from, period_to) == None
+    assert store.get_consumption("mpan", "serial") == None
+
+@pytest.mark.asyncio
+async def test_when_cost_ledger_saved_and_loaded_then_same_cost_ledger_returned():
+  with mock.patch('custom_components.octopus_energy.storage.OctopusEnergyStore', new=FakeStore):
+    # Arrange
+    cost_ledger = OctopusEnergyCostLedger(tariff_code, period_from, period_to, 2)
+    cost_ledger.add_spans([{
+      "from": period_from,
+      "to": period_from + timedelta(hours=1),
+      "rate": 10,
+      "consumptions": [1, 0.5],
+      "cost": 15
+    }], 15, period_from + timedelta(hours=1))
+
+    store = OctopusEnergyDataStore(None)
+    store.set_cost_ledger("mpan", "serial", cost_ledger)
+
+    with mock.patch('custom_components.octopus_energy.storage.utcnow', return_value=period_to):
+      saved_data = store._store.data_func()
+
+    # Act
+    loaded_store = OctopusEnergyDataStore(None)
+    loaded_store._store.data = saved_data
+    await loaded_store.async_load()
+
+    # Assert
+    loaded_cost_ledger = loaded_store.get_cost_ledger("mpan", "serial")
+    assert loaded_cost_ledger.is_for(tariff_code, period_from, period_to)
+    assert loaded_cost_ledger.standing_charge == 2
+    assert loaded_cost_ledger.spans == cost_ledger.spans
+    assert loaded_cost_ledger.charges == cost_ledger.charges
+    assert len(loaded_cost_ledger.charges) == 2
+    assert loaded_cost_ledger.total_cost_in_pence == 15
+    assert loaded_cost_ledger.last_calculated_timestamp == cost_ledger.last_calculated_timestamp
+
+    loaded_store.compact(period_to + timedelta(days=10))
+    assert loaded_store.get_cost_ledger("mpan", "serial") == None
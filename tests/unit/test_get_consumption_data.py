@@ -4,34 +4,32 @@ import mock
 
 from unit import (create_consumption_data)
 
-from custom_components.octopus_energy.sensor_utils import async_get_consumption_data
+from custom_components.octopus_energy.sensor_utils import (async_get_consumption_data, get_consumption_gaps)
 from custom_components.octopus_energy.api_client import OctopusEnergyApiClient
 
 @pytest.mark.asyncio
-async def test_when_now_is_not_at_30_minute_mark_and_previous_data_is_available_then_previous_data_returned():
+async def test_when_previous_data_is_not_available_then_requested_data_returned_regardless_of_current_time():
   # Arrange
-  client = OctopusEnergyApiClient("NOT_REAL")
-
-  sensor_identifier = "ABC123"
-  sensor_serial_number = "123456"
-  is_electricity = False
-  
   period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
   period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
-  previous_data = []
 
-  for minute in range(0, 59):
-    if (minute == 0 or minute == 30):
-      continue
-    
-    minuteStr = f'{minute}'.zfill(2)
-    current_utc_timestamp = datetime.strptime(f'2022-02-12T00:{minuteStr}:00Z', "%Y-%m-%dT%H:%M:%S%z")
+  requested_periods = []
+  async def async_mocked_get_gas_consumption(*args, **kwargs):
+    requested_periods.append((args[3], args[4]))
+    return create_consumption_data(period_from, period_to)
+
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_gas_consumption', new=async_mocked_get_gas_consumption):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    sensor_identifier = "ABC123"
+    sensor_serial_number = "123456"
+    is_electricity = False
+    previous_data = []
 
     # Act
     result = await async_get_consumption_data(
       client,
       previous_data,
-      current_utc_timestamp,
       period_from,
       period_to,
       sensor_identifier,
@@ -41,14 +39,11 @@ async def test_when_now_is_not_at_30_minute_mark_and_previous_data_is_available_
 
     # Assert
     assert result != None
-    assert len(result) == 0
+    assert len(result) == 48
+    assert requested_periods == [(period_from, period_to)]
 
 @pytest.mark.asyncio
-@pytest.mark.parametrize("minutes",[
-  (0),
-  (30),
-])
-async def test_when_now_is_at_30_minute_mark_and_previous_data_is_in_requested_period_then_previous_data_returned(minutes):
+async def test_when_previous_data_is_in_requested_period_then_previous_data_returned():
   # Arrange
   client = OctopusEnergyApiClient("NOT_REAL")
 
@@ -59,15 +54,11 @@ async def test_when_now_is_at_30_minute_mark_and_previous_data_is_in_requested_p
   period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
   period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
   previous_data = create_consumption_data(period_from, period_to)
-    
-  minutesStr = f'{minutes}'.zfill(2)
-  current_utc_timestamp = datetime.strptime(f'2022-02-12T00:{minutesStr}:00Z', "%Y-%m-%dT%H:%M:%S%z")
 
   # Act
   result = await async_get_consumption_data(
     client,
     previous_data,
-    current_utc_timestamp,
     period_from,
     period_to,
     sensor_identifier,
@@ -94,13 +85,11 @@ async def test_when_now_is_at_30_minute_mark_and_previous_data_is_in_requested_p
     expected_valid_from = expected_valid_to
 
 @pytest.mark.asyncio
-@pytest.mark.parametrize("minutes,previous_data_available",[
-  (0, True),
-  (0, False),
-  (30, True),
-  (30, False),
+@pytest.mark.parametrize("previous_data_available",[
+  (True),
+  (False),
 ])
-async def test_when_now_is_at_30_minute_mark_and_gas_sensor_then_requested_data_returned(minutes, previous_data_available):
+async def test_when_gas_sensor_then_requested_data_returned(previous_data_available):
   # Arrange
   period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
   period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
@@ -122,15 +111,11 @@ async def test_when_now_is_at_30_minute_mark_and_gas_sensor_then_requested_data_
         datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z"),
         datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
       )
-    
-    minutesStr = f'{minutes}'.zfill(2)
-    current_utc_timestamp = datetime.strptime(f'2022-02-12T00:{minutesStr}:00Z', "%Y-%m-%dT%H:%M:%S%z")
 
     # Act
     result = await async_get_consumption_data(
       client,
       previous_data,
-      current_utc_timestamp,
       period_from,
       period_to,
       sensor_identifier,
@@ -155,13 +140,11 @@ async def test_when_now_is_at_30_minute_mark_and_gas_sensor_then_requested_data_
       expected_valid_from = expected_valid_to
 
 @pytest.mark.asyncio
-@pytest.mark.parametrize("minutes,previous_data_available",[
-  (0, True),
-  (0, False),
-  (30, True),
-  (30, False),
+@pytest.mark.parametrize("previous_data_available",[
+  (True),
+  (False),
 ])
-async def test_when_now_is_at_30_minute_mark_and_electricity_sensor_then_requested_data_returned(minutes, previous_data_available):
+async def test_when_electricity_sensor_then_requested_data_returned(previous_data_available):
   # Arrange
   period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
   period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
@@ -185,15 +168,11 @@ async def test_when_now_is_at_30_minute_mark_and_electricity_sensor_then_request
         datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z"),
         datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
       )
-    
-    minutesStr = f'{minutes}'.zfill(2)
-    current_utc_timestamp = datetime.strptime(f'2022-02-12T00:{minutesStr}:00Z', "%Y-%m-%dT%H:%M:%S%z")
 
     # Act
     result = await async_get_consumption_data(
       client,
       previous_data,
-      current_utc_timestamp,
       period_from,
       period_to,
       sensor_identifier,
@@ -218,11 +197,7 @@ async def test_when_now_is_at_30_minute_mark_and_electricity_sensor_then_request
       expected_valid_from = expected_valid_to
 
 @pytest.mark.asyncio
-@pytest.mark.parametrize("minutes",[
-  (0),
-  (30),
-])
-async def test_when_now_is_at_30_minute_mark_and_gas_sensor_and_returned_data_is_empty_then_previous_data_returned(minutes):
+async def test_when_gas_sensor_and_returned_data_is_empty_then_previous_data_returned():
   # Arrange
   async def async_mocked_client_consumption(*args, **kwargs):
     return []
@@ -243,15 +218,11 @@ async def test_when_now_is_at_30_minute_mark_and_gas_sensor_and_returned_data_is
       previous_period_from,
       previous_period_to
     )
-    
-    minutesStr = f'{minutes}'.zfill(2)
-    current_utc_timestamp = datetime.strptime(f'2022-02-12T00:{minutesStr}:00Z', "%Y-%m-%dT%H:%M:%S%z")
 
     # Act
     result = await async_get_consumption_data(
       client,
       previous_data,
-      current_utc_timestamp,
       period_from,
       period_to,
       sensor_identifier,
@@ -278,16 +249,12 @@ async def test_when_now_is_at_30_minute_mark_and_gas_sensor_and_returned_data_is
       expected_valid_from = expected_valid_to
 
 @pytest.mark.asyncio
-@pytest.mark.parametrize("minutes",[
-  (0),
-  (30),
-])
-async def test_when_now_is_at_30_minute_mark_and_electricity_sensor_and_returned_data_is_empty_then_previous_data_returned(minutes):
+async def test_when_electricity_sensor_and_returned_data_is_empty_then_previous_data_returned():
   # Arrange
   async def async_mocked_client_consumption(*args, **kwargs):
     return []
 
-  with mock.patch.object(OctopusEnergyApiClient, 'async_get_gas_consumption', new=async_mocked_client_consumption):
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_electricity_consumption', new=async_mocked_client_consumption):
     client = OctopusEnergyApiClient("NOT_REAL")
 
     sensor_identifier = "ABC123"
@@ -303,9 +270,6 @@ async def test_when_now_is_at_30_minute_mark_and_electricity_sensor_and_returned
       previous_period_from,
       previous_period_to
     )
-    
-    minutesStr = f'{minutes}'.zfill(2)
-    current_utc_timestamp = datetime.strptime(f'2022-02-12T00:{minutesStr}:00Z', "%Y-%m-%dT%H:%M:%S%z")
 
     store = {
       f'{sensor_identifier}_{sensor_serial_number}_previous_consumption': previous_data
@@ -315,7 +279,6 @@ async def test_when_now_is_at_30_minute_mark_and_electricity_sensor_and_returned
     result = await async_get_consumption_data(
       client,
       previous_data,
-      current_utc_timestamp,
       period_from,
       period_to,
       sensor_identifier,
@@ -339,4 +302,77 @@ async def test_when_now_is_at_30_minute_mark_and_electricity_sensor_and_returned
       assert "consumption" in item
       assert item["consumption"] == 1
 
-      expected_valid_from = expected_valid_to
\ No newline at end of file
+      expected_valid_from = expected_valid_to
+
+@pytest.mark.asyncio
+async def test_when_previous_data_is_partially_available_then_only_missing_data_requested_and_merged():
+  # Arrange
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  received_from = datetime.strptime("2022-02-28T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  requests = []
+
+  async def async_mocked_get_electricity_consumption(client, identifier, serial_number, request_from, request_to):
+    requests.append((request_from, request_to))
+    return create_consumption_data(received_from, period_to)
+
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_electricity_consumption', new=async_mocked_get_electricity_consumption):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    previous_data = create_consumption_data(period_from, received_from)
+
+    # Act
+    result = await async_get_consumption_data(
+      client,
+      previous_data,
+      period_from,
+      period_to,
+      "ABC123",
+      "123456",
+      True
+    )
+
+    # Assert
+    assert requests == [(received_from, period_to)]
+    assert len(result) == 48
+
+    expected_valid_from = period_from
+    for item in result:
+      assert item["interval_start"] == expected_valid_from
+      expected_valid_from = item["interval_end"]
+
+    assert expected_valid_from == period_to
+
+@pytest.mark.asyncio
+async def test_when_previous_data_has_gaps_then_data_requested_from_first_gap():
+  # Arrange
+  period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  gap_from = datetime.strptime("2022-02-28T02:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  gap_to = datetime.strptime("2022-02-28T03:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  requests = []
+
+  async def async_mocked_get_gas_consumption(client, identifier, serial_number, request_from, request_to):
+    requests.append((request_from, request_to))
+    return create_consumption_data(request_from, request_to)
+
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_gas_consumption', new=async_mocked_get_gas_consumption):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    previous_data = create_consumption_data(period_from, gap_from) + create_consumption_data(gap_to, period_to)
+
+    # Act
+    gaps = get_consumption_gaps(previous_data, period_from)
+    result = await async_get_consumption_data(
+      client,
+      previous_data,
+      period_from,
+      period_to,
+      "ABC123",
+      "123456",
+      False
+    )
+
+    # Assert
+    assert gaps == [{ "from": gap_from, "to": gap_to }]
+    assert requests == [(gap_from, period_to)]
+    assert len(result) == 48
+    assert get_consumption_gaps(result, period_from) == []
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+import pytest
+import mock
+
+from unit import (FakeSession)
+from custom_components.octopus_energy.api_client import OctopusEnergyApiClient
+
+mpan = "1234567890"
+serial_number = "ABC123"
+period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+def create_consumption_page(interval_from, total_intervals, next_page):
+  results = []
+  for index in range(total_intervals):
+    interval_start = interval_from + timedelta(minutes=30 * index)
+    results.append({
+      "consumption": 0.5,
+      "interval_start": interval_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+      "interval_end": (interval_start + timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    })
+
+  return {
+    "count": 48,
+    "next": f"https://api.octopus.energy/v1/electricity-meter-points/{mpan}/meters/{serial_number}/consumption?page={next_page}" if next_page != None else None,
+    "previous": None,
+    "results": results
+  }
+
+@pytest.mark.asyncio
+async def test_when_consumption_is_paginated_then_pages_followed_and_concatenated():
+  # Arrange
+  session = FakeSession([
+    ("page=2", create_consumption_page(period_from + timedelta(hours=10), 20, 3)),
+    ("page=3", create_consumption_page(period_from + timedelta(hours=20), 8, 4)),
+    ("page=4", create_consumption_page(period_to, 0, None)),
+    ("consumption", create_consumption_page(period_from, 20, 2)),
+  ])
+
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__get_session', return_value=session):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    # Act
+    result = await client.async_get_electricity_consumption(mpan, serial_number, period_from, period_to, 20)
+
+    # Assert
+    assert len(session.requested_urls) == 4
+    assert "page_size=20" in session.requested_urls[0]
+    assert session.requested_urls[1].endswith("page=2")
+    assert session.requested_urls[2].endswith("page=3")
+    assert session.requested_urls[3].endswith("page=4")
+
+    assert len(result) == 48
+
+    expected_interval_start = period_from
+    for item in result:
+      assert item["interval_start"] == expected_interval_start
+      assert item["interval_end"] == expected_interval_start + timedelta(minutes=30)
+      assert item["consumption"] == 0.5
+
+      expected_interval_start = item["interval_end"]
+
+@pytest.mark.asyncio
+async def test_when_consumption_is_iterated_then_items_yielded_across_pages():
+  # Arrange
+  session = FakeSession([
+    ("page=2", create_consumption_page(period_from + timedelta(hours=12), 24, 3)),
+    ("page=3", create_consumption_page(period_to, 0, None)),
+    ("consumption", create_consumption_page(period_from, 24, 2)),
+  ])
+
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__get_session', return_value=session):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    # Act
+    result = [item async for item in client.async_iter_electricity_consumption(mpan, serial_number, period_from, period_to, 24)]
+
+    # Assert
+    assert len(session.requested_urls) == 3
+    assert len(result) == 48
+    assert result[0]["interval_start"] == period_from
+    assert result[-1]["interval_end"] == period_to
+
+@pytest.mark.asyncio
+async def test_when_page_fails_then_none_returned():
+  # Arrange
+  session = FakeSession([
+    ("consumption?period_from", create_consumption_page(period_from, 24, 2)),
+  ])
+
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__get_session', return_value=session):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    # Act
+    result = await client.async_get_electricity_consumption(mpan, serial_number, period_from, period_to, 24)
+
+    # Assert
+    assert len(session.requested_urls) == 2
+    assert result == None
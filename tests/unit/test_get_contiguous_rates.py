@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+import pytest
+
+from unit import (create_rate_data)
+from custom_components.octopus_energy.rate_timeline import RateTimeline
+from custom_components.octopus_energy.utils import get_contiguous_rates
+
+period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+period_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+def create_rates(period_from, period_to):
+  rates = create_rate_data(period_from, period_to, [10, 10, 20])
+  for rate in rates:
+    rate["value_exc_vat"] = rate["value_inc_vat"]
+    rate["tariff_code"] = "E-1R-SUPER-GREEN-24M-21-07-30-A"
+
+  return RateTimeline.from_rates(rates, run_length_encoded=True)
+
+@pytest.mark.asyncio
+async def test_when_rates_are_none_then_no_rates_returned():
+  # Act
+  result = get_contiguous_rates(None, period_from)
+
+  # Assert
+  assert result != None
+  assert len(result) == 0
+
+@pytest.mark.asyncio
+async def test_when_rates_have_no_gaps_then_all_rates_returned():
+  # Arrange
+  rates = create_rates(period_from, period_to)
+
+  # Act
+  result = get_contiguous_rates(rates, period_from)
+
+  # Assert
+  assert result == rates
+
+@pytest.mark.asyncio
+async def test_when_rates_have_gap_then_rates_before_gap_returned():
+  # Arrange
+  gap_from = period_from + timedelta(hours=6)
+  gap_to = period_from + timedelta(hours=7)
+  rates = RateTimeline.from_rates(list(create_rates(period_from, gap_from)) + list(create_rates(gap_to, period_to)), run_length_encoded=True)
+
+  # Act
+  result = get_contiguous_rates(rates, period_from)
+
+  # Assert
+  assert len(result) == 12
+  assert result[-1]["valid_to"] == gap_from
+
+@pytest.mark.asyncio
+async def test_when_rates_start_after_period_then_no_rates_returned():
+  # Arrange
+  rates = create_rates(period_from + timedelta(hours=1), period_to)
+
+  # Act
+  result = get_contiguous_rates(rates, period_from)
+
+  # Assert
+  assert len(result) == 0
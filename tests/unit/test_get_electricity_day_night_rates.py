@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+import pytest
+import mock
+
+from unit import (FakeSession)
+from custom_components.octopus_energy.api_client import OctopusEnergyApiClient
+
+tariff_code = "E-2R-SUPER-GREEN-24M-21-07-30-A"
+period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+period_to = datetime.strptime("2022-03-02T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+def create_rates_response(value_inc_vat):
+  return {
+    "count": 1,
+    "next": None,
+    "previous": None,
+    "results": [
+      {
+        "value_exc_vat": value_inc_vat,
+        "value_inc_vat": value_inc_vat,
+        "valid_from": "2022-01-01T00:00:00Z",
+        "valid_to": None
+      }
+    ]
+  }
+
+def create_session():
+  return FakeSession([
+    ("day-unit-rates", create_rates_response(30)),
+    ("night-unit-rates", create_rates_response(10)),
+  ])
+
+@pytest.mark.asyncio
+async def test_when_day_night_rates_requested_then_day_and_night_rates_requested_at_same_time():
+  # Arrange
+  session = create_session()
+
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__get_session', return_value=session):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    # Act
+    result = await client.async_get_electricity_rates(tariff_code, False, period_from, period_to)
+
+    # Assert
+    assert result != None
+    assert len(session.requested_urls) == 2
+    assert session.max_in_flight == 2
+    assert client.get_stats()["day_night_requests"] == 1
+
+@pytest.mark.asyncio
+async def test_when_day_night_rates_requested_then_rates_merged_in_order():
+  # Arrange
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__get_session', return_value=create_session()):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    # Act
+    result = await client.async_get_electricity_rates(tariff_code, False, period_from, period_to)
+
+    # Assert
+    assert len(result) == 96
+
+    expected_valid_from = period_from
+    for rate in result:
+      assert rate["valid_from"] == expected_valid_from
+      assert rate["valid_to"] == expected_valid_from + timedelta(minutes=30)
+      assert rate["tariff_code"] == tariff_code
+
+      # Our night rate is between midnight and 7am
+      expected_value = 10 if expected_valid_from.hour < 7 else 30
+      assert rate["value_inc_vat"] == expected_value
+
+      expected_valid_from = rate["valid_to"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("is_smart_meter,expected_runs",[
+  (False, [
+    (10, "2022-02-28T00:00:00Z", "2022-02-28T07:00:00Z"),
+    (30, "2022-02-28T07:00:00Z", "2022-03-01T00:00:00Z"),
+    (10, "2022-03-01T00:00:00Z", "2022-03-01T07:00:00Z"),
+    (30, "2022-03-01T07:00:00Z", "2022-03-02T00:00:00Z"),
+  ]),
+  (True, [
+    (30, "2022-02-28T00:00:00Z", "2022-02-28T00:30:00Z"),
+    (10, "2022-02-28T00:30:00Z", "2022-02-28T07:30:00Z"),
+    (30, "2022-02-28T07:30:00Z", "2022-03-01T00:30:00Z"),
+    (10, "2022-03-01T00:30:00Z", "2022-03-01T07:30:00Z"),
+    (30, "2022-03-01T07:30:00Z", "2022-03-02T00:00:00Z"),
+  ]),
+])
+async def test_when_day_night_rates_requested_then_rates_compressed_into_runs_across_boundaries(is_smart_meter, expected_runs):
+  # Arrange
+  with mock.patch.object(OctopusEnergyApiClient, '_OctopusEnergyApiClient__get_session', return_value=create_session()):
+    client = OctopusEnergyApiClient("NOT_REAL")
+
+    # Act
+    result = await client.async_get_electricity_rates(tariff_code, is_smart_meter, period_from, period_to)
+
+    # Assert
+    assert result.is_run_length_encoded == True
+    assert list(map(lambda run: (run["value_inc_vat"], run["valid_from"], run["valid_to"]), result.runs())) == list(map(lambda run: (
+      run[0],
+      datetime.strptime(run[1], "%Y-%m-%dT%H:%M:%S%z"),
+      datetime.strptime(run[2], "%Y-%m-%dT%H:%M:%S%z")
+    ), expected_runs))
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+import pytest
+
+from custom_components.octopus_energy.scheduler import (get_next_slot_start, get_next_run)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("current,expected_next_slot_start",[
+  (datetime.strptime("2022-02-28T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z"), datetime.strptime("2022-02-28T10:30:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+  (datetime.strptime("2022-02-28T10:01:00Z", "%Y-%m-%dT%H:%M:%S%z"), datetime.strptime("2022-02-28T10:30:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+  (datetime.strptime("2022-02-28T10:29:59Z", "%Y-%m-%dT%H:%M:%S%z"), datetime.strptime("2022-02-28T10:30:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+  (datetime.strptime("2022-02-28T23:45:00Z", "%Y-%m-%dT%H:%M:%S%z"), datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+  (datetime.strptime("2022-06-28T10:15:00+01:00", "%Y-%m-%dT%H:%M:%S%z"), datetime.strptime("2022-06-28T09:30:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+])
+async def test_when_get_next_slot_start_called_then_start_of_next_slot_returned(current, expected_next_slot_start):
+  # Act
+  result = get_next_slot_start(current)
+
+  # Assert
+  assert result == expected_next_slot_start
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("current,offset,expected_next_slot_start",[
+  (datetime.strptime("2022-02-28T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z"), timedelta(minutes=-15), datetime.strptime("2022-02-28T10:15:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+  (datetime.strptime("2022-02-28T10:20:00Z", "%Y-%m-%dT%H:%M:%S%z"), timedelta(minutes=-15), datetime.strptime("2022-02-28T10:45:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+  (datetime.strptime("2022-02-28T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z"), timedelta(hours=1, minutes=5), datetime.strptime("2022-02-28T10:05:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+])
+async def test_when_get_next_slot_start_called_with_offset_then_offset_slot_returned(current, offset, expected_next_slot_start):
+  # Act
+  result = get_next_slot_start(current, offset)
+
+  # Assert
+  assert result == expected_next_slot_start
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("current,expected_next_run",[
+  # Availability time is before our next slot
+  (datetime.strptime("2022-02-28T16:05:00Z", "%Y-%m-%dT%H:%M:%S%z"), datetime.strptime("2022-02-28T16:10:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+  # Availability time has passed for today
+  (datetime.strptime("2022-02-28T16:10:00Z", "%Y-%m-%dT%H:%M:%S%z"), datetime.strptime("2022-02-28T16:30:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+  # Availability time is after our next slot
+  (datetime.strptime("2022-02-28T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z"), datetime.strptime("2022-02-28T10:30:00Z", "%Y-%m-%dT%H:%M:%S%z")),
+])
+async def test_when_get_next_run_called_with_availability_times_then_earliest_time_returned(current, expected_next_run):
+  # Act
+  result = get_next_run(current, timedelta(0), ["16:10"])
+
+  # Assert
+  assert result == expected_next_run
@@ -0,0 +1,47 @@
+from datetime import datetime
+import pytest
+
+from custom_components.octopus_energy.target_sensor_utils import get_target_rates_cache_key
+
+target_end = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("first_target_start,second_target_start",[
+  ("2022-02-09T10:00:01Z", "2022-02-09T10:29:59Z"),
+  ("2022-02-09T10:05:00Z", "2022-02-09T10:30:00Z"),
+])
+async def test_when_target_start_within_same_slot_then_cache_key_unchanged(first_target_start, second_target_start):
+  # Act
+  first_key = get_target_rates_cache_key("mpan1", 1, "Continuous", 1, datetime.strptime(first_target_start, "%Y-%m-%dT%H:%M:%S%z"), target_end)
+  second_key = get_target_rates_cache_key("mpan1", 1, "Continuous", 1, datetime.strptime(second_target_start, "%Y-%m-%dT%H:%M:%S%z"), target_end)
+
+  # Assert
+  assert first_key == second_key
+
+@pytest.mark.asyncio
+async def test_when_target_start_moves_to_next_slot_then_cache_key_changed():
+  # Act
+  first_key = get_target_rates_cache_key("mpan1", 1, "Continuous", 1, datetime.strptime("2022-02-09T10:30:00Z", "%Y-%m-%dT%H:%M:%S%z"), target_end)
+  second_key = get_target_rates_cache_key("mpan1", 1, "Continuous", 1, datetime.strptime("2022-02-09T10:30:01Z", "%Y-%m-%dT%H:%M:%S%z"), target_end)
+
+  # Assert
+  assert first_key != second_key
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("rates_key,rates_version,target_type,target_hours,target_end_time",[
+  ("mpan2", 1, "Continuous", 1, "2022-02-10T00:00:00Z"),
+  ("mpan1", 2, "Continuous", 1, "2022-02-10T00:00:00Z"),
+  ("mpan1", 1, "Intermittent", 1, "2022-02-10T00:00:00Z"),
+  ("mpan1", 1, "Continuous", 1.5, "2022-02-10T00:00:00Z"),
+  ("mpan1", 1, "Continuous", 1, "2022-02-10T06:00:00Z"),
+])
+async def test_when_rates_or_config_changed_then_cache_key_changed(rates_key, rates_version, target_type, target_hours, target_end_time):
+  # Arrange
+  target_start = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+  # Act
+  first_key = get_target_rates_cache_key("mpan1", 1, "Continuous", 1, target_start, target_end)
+  second_key = get_target_rates_cache_key(rates_key, rates_version, target_type, target_hours, target_start, datetime.strptime(target_end_time, "%Y-%m-%dT%H:%M:%S%z"))
+
+  # Assert
+  assert first_key != second_key
@@ -0,0 +1,31 @@
+import pytest
+from datetime import datetime
+
+from unit import (create_token)
+from custom_components.octopus_energy.utils import get_token_expiry
+
+@pytest.mark.asyncio
+async def test_when_token_has_expiry_then_expiry_returned():
+  # Arrange
+  expected_expiry = datetime.strptime("2022-10-30T10:15:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  token = create_token({ "sub": "kraken|account-user:123", "exp": int(expected_expiry.timestamp()) })
+
+  # Act
+  result = get_token_expiry(token)
+
+  # Assert
+  assert result == expected_expiry
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("token",[
+  ("not-a-jwt"),
+  ("header.!!!.signature"),
+  (create_token({ "sub": "kraken|account-user:123" })),
+  (create_token([1, 2, 3])),
+])
+async def test_when_token_expiry_cannot_be_determined_then_none_returned(token):
+  # Act
+  result = get_token_expiry(token)
+
+  # Assert
+  assert result == None
@@ -3,7 +3,7 @@ from time import time
 import pytest
 
 from unit import (create_rate_data)
-from custom_components.octopus_energy.target_sensor_utils import is_target_rate_active
+from custom_components.octopus_energy.target_sensor_utils import (is_target_rate_active, create_target_schedule, is_target_schedule_active)
 from custom_components.octopus_energy.utils import rates_to_thirty_minute_increments
 
 @pytest.mark.asyncio
@@ -180,4 +180,36 @@ async def test_when_current_date_is_equal_to_last_end_date_then_not_active():
 
   assert result != None
   assert result["is_active"] == False
-  assert result["next_time"] == None
\ No newline at end of file
+  assert result["next_time"] == None
+
+@pytest.mark.asyncio
+async def test_when_schedule_has_gaps_and_offset_then_active_only_within_offset_rates():
+  # Arrange
+  rates = create_rate_data(
+    datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z"),
+    datetime.strptime("2022-02-09T14:00:00Z", "%Y-%m-%dT%H:%M:%S%z"),
+    [0.1]
+  )
+  # Pick every other rate, as we would for an intermittent target
+  rates = rates[::2]
+  offset = "-00:15:00"
+  schedule = create_target_schedule(rates, offset)
+
+  current_date = datetime.strptime("2022-02-09T09:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  while current_date < datetime.strptime("2022-02-09T15:00:00Z", "%Y-%m-%dT%H:%M:%S%z"):
+    # Act
+    result = is_target_schedule_active(current_date, schedule)
+
+    # Assert
+    is_in_offset_rate = any(rate["valid_from"] - timedelta(minutes=15) <= current_date < rate["valid_to"] - timedelta(minutes=15) for rate in rates)
+    assert result["is_active"] == is_in_offset_rate
+
+    # Our schedule's next time has our offset applied, unlike our rate's next time
+    rate_result = is_target_rate_active(current_date, rates, offset)
+    assert result["is_active"] == rate_result["is_active"]
+    if rate_result["next_time"] != None:
+      assert result["next_time"] == rate_result["next_time"] - timedelta(minutes=15)
+    else:
+      assert result["next_time"] == None
+
+    current_date = current_date + timedelta(minutes=5)
@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+import pytest
+
+from unit import (create_rate_data)
+from custom_components.octopus_energy.rate_timeline import RateTimeline
+from custom_components.octopus_energy.utils import rates_to_thirty_minute_increments
+
+def create_rates(period_from, period_to, expected_rates, tariff_code = "E-1R-SUPER-GREEN-24M-21-07-30-A"):
+  rates = create_rate_data(period_from, period_to, expected_rates)
+  for rate in rates:
+    rate["value_exc_vat"] = rate["value_inc_vat"] / 1.05
+    rate["tariff_code"] = tariff_code
+
+  return rates
+
+@pytest.mark.asyncio
+async def test_when_created_from_rates_then_rates_are_available_as_dicts():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = create_rates(period_from, period_to, [1.1, 2.2, 3.3])
+
+  # Act
+  timeline = RateTimeline.from_rates(rates)
+
+  # Assert
+  assert len(timeline) == 48
+  assert timeline == rates
+  assert rates == timeline
+  assert timeline.as_list() == rates
+
+  for index, rate in enumerate(timeline):
+    assert rate == rates[index]
+    assert dict(rate) == rates[index]
+    assert rate["valid_from"] == rates[index]["valid_from"]
+    assert rate["valid_to"] == rates[index]["valid_to"]
+    assert rate.get("value_inc_vat") == rates[index]["value_inc_vat"]
+    assert rate.get("unknown") == None
+
+  assert timeline[-1]["valid_to"] == period_to
+
+@pytest.mark.asyncio
+async def test_when_sliced_then_timeline_returned():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = create_rates(period_from, period_to, [1.1, 2.2, 3.3])
+  timeline = RateTimeline.from_rates(rates)
+
+  # Act
+  result = timeline[2:6]
+
+  # Assert
+  assert isinstance(result, RateTimeline)
+  assert result == rates[2:6]
+  assert result[0]["valid_from"] == period_from + timedelta(hours=1)
+
+@pytest.mark.asyncio
+async def test_when_slice_appended_to_then_original_timeline_unchanged():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = create_rates(period_from, period_to, [1.1, 2.2, 3.3])
+  timeline = RateTimeline.from_rates(rates)
+  result = timeline[0:2]
+
+  # Act
+  result.append(1, 1.05, period_from + timedelta(hours=1), "E-1R-AGILE-18-02-21-A")
+
+  # Assert
+  assert result[-1]["tariff_code"] == "E-1R-AGILE-18-02-21-A"
+  assert timeline == rates
+  assert timeline._tariff_codes == ["E-1R-SUPER-GREEN-24M-21-07-30-A"]
+
+@pytest.mark.asyncio
+async def test_when_rates_differ_then_timelines_are_not_equal():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  timeline = RateTimeline.from_rates(create_rates(period_from, period_to, [1.1, 2.2, 3.3]))
+
+  # Act & Assert
+  assert timeline == RateTimeline.from_rates(create_rates(period_from, period_to, [1.1, 2.2, 3.3]))
+  assert timeline != RateTimeline.from_rates(create_rates(period_from, period_to, [1.1, 2.2, 3.4]))
+  assert timeline != RateTimeline.from_rates(create_rates(period_from, period_to, [1.1, 2.2, 3.3], "E-1R-AGILE-18-02-21-A"))
+  assert timeline != timeline[1:]
+
+@pytest.mark.asyncio
+async def test_when_rates_normalised_then_timeline_returned():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+  # Act
+  result = rates_to_thirty_minute_increments(
+    {
+      "results": [
+        {
+          "value_exc_vat": 20,
+          "value_inc_vat": 21,
+          "valid_from": "2022-02-01T00:00:00Z",
+          "valid_to": None
+        }
+      ]
+    },
+    period_from,
+    period_to,
+    "test_tariff"
+  )
+
+  # Assert
+  assert isinstance(result, RateTimeline)
+  assert len(result) == 48
+  assert result[0] == {
+    "value_exc_vat": 20,
+    "value_inc_vat": 21,
+    "valid_from": period_from,
+    "valid_to": period_from + timedelta(minutes=30),
+    "tariff_code": "test_tariff"
+  }
+
+@pytest.mark.asyncio
+async def test_when_run_length_encoded_then_rates_with_same_price_held_as_single_run():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-11T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  data = {
+    "results": [
+      {
+        "value_exc_vat": 20,
+        "value_inc_vat": 21,
+        "valid_from": "2022-02-10T07:00:00Z",
+        "valid_to": None
+      },
+      {
+        "value_exc_vat": 10,
+        "value_inc_vat": 10.5,
+        "valid_from": "2022-02-10T00:00:00Z",
+        "valid_to": "2022-02-10T07:00:00Z"
+      },
+      {
+        "value_exc_vat": 20,
+        "value_inc_vat": 21,
+        "valid_from": "2022-02-01T00:00:00Z",
+        "valid_to": "2022-02-10T00:00:00Z"
+      }
+    ]
+  }
+
+  # Act
+  result = rates_to_thirty_minute_increments(data, period_from, period_to, "test_tariff", run_length_encoded=True)
+
+  # Assert
+  assert result.is_run_length_encoded == True
+  assert len(result) == 96
+  assert result == rates_to_thirty_minute_increments(data, period_from, period_to, "test_tariff")
+
+  runs = result.runs()
+  assert len(runs) == 3
+  assert runs[0]["valid_from"] == period_from
+  assert runs[0]["valid_to"] == datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  assert runs[1]["valid_to"] == datetime.strptime("2022-02-10T07:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  assert runs[1]["value_inc_vat"] == 10.5
+  assert runs[2]["valid_to"] == period_to
+
+  for index, rate in enumerate(result):
+    assert rate["valid_from"] == period_from + timedelta(minutes=30 * index)
+    assert result[index] == rate
+    assert result[index - 96] == rate
+
+@pytest.mark.asyncio
+async def test_when_run_length_encoded_timeline_sliced_then_runs_clipped():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  rates = create_rates(period_from, period_to, [1.1, 1.1, 1.1, 2.2, 2.2, 3.3])
+  timeline = RateTimeline.from_rates(rates, run_length_encoded=True)
+
+  # Act
+  result = timeline[4:14]
+
+  # Assert
+  assert len(timeline.runs()) == 24
+  assert result == rates[4:14]
+  assert len(result.runs()) == 6
+  assert timeline[::7] == rates[::7]
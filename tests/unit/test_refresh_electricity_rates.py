@@ -0,0 +1,166 @@
+from datetime import datetime
+import asyncio
+import pytest
+import mock
+
+from unit import (create_rate_data)
+from custom_components.octopus_energy import async_refresh_electricity_rates
+from custom_components.octopus_energy.api_client import OctopusEnergyApiClient
+from custom_components.octopus_energy.rate_timeline import RateTimeline
+
+period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+period_to = datetime.strptime("2022-03-02T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+class FakeStore:
+  def __init__(self):
+    self.rates = {}
+
+  def get_rates(self, meter_point, tariff_code, is_smart_meter, period_from, period_to):
+    return self.rates.get((meter_point, tariff_code, is_smart_meter))
+
+  def set_rates(self, meter_point, tariff_code, is_smart_meter, rates):
+    self.rates[(meter_point, tariff_code, is_smart_meter)] = rates
+
+def create_rates(period_from, period_to, tariff_code):
+  rates = create_rate_data(period_from, period_to, [10, 20])
+  for rate in rates:
+    rate["value_exc_vat"] = rate["value_inc_vat"]
+    rate["tariff_code"] = tariff_code
+
+  return RateTimeline.from_rates(rates, run_length_encoded=True)
+
+@pytest.mark.asyncio
+async def test_when_meters_share_tariff_then_rates_retrieved_once():
+  # Arrange
+  requested_tariffs = []
+  async def async_mocked_get_electricity_rates(*args, **kwargs):
+    requested_tariffs.append((args[1], args[2]))
+    return create_rates(args[3], args[4], args[1])
+
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_electricity_rates', new=async_mocked_get_electricity_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    store = FakeStore()
+    tariff_codes = {
+      ("mpan1", False): "E-1R-AGILE-18-02-21-A",
+      ("mpan2", False): "E-1R-AGILE-18-02-21-A",
+      ("mpan3", True): "E-1R-AGILE-18-02-21-A",
+    }
+
+    # Act
+    result = await async_refresh_electricity_rates(client, store, tariff_codes, period_from, period_to, {})
+
+    # Assert
+    assert result["tariffs"] == 2
+    assert sorted(requested_tariffs) == [("E-1R-AGILE-18-02-21-A", False), ("E-1R-AGILE-18-02-21-A", True)]
+
+    assert list(result["rates"].keys()) == ["mpan1", "mpan2", "mpan3"]
+    assert result["rates"]["mpan1"] is result["rates"]["mpan2"]
+    assert len(result["rates"]["mpan1"]) == 96
+
+    # Each meter stores its own rates
+    assert len(store.rates) == 3
+
+@pytest.mark.asyncio
+async def test_when_rates_stored_then_rates_not_retrieved():
+  # Arrange
+  requested_tariffs = []
+  async def async_mocked_get_electricity_rates(*args, **kwargs):
+    requested_tariffs.append(args[1])
+    return create_rates(args[3], args[4], args[1])
+
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_electricity_rates', new=async_mocked_get_electricity_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    store = FakeStore()
+    stored_rates = create_rates(period_from, period_to, "E-1R-AGILE-18-02-21-A")
+    store.set_rates("mpan1", "E-1R-AGILE-18-02-21-A", False, stored_rates)
+
+    # Act
+    result = await async_refresh_electricity_rates(client, store, { ("mpan1", False): "E-1R-AGILE-18-02-21-A" }, period_from, period_to, {})
+
+    # Assert
+    assert requested_tariffs == []
+    assert result["rates"]["mpan1"] == stored_rates
+
+@pytest.mark.asyncio
+async def test_when_many_tariffs_then_requests_limited_to_concurrency():
+  # Arrange
+  concurrency = 2
+  in_flight = 0
+  max_in_flight = 0
+  async def async_mocked_get_electricity_rates(*args, **kwargs):
+    nonlocal in_flight, max_in_flight
+    in_flight += 1
+    max_in_flight = max(max_in_flight, in_flight)
+
+    # Give our other requests a chance to start
+    await asyncio.sleep(0.01)
+
+    in_flight -= 1
+    return create_rates(args[3], args[4], args[1])
+
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_electricity_rates', new=async_mocked_get_electricity_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    tariff_codes = {}
+    for index in range(6):
+      tariff_codes[(f"mpan{index}", False)] = f"E-1R-TARIFF-{index}-A"
+
+    # Act
+    result = await async_refresh_electricity_rates(client, FakeStore(), tariff_codes, period_from, period_to, {}, concurrency)
+
+    # Assert
+    assert max_in_flight == concurrency
+    assert len(result["rates"]) == 6
+
+@pytest.mark.asyncio
+async def test_when_tariff_fails_then_cached_rates_used_for_its_meters():
+  # Arrange
+  async def async_mocked_get_electricity_rates(*args, **kwargs):
+    if args[1] == "E-1R-FAILING-A":
+      raise Exception("Failed to retrieve rates")
+
+    return create_rates(args[3], args[4], args[1])
+
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_electricity_rates', new=async_mocked_get_electricity_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    tariff_codes = {
+      ("mpan1", False): "E-1R-WORKING-A",
+      ("mpan2", False): "E-1R-FAILING-A",
+      ("mpan3", False): "E-1R-FAILING-A",
+    }
+    cached_rates = {
+      "mpan2": create_rates(period_from, period_to, "E-1R-FAILING-A")
+    }
+
+    # Act
+    result = await async_refresh_electricity_rates(client, FakeStore(), tariff_codes, period_from, period_to, cached_rates)
+
+    # Assert
+    assert result["tariffs"] == 2
+    assert result["rates"]["mpan1"][0]["tariff_code"] == "E-1R-WORKING-A"
+    assert result["rates"]["mpan2"] is cached_rates["mpan2"]
+
+    # Without cached rates, our meter has no rates
+    assert "mpan3" not in result["rates"]
+
+@pytest.mark.asyncio
+async def test_when_rates_partially_stored_then_only_missing_rates_retrieved():
+  # Arrange
+  stored_to = datetime.strptime("2022-03-01T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  requested_periods = []
+  async def async_mocked_get_electricity_rates(*args, **kwargs):
+    requested_periods.append((args[3], args[4]))
+    return create_rates(args[3], args[4], args[1])
+
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_electricity_rates', new=async_mocked_get_electricity_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    store = FakeStore()
+    store.set_rates("mpan1", "E-1R-AGILE-18-02-21-A", False, create_rates(period_from, stored_to, "E-1R-AGILE-18-02-21-A"))
+
+    # Act
+    result = await async_refresh_electricity_rates(client, store, { ("mpan1", False): "E-1R-AGILE-18-02-21-A" }, period_from, period_to, {})
+
+    # Assert
+    assert requested_periods == [(stored_to, period_to)]
+    assert len(result["rates"]["mpan1"]) == 96
+    assert result["rates"]["mpan1"][0]["valid_from"] == period_from
+    assert result["rates"]["mpan1"][-1]["valid_to"] == period_to
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+import pytest
+
+from custom_components.octopus_energy.response_cache import OctopusEnergyResponseCache
+
+current = datetime.strptime("2022-02-28T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+@pytest.mark.asyncio
+async def test_when_key_not_cached_then_none_returned():
+  # Arrange
+  cache = OctopusEnergyResponseCache(10)
+
+  # Act
+  result = cache.get("rates", current)
+
+  # Assert
+  assert result == None
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("expires_at",[
+  (None),
+  (current + timedelta(minutes=1)),
+])
+async def test_when_key_cached_and_not_expired_then_value_returned(expires_at):
+  # Arrange
+  cache = OctopusEnergyResponseCache(10)
+  cache.set("rates", [1, 2, 3], expires_at)
+
+  # Act
+  result = cache.get("rates", current)
+
+  # Assert
+  assert result == [1, 2, 3]
+
+@pytest.mark.asyncio
+async def test_when_key_cached_and_expired_then_none_returned_and_entry_removed():
+  # Arrange
+  cache = OctopusEnergyResponseCache(10)
+  cache.set("rates", [1, 2, 3], current)
+
+  # Act
+  result = cache.get("rates", current)
+
+  # Assert
+  assert result == None
+  assert len(cache) == 0
+
+@pytest.mark.asyncio
+async def test_when_cache_is_full_then_least_recently_used_entry_is_evicted():
+  # Arrange
+  cache = OctopusEnergyResponseCache(2)
+  cache.set("first", 1)
+  cache.set("second", 2)
+
+  # Mark our first entry as recently used
+  assert cache.get("first", current) == 1
+
+  # Act
+  cache.set("third", 3)
+
+  # Assert
+  assert len(cache) == 2
+  assert cache.get("first", current) == 1
+  assert cache.get("second", current) == None
+  assert cache.get("third", current) == 3
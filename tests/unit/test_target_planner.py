@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+import pytest
+
+from unit import (create_rate_data)
+from custom_components.octopus_energy.const import (CONFIG_TARGET_HOURS, CONFIG_TARGET_TYPE, CONFIG_TARGET_MPAN, CONFIG_TARGET_ROLLING_TARGET)
+from custom_components.octopus_energy.target_planner import OctopusEnergyTargetRatePlanner
+
+def create_config(target_type, target_hours, mpan = None):
+  config = {
+    CONFIG_TARGET_TYPE: target_type,
+    CONFIG_TARGET_HOURS: target_hours,
+    CONFIG_TARGET_ROLLING_TARGET: False
+  }
+
+  if mpan != None:
+    config[CONFIG_TARGET_MPAN] = mpan
+
+  return config
+
+@pytest.mark.asyncio
+async def test_when_targets_use_same_rates_then_rates_only_indexed_once():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  current_date = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  all_rates = { "mpan1": create_rate_data(period_from, period_to, [0.3, 0.2, 0.1, 0.2]) }
+
+  planner = OctopusEnergyTargetRatePlanner()
+  results = {}
+  planner.register("continuous", create_config("Continuous", 1), lambda: True, lambda result: results.update({ "continuous": result }))
+  planner.register("intermittent", create_config("Intermittent", 1, "mpan1"), lambda: True, lambda result: results.update({ "intermittent": result }))
+
+  # Act
+  planner.plan(current_date, all_rates, { "mpan1": 1 })
+
+  # Assert
+  assert planner.get_stats()["search_indexes_created"] == 1
+
+  assert len(results["continuous"]["target_rates"]) == 2
+  assert results["continuous"]["target_rates"][0]["valid_from"] == datetime.strptime("2022-02-09T00:30:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  assert len(results["continuous"]["candidates"]) == 3
+
+  assert len(results["intermittent"]["target_rates"]) == 2
+  for rate in results["intermittent"]["target_rates"]:
+    assert rate["value_inc_vat"] == 0.1
+
+@pytest.mark.asyncio
+async def test_when_rates_unchanged_then_cached_result_returned():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  current_date = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  all_rates = { "mpan1": create_rate_data(period_from, period_to, [0.3, 0.2, 0.1, 0.2]) }
+
+  planner = OctopusEnergyTargetRatePlanner()
+  results = []
+  planner.register("continuous", create_config("Continuous", 1), lambda: True, lambda result: results.append(result))
+  planner.plan(current_date, all_rates, { "mpan1": 1 })
+
+  # Act
+  planner.plan(current_date + timedelta(minutes=5), all_rates, { "mpan1": 1 })
+  planner.plan(current_date, all_rates, { "mpan1": 2 })
+
+  # Assert
+  assert len(results) == 3
+  assert results[0]["is_cached"] == False
+  assert results[1]["is_cached"] == True
+  assert results[1]["target_rates"] == results[0]["target_rates"]
+  assert results[2]["is_cached"] == False
+
+  stats = planner.get_stats()
+  assert stats["cache_hits"] == 1
+  assert stats["cache_misses"] == 2
+  assert stats["search_indexes_created"] == 2
+
+@pytest.mark.asyncio
+async def test_when_target_not_due_or_unregistered_then_not_planned():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  current_date = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  all_rates = { "mpan1": create_rate_data(period_from, period_to, [0.1]) }
+
+  planner = OctopusEnergyTargetRatePlanner()
+  results = []
+  planner.register("not_due", create_config("Continuous", 1), lambda: False, lambda result: results.append(result))
+  unregister = planner.register("unregistered", create_config("Continuous", 1), lambda: True, lambda result: results.append(result))
+  unregister()
+
+  # Act
+  planner.plan(current_date, all_rates, { "mpan1": 1 })
+
+  # Assert
+  assert len(results) == 0
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("target_type",[
+  ("Continuous"),
+  ("Intermittent"),
+])
+async def test_when_calculated_again_with_same_rates_and_config_then_cache_hit(target_type):
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  current_date = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  all_rates = { "mpan1": create_rate_data(period_from, period_to, [0.3, 0.2, 0.1, 0.2]) }
+
+  planner = OctopusEnergyTargetRatePlanner()
+  results = []
+  planner.register("target", create_config(target_type, 1, "mpan1"), lambda: True, lambda result: results.append(result))
+
+  # Act
+  planner.plan(current_date, all_rates, { "mpan1": 1 })
+  planner.plan(current_date, all_rates, { "mpan1": 1 })
+
+  # Assert
+  assert results[0]["is_cached"] == False
+  assert results[1]["is_cached"] == True
+  assert results[1]["target_rates"] == results[0]["target_rates"]
+
+  stats = planner.get_stats()
+  assert stats["cache_hits"] == 1
+  assert stats["cache_misses"] == 1
+
+@pytest.mark.asyncio
+async def test_when_rates_version_changes_then_cache_miss_and_new_rates_used():
+  # Arrange
+  period_from = datetime.strptime("2022-02-09T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  period_to = datetime.strptime("2022-02-10T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+  current_date = datetime.strptime("2022-02-09T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+  planner = OctopusEnergyTargetRatePlanner()
+  results = []
+  planner.register("target", create_config("Intermittent", 0.5, "mpan1"), lambda: True, lambda result: results.append(result))
+  planner.plan(current_date, { "mpan1": create_rate_data(period_from, period_to, [0.3, 0.2, 0.1, 0.2]) }, { "mpan1": 1 })
+
+  # Act
+  planner.plan(current_date, { "mpan1": create_rate_data(period_from, period_to, [0.05, 0.2, 0.1, 0.2]) }, { "mpan1": 2 })
+
+  # Assert
+  assert results[1]["is_cached"] == False
+  assert results[1]["target_rates"][0]["value_inc_vat"] == 0.05
+
+  stats = planner.get_stats()
+  assert stats["cache_hits"] == 0
+  assert stats["cache_misses"] == 2
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from datetime import timedelta
+from homeassistant.util.dt import (utcnow)
+
+from unit import (create_token)
+from custom_components.octopus_energy.token_manager import OctopusEnergyTokenManager
+
+@pytest.mark.asyncio
+async def test_when_token_requested_concurrently_then_single_request_made():
+  # Arrange
+  requests = []
+  token = create_token({ "exp": int((utcnow() + timedelta(hours=1)).timestamp()) })
+
+  async def async_request_token():
+    requests.append(True)
+    await asyncio.sleep(0.01)
+    return token
+
+  manager = OctopusEnergyTokenManager(async_request_token)
+
+  # Act
+  results = await asyncio.gather(*[manager.async_get_token() for _ in range(10)])
+
+  # Assert
+  assert len(requests) == 1
+  assert all(result == token for result in results)
+
+@pytest.mark.asyncio
+async def test_when_token_is_valid_then_cached_token_returned():
+  # Arrange
+  requests = []
+
+  async def async_request_token():
+    requests.append(True)
+    return create_token({ "exp": int((utcnow() + timedelta(hours=1)).timestamp()) })
+
+  manager = OctopusEnergyTokenManager(async_request_token)
+  first_token = await manager.async_get_token()
+
+  # Act
+  second_token = await manager.async_get_token()
+
+  # Assert
+  assert len(requests) == 1
+  assert first_token == second_token
+
+@pytest.mark.asyncio
+async def test_when_token_is_close_to_expiring_then_cached_token_returned_and_refreshed_in_background():
+  # Arrange
+  tokens = [
+    create_token({ "exp": int((utcnow() + timedelta(minutes=2)).timestamp()) }),
+    create_token({ "exp": int((utcnow() + timedelta(hours=1)).timestamp()) }),
+  ]
+
+  async def async_request_token():
+    return tokens.pop(0)
+
+  manager = OctopusEnergyTokenManager(async_request_token)
+  expiring_token = await manager.async_get_token()
+
+  # Act
+  result = await manager.async_get_token()
+  await asyncio.sleep(0)
+
+  # Assert
+  assert result == expiring_token
+  assert len(tokens) == 0
+  assert await manager.async_get_token() != expiring_token
+
+@pytest.mark.asyncio
+async def test_when_token_is_invalidated_then_new_token_requested():
+  # Arrange
+  requests = []
+
+  async def async_request_token():
+    requests.append(True)
+    return create_token({ "exp": int((utcnow() + timedelta(hours=1)).timestamp()), "count": len(requests) })
+
+  manager = OctopusEnergyTokenManager(async_request_token)
+  first_token = await manager.async_get_token()
+
+  # Act
+  manager.invalidate()
+  second_token = await manager.async_get_token()
+
+  # Assert
+  assert len(requests) == 2
+  assert first_token != second_token
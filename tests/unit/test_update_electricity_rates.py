@@ -0,0 +1,87 @@
+from datetime import datetime
+import pytest
+import mock
+
+from unit import (create_rate_data)
+from custom_components.octopus_energy import async_update_electricity_rates
+from custom_components.octopus_energy.api_client import OctopusEnergyApiClient
+from custom_components.octopus_energy.const import (DATA_RATES, DATA_RATES_REFRESH_STATS, DATA_RATES_VERSIONS)
+from custom_components.octopus_energy.rate_timeline import RateTimeline
+
+current = datetime.strptime("2022-02-28T10:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+period_from = datetime.strptime("2022-02-28T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+period_to = datetime.strptime("2022-03-02T00:00:00Z", "%Y-%m-%dT%H:%M:%S%z")
+
+class FakeStore:
+  def get_rates(self, meter_point, tariff_code, is_smart_meter, period_from, period_to):
+    return None
+
+  def set_rates(self, meter_point, tariff_code, is_smart_meter, rates):
+    pass
+
+def create_rates(period_from, period_to, tariff_code, expected_rates = [10, 20]):
+  rates = create_rate_data(period_from, period_to, expected_rates)
+  for rate in rates:
+    rate["value_exc_vat"] = rate["value_inc_vat"]
+    rate["tariff_code"] = tariff_code
+
+  return RateTimeline.from_rates(rates, run_length_encoded=True)
+
+@pytest.mark.asyncio
+async def test_when_rates_unchanged_then_rates_version_not_increased():
+  # Arrange
+  expected_rates = [10, 20]
+  async def async_mocked_get_electricity_rates(*args, **kwargs):
+    return create_rates(args[3], args[4], args[1], expected_rates)
+
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_electricity_rates', new=async_mocked_get_electricity_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    data = {}
+    tariff_codes = { ("mpan1", False): "E-1R-AGILE-18-02-21-A" }
+
+    # Act
+    await async_update_electricity_rates(data, client, FakeStore(), tariff_codes, current, period_from, period_to)
+    first_version = data[DATA_RATES_VERSIONS]["mpan1"]
+
+    await async_update_electricity_rates(data, client, FakeStore(), tariff_codes, current, period_from, period_to)
+    unchanged_version = data[DATA_RATES_VERSIONS]["mpan1"]
+
+    expected_rates = [10, 30]
+    await async_update_electricity_rates(data, client, FakeStore(), tariff_codes, current, period_from, period_to)
+    changed_version = data[DATA_RATES_VERSIONS]["mpan1"]
+
+    # Assert
+    assert first_version == 1
+    assert unchanged_version == first_version
+    assert changed_version == first_version + 1
+
+@pytest.mark.asyncio
+async def test_when_tariff_fails_then_refresh_stats_recorded():
+  # Arrange
+  async def async_mocked_get_electricity_rates(*args, **kwargs):
+    if args[1] == "E-1R-FAILING-A":
+      raise Exception("Failed to retrieve rates")
+
+    return create_rates(args[3], args[4], args[1])
+
+  with mock.patch.object(OctopusEnergyApiClient, 'async_get_electricity_rates', new=async_mocked_get_electricity_rates):
+    client = OctopusEnergyApiClient("NOT_REAL")
+    data = {}
+    tariff_codes = {
+      ("mpan1", False): "E-1R-WORKING-A",
+      ("mpan2", False): "E-1R-FAILING-A",
+    }
+
+    # Act
+    result = await async_update_electricity_rates(data, client, FakeStore(), tariff_codes, current, period_from, period_to)
+
+    # Assert
+    assert list(result.keys()) == ["mpan1"]
+    assert data[DATA_RATES] is result
+    assert data[DATA_RATES_VERSIONS] == { "mpan1": 1 }
+
+    stats = data[DATA_RATES_REFRESH_STATS]
+    assert stats["last_refresh"] == current
+    assert stats["last_refresh_duration_seconds"] >= 0
+    assert stats["meters"] == 2
+    assert stats["tariffs"] == 2